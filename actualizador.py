@@ -0,0 +1,138 @@
+"""Refresco de datos con TTL y revalidación condicional.
+
+Reemplaza al ``@st.cache_data`` sin límite: los datos procesados se sirven
+desde memoria mientras no venza el TTL; al vencer se hace una lectura
+condicional (ETag / Last-Modified). Un 304 conserva el DataFrame tal cual y un
+contenido nuevo sólo se vuelve a procesar si su hash cambió.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from instrumentacion import tramo
+
+# Segundos entre revalidaciones de la fuente
+TTL_SEGUNDOS = float(os.environ.get('METAS_TTL', 5 * 60))
+
+# Valores de ``fuente.origen`` (ver ``fuentes.FuenteConRespaldo``) de lecturas que no pasaron por la red
+ORIGENES_LOCALES = ('snapshot', 'snapshot (respaldo)')
+
+
+class ActualizadorDatos:
+    """Mantiene en memoria los datos procesados de una fuente y los revalida según ``ttl``.
+
+    ``procesar`` recibe los bytes crudos y retorna el DataFrame limpio. Las
+    estadísticas permiten ver cuánto tráfico genera cada proceso:
+
+    - ``aciertos``: lecturas servidas desde memoria dentro del TTL.
+    - ``fallos``: veces que hubo que procesar un contenido nuevo (aunque no se pudiera).
+    - ``revalidaciones``: consultas condicionales a la fuente con datos ya cargados.
+    - ``no_modificados``: revalidaciones respondidas sin cambios (304 o equivalente).
+    - ``contenido_igual``: descargas completas cuyo hash coincidía con el anterior.
+    - ``errores``: revalidaciones fallidas (lectura o proceso del contenido nuevo) en que
+      se siguieron sirviendo los datos previos.
+    - ``bytes_transferidos``: total de bytes recibidos de la fuente (no cuenta lo
+      leído del snapshot local en un arranque en frío).
+
+    Con ``compartido`` (un ``compartido.AlmacenCompartido``) los datos procesados
+    se guardan en la caché compartida y se sirven mapeados desde ella; al
+    iniciar se parte de la última versión guardada, que se da por revisada en
+    el momento en que se guardó.
+    """
+
+    def __init__(self, fuente, procesar, ttl=TTL_SEGUNDOS, reloj=time.monotonic, compartido=None):
+        self.fuente = fuente
+        self.procesar = procesar
+        self.ttl = ttl
+        self.reloj = reloj
+
+        self.datos = None
+        self.hash = None
+        self.etag = None
+        self.ultima_modificacion = None
+        self.ultimo_chequeo = None
+        self.ultimo_error = None
+        self.estadisticas = dict.fromkeys(
+            ['aciertos', 'fallos', 'revalidaciones', 'no_modificados',
+             'contenido_igual', 'errores', 'bytes_transferidos'], 0)
+        self._lock = threading.Lock()
+
+        self.compartido = compartido
+        guardado = compartido.cargar() if compartido is not None else None
+        if guardado is not None:
+            self.datos, self.hash = guardado.datos, guardado.huella
+            self.etag, self.ultima_modificacion = guardado.etag, guardado.ultima_modificacion
+            self.ultimo_chequeo = self.reloj() - max(0.0, time.time() - guardado.instante)
+
+    @property
+    def nombre(self):
+        return self.fuente.nombre
+
+    def vigente(self, ahora=None):
+        if self.datos is None or self.ultimo_chequeo is None:
+            return False
+        ahora = self.reloj() if ahora is None else ahora
+        return ahora - self.ultimo_chequeo < self.ttl
+
+    def obtener(self, forzar=False):
+        """Retorna los datos procesados, revalidando la fuente si venció el TTL."""
+        with self._lock:
+            ahora = self.reloj()
+            if not forzar and self.vigente(ahora):
+                self.estadisticas['aciertos'] += 1
+                return self.datos
+            return self._revalidar(ahora)
+
+    def _revalidar(self, ahora):
+        tiene_datos = self.datos is not None
+        if tiene_datos:
+            self.estadisticas['revalidaciones'] += 1
+
+        try:
+            with tramo('fuente') as medida:
+                if tiene_datos:
+                    respuesta = self.fuente.leer_condicional(self.etag, self.ultima_modificacion)
+                else:
+                    respuesta = self.fuente.leer_inicial()
+                medida.bytes = len(respuesta.contenido or b'')
+        except Exception as e:
+            if not tiene_datos:
+                raise
+            # Seguir sirviendo lo que hay y reintentar al próximo vencimiento
+            self.estadisticas['errores'] += 1
+            self.ultimo_error = e
+            self.ultimo_chequeo = ahora
+            return self.datos
+
+        self.ultimo_chequeo = ahora
+        self.ultimo_error = getattr(self.fuente, 'error', None)
+        if respuesta.no_modificado:
+            self.estadisticas['no_modificados'] += 1
+            return self.datos
+
+        if getattr(self.fuente, 'origen', None) not in ORIGENES_LOCALES:
+            self.estadisticas['bytes_transferidos'] += len(respuesta.contenido)
+        huella = hashlib.sha256(respuesta.contenido).hexdigest()
+        if huella == self.hash:
+            self.estadisticas['contenido_igual'] += 1
+        else:
+            self.estadisticas['fallos'] += 1
+            try:
+                datos = self.procesar(respuesta.contenido)
+            except Exception as e:
+                if not tiene_datos:
+                    raise
+                # Contenido nuevo ilegible: se conservan los datos, la huella y los validadores previos
+                self.estadisticas['errores'] += 1
+                self.ultimo_error = e
+                return self.datos
+            if self.compartido is not None:
+                datos = self.compartido.guardar(huella, datos, respuesta.etag, respuesta.ultima_modificacion)
+            self.datos = datos
+            self.hash = huella
+
+        # Los validadores sólo se actualizan una vez procesado el contenido con éxito
+        self.etag = respuesta.etag
+        self.ultima_modificacion = respuesta.ultima_modificacion
+        return self.datos
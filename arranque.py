@@ -0,0 +1,64 @@
+"""Resumen de arranque: lo mínimo para pintar el selector de unidades sin cargar los datos.
+
+Un worker nuevo del dashboard tarda en importar pandas, plotly y pyarrow y en
+cargar la planilla (o mapearla desde ``compartido.py``). Mientras tanto, el
+selector de unidades y las métricas del encabezado se pintan desde
+``RUTA_ARRANQUE``: un JSON pequeño con la lista de unidades y sus métricas,
+escrito cada vez que el dashboard carga un contenido nuevo de la planilla.
+
+Este módulo sólo usa la biblioteca estándar para no retrasar el primer pintado.
+"""
+import json
+import math
+import os
+import time
+from collections import namedtuple
+
+from fuentes import DIRECTORIO_SNAPSHOT
+
+RUTA_ARRANQUE = DIRECTORIO_SNAPSHOT / 'arranque.json'
+
+# Cambia cuando cambia el contenido del archivo; uno de otro formato se ignora
+FORMATO_ARRANQUE = 1
+
+# ``metricas``: unidad -> MetricasUnidad, en el orden de ``unidades``
+ResumenArranque = namedtuple('ResumenArranque', 'huella instante unidades metricas')
+MetricasUnidad = namedtuple('MetricasUnidad', 'indicadores registros cumplimiento_promedio')
+
+
+def cargar_arranque(ruta=RUTA_ARRANQUE):
+    """``ResumenArranque`` guardado o ``None`` si no hay o no se puede leer."""
+    try:
+        contenido = json.loads(ruta.read_text(encoding='utf-8'))
+        if contenido.get('formato') != FORMATO_ARRANQUE:
+            return None
+        metricas = {fila[0]: MetricasUnidad(*fila[1:]) for fila in contenido['unidades']}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return ResumenArranque(contenido['huella'], contenido['instante'], list(metricas), metricas)
+
+
+def resumir_arranque(huella, resumen):
+    """``ResumenArranque`` del contenido ``huella`` a partir de ``nucleo.resumen_unidades``."""
+    metricas = {
+        unidad: MetricasUnidad(int(indicadores), int(registros), None if math.isnan(promedio) else float(promedio))
+        for unidad, indicadores, registros, promedio in zip(
+            resumen['Unidad_Desempeno'], resumen['Indicadores'], resumen['Registros'],
+            resumen['Cumplimiento_Promedio'])
+    }
+    return ResumenArranque(huella, time.time(), list(metricas), metricas)
+
+
+def guardar_arranque(resumen, ruta=RUTA_ARRANQUE):
+    """Escribe ``resumen`` para los próximos arranques; ``False`` si no se pudo escribir."""
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+        temporal.write_text(json.dumps({
+            'formato': FORMATO_ARRANQUE, 'huella': resumen.huella, 'instante': resumen.instante,
+            'unidades': [[unidad, *resumen.metricas[unidad]] for unidad in resumen.unidades],
+        }, ensure_ascii=False), encoding='utf-8')
+        os.replace(temporal, ruta)
+    except OSError:
+        return False
+    return True
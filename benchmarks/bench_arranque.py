@@ -0,0 +1,142 @@
+"""Benchmark del arranque en frío del dashboard: tiempo hasta el primer pintado.
+
+Cada medición corre el script completo (``streamlit.testing``) en un proceso
+Python nuevo, como un worker recién iniciado, y lee del log de tramos
+(``METAS_LOG_TRAMOS``) cuándo terminó el tramo ``primer_pintado`` (selector de
+unidad y métricas del encabezado) y cuánto tomó la ejecución completa.
+Escenarios, según lo que el worker encuentra en disco:
+
+- ``arranque``: resumen de arranque y caché compartida (el caso habitual).
+- ``compartido``: sólo la caché compartida; el selector espera a importar y mapear los datos.
+- ``sin_cache``: nada guardado; además se lee y limpia la planilla.
+
+Los resultados se escriben en JSON y se comparan igual que en ``bench_pipeline.py``:
+
+    python benchmarks/bench_arranque.py --filas 1000 100000 --salida arranque.json
+    python benchmarks/bench_arranque.py --filas 1000 100000 --comparar arranque.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_pipeline import comparar, entorno  # noqa: E402
+from datos_sinteticos import generar_planilla  # noqa: E402
+
+TAMANOS = [1_000, 100_000]
+ESCENARIOS = ['arranque', 'compartido', 'sin_cache']
+
+# Script que corre en el proceso nuevo: el reloj parte antes de importar Streamlit
+_PROCESO = """
+import time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({script!r}, default_timeout=600)
+at.run()
+if at.exception:
+    raise SystemExit(at.exception[0].value)
+print(time.perf_counter() - inicio)
+"""
+
+
+def correr(entorno_proceso):
+    """Una ejecución en frío; retorna (segundos del proceso, ejecución del log de tramos)."""
+    log = Path(entorno_proceso['METAS_LOG_TRAMOS'])
+    log.unlink(missing_ok=True)
+    salida = subprocess.run([sys.executable, '-c', _PROCESO.format(script=str(RAIZ / 'visualizasimula.py'))],
+                            env=entorno_proceso, cwd=RAIZ, capture_output=True, text=True)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip() or salida.stdout.strip())
+    ejecucion = json.loads(log.read_text(encoding='utf-8').splitlines()[-1])
+    return float(salida.stdout.strip().splitlines()[-1]), ejecucion
+
+
+def _fin(ejecucion, nombre):
+    tramo = next((t for t in ejecucion['tramos'] if t['tramo'] == nombre), None)
+    return None if tramo is None else tramo['inicio'] + tramo['segundos']
+
+
+def medir(filas, repeticiones=3, semilla=0):
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        planilla = directorio / 'planilla.csv'
+        planilla.write_bytes(generar_planilla(filas, semilla=semilla))
+        cache = directorio / 'cache'
+        entorno_proceso = {
+            **os.environ,
+            'METAS_FUENTE': f"csv:{planilla}",
+            'METAS_SNAPSHOT_DIR': str(cache),
+            'METAS_CACHE_COMPARTIDO': str(cache / 'compartido'),
+            'METAS_HISTORICO_DB': str(directorio / 'historico.sqlite'),
+            'METAS_LOG_TRAMOS': str(directorio / 'tramos.jsonl'),
+        }
+        entorno_proceso.pop('METAS_ESTABLECIMIENTOS', None)
+        # Una primera ejecución deja el histórico, la caché compartida y el resumen de arranque
+        correr(entorno_proceso)
+
+        preparar = {
+            'arranque': lambda: None,
+            'compartido': lambda: (cache / 'arranque.json').unlink(missing_ok=True),
+            'sin_cache': lambda: shutil.rmtree(cache, ignore_errors=True),
+        }
+        resultados = []
+        for escenario in ESCENARIOS:
+            mediciones = []
+            for _ in range(repeticiones):
+                preparar[escenario]()
+                segundos_proceso, ejecucion = correr(entorno_proceso)
+                mediciones.append((_fin(ejecucion, 'primer_pintado'), ejecucion['segundos'], segundos_proceso,
+                                   _fin(ejecucion, 'carga')))
+            primer_pintado, total, proceso, carga = min(mediciones)
+            resultados.append({
+                'etapa': escenario,
+                'filas': filas,
+                'segundos': primer_pintado,
+                'segundos_ejecucion': total,
+                'segundos_proceso': proceso,
+                'segundos_hasta_datos': carga,
+            })
+        return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', nargs='+', type=int, default=TAMANOS, help="Tamaños de planilla")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior con el que comparar")
+    parser.add_argument('--umbral', type=float, default=1.25,
+                        help="Razón de tiempo sobre la cual se considera regresión (por defecto 1.25)")
+    args = parser.parse_args(argv)
+
+    informe = {'entorno': entorno(), 'resultados': []}
+    print(f"{'escenario':>12} {'filas':>9}  {'1er pintado':>11}  {'datos':>9}  {'ejecución':>9}  {'proceso':>9}")
+    for filas in args.filas:
+        inicio = time.perf_counter()
+        for r in medir(filas, args.repeticiones):
+            informe['resultados'].append(r)
+            print(f"{r['etapa']:>12} {filas:>9}  {r['segundos']:9.3f} s  {r['segundos_hasta_datos']:7.3f} s"
+                  f"  {r['segundos_ejecucion']:7.3f} s  {r['segundos_proceso']:7.3f} s")
+        print(f"{'':>12} {filas:>9}  ({time.perf_counter() - inicio:.0f} s en total)")
+
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding='utf-8'))
+        if comparar(informe, anterior, args.umbral):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Benchmark de la clasificación de Estado y el estilo de la tabla Meta Proyectada.
+
+Compara la versión fila a fila (``apply(axis=1)`` con búsquedas ``.loc`` y
+``highlight_proyeccion`` releyendo el porcentaje formateado) con
+``cumplimiento.clasificar_cumplimiento`` + ``estilo_meta_proyectada``, y
+verifica que ambas den los mismos estados y colores.
+
+    python benchmarks/bench_estado.py --indicadores 1000 10000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cumplimiento import (ESTILOS_ESTADO, clasificar_cumplimiento,  # noqa: E402
+                          estilo_meta_proyectada, tabla_meta_proyectada)
+
+
+def generar(indicadores, semilla=0):
+    rng = np.random.default_rng(semilla)
+    meta = rng.uniform(50, 100, indicadores).round(1)
+    meta[rng.random(indicadores) < 0.1] = np.nan
+    proyeccion = rng.uniform(30, 100, indicadores).round(1)
+    proyeccion[rng.random(indicadores) < 0.1] = np.nan
+    return pd.DataFrame({
+        'Indicador': np.arange(1, indicadores + 1),
+        'Descripcion': 'Indicador de prueba',
+        'Meta_Anual_Display': [f"{m:.1f}%" for m in meta],
+        'Meta_Anual_Valor': meta,
+        'Meta_Anual_Comparable': ~np.isnan(meta) & (rng.random(indicadores) < 0.9),
+        'Promedio_Mensual': proyeccion,
+    })
+
+
+def version_fila(df_editado):
+    """Cálculo original de la pestaña 1: Estado y estilos fila a fila."""
+    df_display = df_editado[['Indicador', 'Descripcion', 'Meta_Anual_Display', 'Promedio_Mensual']].copy()
+    df_display.rename(columns={'Promedio_Mensual': 'Meta Proyectada'}, inplace=True)
+    df_display['Meta Proyectada'] = df_display['Meta Proyectada'].apply(
+        lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A"
+    )
+    df_display['Estado'] = df_display.apply(
+        lambda row: 'Cumple ✅' if (df_editado.loc[row.name, 'Meta_Anual_Comparable'] and
+                                   pd.notna(df_editado.loc[row.name, 'Promedio_Mensual']) and
+                                   pd.notna(df_editado.loc[row.name, 'Meta_Anual_Valor']) and
+                                   df_editado.loc[row.name, 'Promedio_Mensual'] >= df_editado.loc[row.name, 'Meta_Anual_Valor'])
+                    else ('No Cumple ❌' if (df_editado.loc[row.name, 'Meta_Anual_Comparable'] and
+                                           pd.notna(df_editado.loc[row.name, 'Promedio_Mensual']) and
+                                           pd.notna(df_editado.loc[row.name, 'Meta_Anual_Valor']))
+                    else 'No Aplica 🔄'),
+        axis=1
+    )
+
+    def highlight_proyeccion(row):
+        try:
+            meta_proyectada_val = float(row['Meta Proyectada'].replace('%', '')) if row['Meta Proyectada'] != 'N/A' else None
+        except:
+            meta_proyectada_val = None
+        meta_anual = df_editado.loc[row.name, 'Meta_Anual_Valor']
+        es_comparable = df_editado.loc[row.name, 'Meta_Anual_Comparable']
+        styles = [''] * len(row)
+        meta_idx = row.index.get_loc('Meta Proyectada')
+        if es_comparable and pd.notna(meta_proyectada_val) and pd.notna(meta_anual):
+            if meta_proyectada_val >= meta_anual:
+                styles[meta_idx] = ESTILOS_ESTADO['Cumple ✅']
+            else:
+                styles[meta_idx] = ESTILOS_ESTADO['No Cumple ❌']
+        else:
+            styles[meta_idx] = ESTILOS_ESTADO['No Aplica 🔄']
+        return styles
+
+    estilos = df_display.apply(highlight_proyeccion, axis=1, result_type='expand')
+    return df_display, estilos[df_display.columns.get_loc('Meta Proyectada')].tolist()
+
+
+def version_vectorizada(df_editado):
+    estado = clasificar_cumplimiento(df_editado['Promedio_Mensual'], df_editado['Meta_Anual_Valor'],
+                                     df_editado['Meta_Anual_Comparable'])
+    tabla = tabla_meta_proyectada(df_editado, df_editado['Promedio_Mensual'], estado)
+    estilo = estilo_meta_proyectada(tabla)
+    # Mismo trabajo que hace el Styler al renderizar: evaluar la función de estilo
+    estilos = estilo.data['Estado'].map(ESTILOS_ESTADO).tolist()
+    return tabla, estilos
+
+
+def medir(funcion, df, repeticiones=3):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(df)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--indicadores', nargs='+', type=int, default=[1_000, 10_000],
+                        help="Tamaños de la tabla Meta Proyectada")
+    args = parser.parse_args(argv)
+
+    for indicadores in args.indicadores:
+        df = generar(indicadores)
+        tabla_fila, estilos_fila = version_fila(df)
+        tabla_vector, estilos_vector = version_vectorizada(df)
+        assert tabla_fila['Estado'].tolist() == tabla_vector['Estado'].tolist()
+        assert tabla_fila['Meta Proyectada'].tolist() == tabla_vector['Meta Proyectada'].tolist()
+        assert estilos_fila == estilos_vector
+
+        t_fila = medir(version_fila, df)
+        t_vector = medir(version_vectorizada, df)
+        print(f"{indicadores:>8} indicadores  fila a fila {t_fila:8.3f} s  vectorizado {t_vector:8.4f} s  "
+              f"x{t_fila / t_vector:6.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark del histórico multianual (``historico.AlmacenHistorico``).
+
+Ingresa varios años de planillas sintéticas, reingresa el último con pocos
+cambios (sólo deben escribirse esas filas) y mide la lectura de un año
+completo y de una unidad con todos sus años.
+
+    python benchmarks/bench_historico.py --filas 10000 --anios 5
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from datos_sinteticos import generar_planilla  # noqa: E402
+from historico import AlmacenHistorico  # noqa: E402
+from nucleo import limpiar_datos  # noqa: E402
+
+
+def cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=10_000, help="Filas de cada planilla anual")
+    parser.add_argument('--anios', type=int, default=5, help="Años a ingresar, desde 2020")
+    args = parser.parse_args(argv)
+    filas, anios = args.filas, args.anios
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = Path(directorio) / 'historico.sqlite'
+        almacen = AlmacenHistorico(ruta)
+        ultimo = 2020 + anios - 1
+        for anio in range(2020, ultimo + 1):
+            df = limpiar_datos(generar_planilla(filas, semilla=anio))
+            escritas, segundos = cronometrar(almacen.ingresar, df, anio)
+            print(f"ingesta {anio}: {escritas:>8} filas escritas en {segundos:7.3f} s")
+
+        df.loc[df.index[:50], 'Marzo'] = 1.0
+        escritas, segundos = cronometrar(almacen.ingresar, df, ultimo)
+        assert escritas <= 50
+        print(f"reingesta {ultimo} con 50 celdas editadas: {escritas} filas escritas en {segundos:.3f} s")
+        escritas, segundos = cronometrar(almacen.ingresar, df, ultimo)
+        assert escritas == 0
+        print(f"reingesta sin cambios: {segundos:.3f} s")
+
+        anio_df, segundos = cronometrar(almacen.cargar_anio, ultimo)
+        print(f"cargar_anio({ultimo}): {len(anio_df)} indicadores en {segundos:.3f} s")
+        unidad = df['Unidad_Desempeno'].iloc[0]
+        unidad_df, segundos = cronometrar(almacen.cargar_unidad, unidad)
+        print(f"cargar_unidad: {len(unidad_df)} filas ({anios} años) en {segundos:.4f} s")
+        # En modo WAL lo escrito sigue en ``-wal`` hasta el checkpoint
+        with sqlite3.connect(ruta) as conexion:
+            conexion.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        print(f"tamaño del archivo: {ruta.stat().st_size / 2**20:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
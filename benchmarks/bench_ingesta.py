@@ -0,0 +1,63 @@
+"""Lectura por bloques de ``ingesta.leer_planilla`` y encabezados que no son los habituales.
+
+Antes de medir verifica que las variantes de encabezado den el mismo
+resultado que la planilla con sus encabezados habituales:
+
+- meses abreviados ("Ene", "Feb", ...) con 20 columnas: se leen por posición;
+- sin la columna Fórmula: se completa vacía y se informa en ``columnas_faltantes``.
+
+    python benchmarks/bench_ingesta.py --filas 10000 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from datos_sinteticos import generar_dataframe, generar_planilla  # noqa: E402
+from ingesta import leer_planilla  # noqa: E402
+
+MESES_ABREVIADOS = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+
+def _csv(df):
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def verificar(filas=500):
+    original = generar_dataframe(filas)
+    referencia = leer_planilla(_csv(original))
+    assert referencia.columnas_faltantes == []
+
+    abreviados = leer_planilla(_csv(original.set_axis(list(original.columns[:8]) + MESES_ABREVIADOS, axis=1)))
+    assert abreviados.columnas_faltantes == []
+    pd.testing.assert_frame_equal(abreviados.df, referencia.df)
+
+    # 19 columnas: se ubican por encabezado y la que falta se completa vacía
+    sin_formula = leer_planilla(_csv(original.drop(columns='Fórmula')))
+    assert sin_formula.columnas_faltantes == ['Formula']
+    assert sin_formula.df['Formula'].isna().all()
+    pd.testing.assert_frame_equal(sin_formula.df.drop(columns='Formula'), referencia.df.drop(columns='Formula'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', nargs='+', type=int, default=[10_000, 100_000], help="Tamaños de planilla")
+    args = parser.parse_args(argv)
+
+    verificar()
+    for filas in args.filas:
+        contenido = generar_planilla(filas)
+        inicio = time.perf_counter()
+        lectura = leer_planilla(contenido)
+        duracion = time.perf_counter() - inicio
+        print(f"{filas:>9} filas  {duracion:7.3f} s  {len(lectura.df):>9} limpias  "
+              f"{len(lectura.cuarentena):>6} en cuarentena")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Micro-benchmark de ``limpieza.procesar_meta_anual`` contra la versión fila a fila.
+
+Verifica además que ambas produzcan exactamente las mismas columnas (salida
+de referencia) antes de medir.
+
+    python benchmarks/bench_meta_anual.py --filas 10000 100000
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from limpieza import procesar_meta_anual  # noqa: E402
+
+# Casos observados en la planilla: ≥ con y sin mojibake, comas decimales, %, glosas y vacíos
+CASOS = [
+    'â‰¥90%', '≥ 0,9', '95%', '0,85', '1', '0', '85', '≥75,5%', 'â‰¥0,6', 'N/A', '', 'nan',
+    'Mantener línea base', '≥', '%', 'Sobre 80%', '100 %', '1,5', '-0,2', '1e-1', '.5', '5.',
+    '  0,70  ', 'inf', '≥≥0,5', '90%, 95%', '≥ 100%',
+]
+
+
+def procesar_meta_anual_fila(meta_str):
+    """Versión original (fila a fila) usada como referencia."""
+    meta_str = str(meta_str).strip()
+    meta_str = meta_str.replace('â‰¥', '≥')
+    meta_str_para_conversion = meta_str.replace(',', '.')
+    tiene_mayor_igual = '≥' in meta_str
+    meta_limpia = meta_str_para_conversion.replace('≥', '').strip()
+    if '%' in meta_limpia:
+        match = re.search(r'(\d+\.?\d*)%', meta_limpia)
+        if match:
+            valor_porcentaje = float(match.group(1))
+        else:
+            return pd.Series([meta_str, None, False])
+    else:
+        try:
+            valor_numerico = float(meta_limpia)
+            if 0 < valor_numerico <= 1:
+                valor_porcentaje = valor_numerico * 100
+            else:
+                valor_porcentaje = valor_numerico
+        except:
+            return pd.Series([meta_str, None, False])
+    if tiene_mayor_igual:
+        display = f"≥{valor_porcentaje:.1f}%"
+    else:
+        display = f"{valor_porcentaje:.1f}%"
+    return pd.Series([display, valor_porcentaje, True])
+
+
+def generar(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.Series(rng.choice(np.array(CASOS, dtype=object), size=filas))
+
+
+def comparar(serie):
+    esperado = serie.apply(procesar_meta_anual_fila)
+    esperado.columns = ['Meta_Anual_Display', 'Meta_Anual_Valor', 'Meta_Anual_Comparable']
+    obtenido = procesar_meta_anual(serie)
+    assert obtenido['Meta_Anual_Display'].tolist() == esperado['Meta_Anual_Display'].tolist()
+    np.testing.assert_array_equal(obtenido['Meta_Anual_Valor'].to_numpy(dtype=float),
+                                  esperado['Meta_Anual_Valor'].to_numpy(dtype=float))
+    assert obtenido['Meta_Anual_Comparable'].tolist() == esperado['Meta_Anual_Comparable'].astype(bool).tolist()
+
+
+def medir(funcion, repeticiones=3):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', nargs='+', type=int, default=[10_000, 100_000], help="Tamaños de la serie")
+    args = parser.parse_args(argv)
+
+    comparar(pd.Series(CASOS))
+    for filas in args.filas:
+        serie = generar(filas)
+        comparar(serie)
+        t_fila = medir(lambda: serie.apply(procesar_meta_anual_fila), repeticiones=1)
+        t_vector = medir(lambda: procesar_meta_anual(serie))
+        print(f"{filas:>8} filas  fila a fila {t_fila:8.3f} s  vectorizado {t_vector:8.4f} s  "
+              f"x{t_fila / t_vector:6.1f}")
+
+
+if __name__ == '__main__':
+    main()
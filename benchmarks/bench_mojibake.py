@@ -0,0 +1,128 @@
+"""Tiempo y memoria máxima de la reparación de mojibake, antes y después.
+
+Compara la cascada original de ``str.replace`` (12 reemplazos por columna)
+con ``limpieza.reparar_mojibake`` sobre las seis columnas de texto.
+
+    python benchmarks/bench_mojibake.py --filas 10000 100000
+
+Antes de medir verifica ``TABLA_MOJIBAKE`` con secuencias conocidas y que
+``reparar_mojibake`` dé lo mismo que la cascada salvo donde la cascada se
+equivocaba (p. ej. "Ã‘", que quedaba como "í‘" en vez de "Ñ").
+
+Cada medición corre en un proceso nuevo. La memoria es el pico de RSS sobre
+el de partida (con los datos ya generados), de modo que incluye los buffers
+de Arrow de las cadenas de pandas >= 3, que ``tracemalloc`` no ve (ver
+``memoria.py``; sólo Linux).
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ingesta import COLUMNAS_TEXTO  # noqa: E402
+from limpieza import TABLA_MOJIBAKE, reparar_mojibake  # noqa: E402
+from memoria import en_proceso_nuevo, pico_rss  # noqa: E402
+
+VALORES = {
+    'Unidad_Desempeno': ['Unidad de AtenciÃ³n Abierta', 'Servicio de Urgencia', 'PabellÃ³n', 'CESFAM Ã‘uble'],
+    'Descripcion': ['Porcentaje de pacientes con Ã¡rea {}', 'Ã\x8dndice de satisfacciÃ³n {}',
+                    'Tasa de reclamos respondidos {}', 'DÃ\xadas de espera NÂ° {}'],
+    'Formula': ['NÂ° atendidos / NÂ° total', '(A/B)*100', 'NÃºmero de egresos'],
+    'Tipo': ['Calidad', 'GestiÃ³n', 'Eficiencia'],
+    'Periodicidad': ['Mensual', 'Trimestral', 'Semestral', 'Anual'],
+    'Meta_Anual': ['â‰¥90%', '0,85', 'â‰¤ 5%', 'Mantener lÃ\xadnea base', '95%'],
+}
+
+# Secuencia -> carácter esperado
+CONOCIDAS = {'Ã¡': 'á', 'Ã\x8d': 'Í', 'Ã‘': 'Ñ', 'â‰¥': '≥', 'â‰¤': '≤', 'Ã³': 'ó', 'Â°': '°'}
+
+# Texto ya correcto: no debe cambiar
+LIMPIOS = ['Índice de satisfacción ≥ 90%', 'CESFAM Ñuble', 'Días de espera N° 3', 'Mantener línea base', '']
+
+# Secuencias que la cascada reparaba mal; sólo las celdas que las contienen pueden diferir
+MAL_REPARADAS_EN_CASCADA = ['Ã‘']
+
+
+def cascada_original(serie):
+    """Reemplazos encadenados tal como estaban en ``cargar_datos``."""
+    serie = serie.astype(str)
+    return serie.str.replace('Ã¡', 'á').str.replace('Ã©', 'é').str.replace('Ã\xad', 'í')\
+                .str.replace('Ã³', 'ó').str.replace('Ãº', 'ú').str.replace('Ã±', 'ñ')\
+                .str.replace('Ã\x8d', 'Í').str.replace('Ã“', 'Ó')\
+                .str.replace('â‰¥', '≥').str.replace('â‰¤', '≤')\
+                .str.replace('Ã', 'í').str.replace('Â', '')
+
+
+def generar(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    datos = {}
+    for columna, valores in VALORES.items():
+        elegidos = rng.choice(np.array(valores, dtype=object), size=filas)
+        if columna == 'Descripcion':
+            # Descripciones casi únicas, como en la planilla real
+            elegidos = [plantilla.format(i % 500) for i, plantilla in enumerate(elegidos)]
+        datos[columna] = elegidos
+    return pd.DataFrame(datos)
+
+
+def verificar(filas=2_000):
+    for secuencia, caracter in CONOCIDAS.items():
+        assert TABLA_MOJIBAKE[secuencia] == caracter, secuencia
+        reparado = reparar_mojibake(pd.Series([f"a{secuencia}b"])).iloc[0]
+        assert reparado == f"a{caracter}b", (secuencia, reparado)
+    limpios = pd.Series(LIMPIOS)
+    pd.testing.assert_series_equal(reparar_mojibake(limpios), limpios.astype(str))
+
+    df = generar(filas)
+    for columna in COLUMNAS_TEXTO:
+        antes, despues = cascada_original(df[columna]), reparar_mojibake(df[columna])
+        mal_reparadas = df[columna].str.contains('|'.join(MAL_REPARADAS_EN_CASCADA))
+        distintos = antes != despues
+        assert not (distintos & ~mal_reparadas).any(), df[columna][distintos & ~mal_reparadas].iloc[0]
+        assert not despues.str.contains('Ã|Â').any(), columna
+
+
+def _reparar_columnas(funcion, df):
+    inicio = time.perf_counter()
+    resultado = {columna: funcion(df[columna]) for columna in COLUMNAS_TEXTO}
+    duracion = time.perf_counter() - inicio
+    del resultado
+    return duracion
+
+
+def _medir_en_proceso(nombre, filas):
+    df = generar(filas)
+    funcion = {'cascada': cascada_original, 'una pasada': reparar_mojibake}[nombre]
+    return pico_rss(_reparar_columnas, funcion, df)
+
+
+def medir(nombre, filas):
+    """(segundos, bytes de pico sobre el RSS de partida) en un proceso nuevo."""
+    return en_proceso_nuevo(_medir_en_proceso, nombre, filas)
+
+
+def _mib(bytes_):
+    return '    n/d' if bytes_ is None else f"{bytes_ / 2**20:7.1f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', nargs='+', type=int, default=[10_000, 100_000], help="Tamaños de la planilla")
+    args = parser.parse_args(argv)
+
+    verificar()
+    for filas in args.filas:
+        t_antes, m_antes = medir('cascada', filas)
+        t_despues, m_despues = medir('una pasada', filas)
+        print(f"{filas:>8} filas  cascada {t_antes:7.3f} s / {_mib(m_antes)} MiB  "
+              f"una pasada {t_despues:7.3f} s / {_mib(m_despues)} MiB")
+
+
+if __name__ == '__main__':
+    main()
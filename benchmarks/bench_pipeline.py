@@ -0,0 +1,232 @@
+"""Benchmark de las etapas del dashboard sobre planillas sintéticas.
+
+Mide tiempo (mejor de N repeticiones) y memoria pico de cada etapa, en
+pasadas aparte para no distorsionar el tiempo:
+
+- ``memoria_rss_mb``: pico de RSS de la etapa en un proceso nuevo (ver
+  ``memoria.py``), que incluye los buffers de Arrow de las cadenas de pandas >= 3.
+- ``memoria_python_mb``: pico de ``tracemalloc`` (sólo lo que reserva Python).
+
+Las etapas son:
+
+- ``limpieza``: bytes del CSV -> DataFrame limpio (``nucleo.limpiar_datos``).
+- ``indice``: construcción de ``IndiceUnidades``.
+- ``filtro_unidad``: ``IndiceUnidades.frame`` de una unidad (promedio por unidad).
+- ``meta_proyectada``: ``SimulacionUnidad`` + tabla Meta Proyectada/Estado de una unidad.
+- ``estadisticas``: pestaña Estadísticas de una unidad (``estadisticas_mensuales``).
+- ``proyecciones_total``: Meta Proyectada y Estado de todas las unidades (``lote.py``).
+- ``comparacion_unidades``: bandas entre unidades y su figura (pestaña Comparación).
+- ``calidad``: marcas de calidad de todas las celdas y su reporte (``calidad.py``).
+
+Los resultados se escriben en JSON para comparar entre commits (tiempo y
+memoria RSS; es regresión lo que crezca más de ``--umbral``):
+
+    python benchmarks/bench_pipeline.py --filas 100 10000 100000 --salida base.json
+    python benchmarks/bench_pipeline.py --filas 100 10000 100000 --comparar base.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from calidad import marcar_datos, reporte_calidad  # noqa: E402
+from comparacion import comparar_unidades  # noqa: E402
+from cumplimiento import tabla_meta_proyectada  # noqa: E402
+from datos_sinteticos import generar_planilla  # noqa: E402
+from graficos import figura_bandas  # noqa: E402
+from indice import IndiceUnidades  # noqa: E402
+from memoria import en_proceso_nuevo, pico_rss  # noqa: E402
+from nucleo import estadisticas_mensuales, limpiar_datos, reporte_proyecciones  # noqa: E402
+from simulacion import SimulacionUnidad  # noqa: E402
+
+TAMANOS = [100, 1_000, 10_000, 100_000]
+
+# Unidades recorridas en las etapas por unidad (las más grandes primero)
+UNIDADES_MUESTRA = 20
+
+# Bajo este pico (en MB) la memoria no se compara: el ruido del RSS pesa más que la etapa
+MEMORIA_MINIMA_MB = 1.0
+
+
+def _etapas(contenido):
+    """Etapas en orden; cada una recibe el estado acumulado y retorna (resultado, filas procesadas)."""
+    def limpieza(estado):
+        estado['df'] = limpiar_datos(contenido)
+        return len(estado['df'])
+
+    def indice(estado):
+        estado['indice'] = IndiceUnidades(estado['df'])
+        conteos = estado['df']['Unidad_Desempeno'].value_counts()
+        estado['muestra'] = conteos.index[:UNIDADES_MUESTRA].tolist()
+        return len(estado['df'])
+
+    def filtro_unidad(estado):
+        estado['frames'] = [estado['indice'].frame(u) for u in estado['muestra']]
+        return sum(len(f) for f in estado['frames'])
+
+    def meta_proyectada(estado):
+        for frame in estado['frames']:
+            simulacion = SimulacionUnidad(frame)
+            tabla_meta_proyectada(simulacion.df, simulacion.proyeccion, simulacion.estado)
+        return sum(len(f) for f in estado['frames'])
+
+    def estadisticas(estado):
+        for frame in estado['frames']:
+            estadisticas_mensuales(frame)
+        return sum(len(f) for f in estado['frames'])
+
+    def proyecciones_total(estado):
+        reporte_proyecciones(estado['df'])
+        return len(estado['df'])
+
+    def comparacion_unidades(estado):
+        comparacion = comparar_unidades(estado['df'])
+        figura_bandas(comparacion.bandas, fondo=comparacion.fondo).to_json()
+        return len(estado['df'])
+
+    def calidad(estado):
+        reporte_calidad(estado['df'], marcar_datos(estado['df']))
+        return len(estado['df'])
+
+    return [limpieza, indice, filtro_unidad, meta_proyectada, estadisticas, proyecciones_total,
+            comparacion_unidades, calidad]
+
+
+def _pico_rss_etapa(filas, semilla, posicion):
+    """Pico de RSS de la etapa ``posicion``, con las anteriores ya corridas (en un proceso nuevo)."""
+    etapas = _etapas(generar_planilla(filas, semilla=semilla))
+    estado = {}
+    for etapa in etapas[:posicion]:
+        etapa(estado)
+    return pico_rss(etapas[posicion], estado)[1]
+
+
+def medir(filas, repeticiones=3, semilla=0):
+    contenido = generar_planilla(filas, semilla=semilla)
+    etapas = _etapas(contenido)
+    tiempos = {etapa.__name__: [] for etapa in etapas}
+    procesadas = {}
+
+    for _ in range(repeticiones):
+        estado = {}
+        for etapa in etapas:
+            inicio = time.perf_counter()
+            procesadas[etapa.__name__] = etapa(estado)
+            tiempos[etapa.__name__].append(time.perf_counter() - inicio)
+
+    # Memoria pico de cada etapa, en pasadas aparte
+    picos_python = {}
+    estado = {}
+    for etapa in etapas:
+        tracemalloc.start()
+        etapa(estado)
+        picos_python[etapa.__name__] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    picos_rss = {etapa.__name__: en_proceso_nuevo(_pico_rss_etapa, filas, semilla, posicion)
+                 for posicion, etapa in enumerate(etapas)}
+
+    unidades = len(estado['muestra'])
+    resultados = []
+    for etapa in etapas:
+        nombre = etapa.__name__
+        segundos = min(tiempos[nombre])
+        por_unidad = nombre in ('filtro_unidad', 'meta_proyectada', 'estadisticas')
+        resultados.append({
+            'etapa': nombre,
+            'filas': filas,
+            'bytes_csv': len(contenido),
+            'filas_procesadas': procesadas[nombre],
+            'segundos': segundos,
+            'segundos_por_unidad': segundos / unidades if por_unidad and unidades else None,
+            'filas_por_segundo': procesadas[nombre] / segundos if segundos else None,
+            'memoria_rss_mb': None if picos_rss[nombre] is None else picos_rss[nombre] / 2**20,
+            'memoria_python_mb': picos_python[nombre] / 2**20,
+        })
+    return resultados
+
+
+def entorno():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'maquina': platform.machine(),
+    }
+
+
+def comparar(actual, anterior, umbral):
+    """Imprime la razón actual/anterior por etapa y tamaño; retorna las regresiones sobre ``umbral``.
+
+    La memoria se compara sólo si ambas corridas tienen ``memoria_rss_mb``
+    (las anteriores a esta medición guardaban sólo ``tracemalloc``) y el pico
+    anterior llega a ``MEMORIA_MINIMA_MB``.
+    """
+    previos = {(r['etapa'], r['filas']): r for r in anterior['resultados']}
+    regresiones = []
+    print(f"\nComparación con {anterior['entorno'].get('commit')}:")
+    for r in actual['resultados']:
+        previo = previos.get((r['etapa'], r['filas']))
+        if previo is None:
+            continue
+        for medida, unidad in (('segundos', 's'), ('memoria_rss_mb', 'MB')):
+            minimo = MEMORIA_MINIMA_MB if unidad == 'MB' else 0
+            if not previo.get(medida) or previo[medida] < minimo or r.get(medida) is None:
+                continue
+            razon = r[medida] / previo[medida]
+            marca = '  <-- regresión' if razon > umbral else ''
+            print(f"{r['etapa']:>20} {r['filas']:>9}  {previo[medida]:9.4f} {unidad} -> {r[medida]:9.4f} {unidad}"
+                  f"  x{razon:5.2f}{marca}")
+            if razon > umbral:
+                regresiones.append((r['etapa'], r['filas'], medida, razon))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', nargs='+', type=int, default=TAMANOS, help="Tamaños de planilla (hasta 1000000)")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior con el que comparar")
+    parser.add_argument('--umbral', type=float, default=1.25,
+                        help="Razón de tiempo o memoria sobre la cual se considera regresión (por defecto 1.25)")
+    args = parser.parse_args(argv)
+
+    informe = {'entorno': entorno(), 'resultados': []}
+    for filas in args.filas:
+        for r in medir(filas, args.repeticiones):
+            informe['resultados'].append(r)
+            rss = 'n/d' if r['memoria_rss_mb'] is None else f"{r['memoria_rss_mb']:.1f}"
+            print(f"{r['etapa']:>20} {filas:>9} filas  {r['segundos']:9.4f} s  {rss:>9} MB RSS  "
+                  f"{r['memoria_python_mb']:9.1f} MB Python")
+
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding='utf-8'))
+        if comparar(informe, anterior, args.umbral):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
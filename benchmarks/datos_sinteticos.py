@@ -0,0 +1,96 @@
+"""Planilla sintética con la misma forma que la publicada en Google Sheets.
+
+Genera los bytes de un CSV de 20 columnas como los que recibe
+``nucleo.limpiar_datos``: comas decimales, metas con ``≥`` (con y sin
+mojibake), glosas, textos con mojibake UTF-8/Latin-1, meses sin dato y filas
+vacías. Escala de cientos a millones de filas generando por columnas.
+
+    python benchmarks/datos_sinteticos.py 100000 > /tmp/metas_100k.csv
+"""
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+ENCABEZADO = ['Unidad de Desempeño', 'N°', 'Descripción', 'Fórmula', 'Tipo', 'Periodicidad',
+              'Meta Anual', 'Ponderación', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+              'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+AREAS = ['Atención Abierta', 'Atención Cerrada', 'Farmacia', 'Imagenología', 'Laboratorio Clínico',
+         'Pabellón', 'Urgencia', 'Gestión de Camas', 'Esterilización', 'Alimentación']
+DESCRIPCIONES = ['Porcentaje de pacientes atendidos en área', 'Cumplimiento de protocolo de higiene de manos',
+                 'Recetas despachadas en forma íntegra', 'Exámenes informados dentro del plazo',
+                 'Reclamos respondidos en plazo legal', 'Egresos con epicrisis entregada']
+FORMULAS = ['N° atendidos / N° total', 'N° cumplidos / N° evaluados', 'N° despachadas / N° emitidas',
+            'Actividades realizadas']
+TIPOS = ['Calidad', 'Eficiencia', 'Oportunidad', 'Proceso']
+PERIODICIDADES = ['Mensual', 'Trimestral', 'Semestral', 'Anual']
+METAS = ['â‰¥90%', '≥ 0,9', '95%', '0,85', '1', '85', '≥75,5%', 'â‰¥0,6', '100%', '0,7',
+         'N/A', 'Mantener línea base', 'Sobre 80%']
+
+
+# "0,000" ... "1,000": formatear por tabla es mucho más rápido que np.char.mod en millones de celdas
+_TEXTO_MILESIMAS = np.array([f"{k / 1000:.3f}".replace('.', ',') for k in range(1001)], dtype=object)
+
+
+def _mojibake(texto):
+    return texto.encode('utf-8').decode('latin-1')
+
+
+def generar_dataframe(filas, semilla=0, unidades=None, indicadores_por_unidad=6,
+                      prob_mojibake=0.5, prob_vacio=0.2, prob_fila_vacia=0.01):
+    """DataFrame de texto (todas las celdas ``str``) con ``filas`` filas de planilla."""
+    rng = np.random.default_rng(semilla)
+    unidades = unidades or max(1, min(filas // indicadores_por_unidad, 5000))
+
+    nombres = np.array([f"Unidad de {AREAS[i % len(AREAS)]} {i // len(AREAS) + 1}" for i in range(unidades)],
+                       dtype=object)
+    con_mojibake = rng.random(unidades) < prob_mojibake
+    nombres = np.where(con_mojibake, [_mojibake(n) for n in nombres], nombres)
+
+    # Filas agrupadas por unidad, como en la planilla
+    unidad = np.sort(rng.integers(0, unidades, filas))
+    inicio = np.searchsorted(unidad, unidad, side='left')
+    numero = np.arange(filas) - inicio + 1
+
+    descripcion_base = rng.integers(0, len(DESCRIPCIONES), filas)
+    descripciones = np.array(DESCRIPCIONES, dtype=object)
+    descripciones = np.where(con_mojibake[unidad],
+                             np.array([_mojibake(d) for d in DESCRIPCIONES], dtype=object)[descripcion_base],
+                             descripciones[descripcion_base])
+
+    df = pd.DataFrame({
+        ENCABEZADO[0]: nombres[unidad],
+        ENCABEZADO[1]: numero.astype(str),
+        ENCABEZADO[2]: descripciones,
+        ENCABEZADO[3]: np.array(FORMULAS, dtype=object)[rng.integers(0, len(FORMULAS), filas)],
+        ENCABEZADO[4]: np.array(TIPOS, dtype=object)[rng.integers(0, len(TIPOS), filas)],
+        ENCABEZADO[5]: np.array(PERIODICIDADES, dtype=object)[rng.integers(0, len(PERIODICIDADES), filas)],
+        ENCABEZADO[6]: np.array(METAS, dtype=object)[rng.integers(0, len(METAS), filas)],
+        ENCABEZADO[7]: np.char.replace(rng.choice([0.05, 0.1, 0.15, 0.2], filas).astype(str), '.', ','),
+    })
+
+    # Meses como fracción con coma decimal ("0,873"); vacíos = meses sin dato
+    milesimas = rng.integers(300, 1001, (filas, 12))
+    texto = _TEXTO_MILESIMAS[milesimas]
+    texto[rng.random((filas, 12)) < prob_vacio] = ''
+    for j, mes in enumerate(ENCABEZADO[8:]):
+        df[mes] = texto[:, j]
+
+    # Filas vacías intercaladas (se descartan en la limpieza)
+    vacias = rng.random(filas) < prob_fila_vacia
+    df.loc[vacias, :] = ''
+    return df
+
+
+def generar_planilla(filas, semilla=0, **opciones):
+    """Bytes del CSV (UTF-8) con ``filas`` filas, listos para ``limpiar_datos``."""
+    buffer = io.StringIO()
+    generar_dataframe(filas, semilla=semilla, **opciones).to_csv(buffer, index=False)
+    return buffer.getvalue().encode('utf-8')
+
+
+if __name__ == '__main__':
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    sys.stdout.buffer.write(generar_planilla(filas))
@@ -0,0 +1,40 @@
+"""Memoria pico de un paso, medida como RSS en un proceso nuevo.
+
+``tracemalloc`` sólo ve lo que reserva Python: no cuenta los buffers de Arrow
+de las cadenas de pandas >= 3 ni los de numpy fuera de su asignador. Aquí se
+mide el pico de RSS (``VmHWM``) sobre el RSS de partida, tras reiniciar el pico
+con ``/proc/self/clear_refs``; sólo en Linux (en otros sistemas retorna None).
+"""
+import gc
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+_STATUS = Path('/proc/self/status')
+_CLEAR_REFS = Path('/proc/self/clear_refs')
+
+
+def disponible():
+    return _STATUS.exists() and _CLEAR_REFS.exists()
+
+
+def _kib(campo):
+    return int(re.search(rf'{campo}:\s+(\d+) kB', _STATUS.read_text()).group(1))
+
+
+def pico_rss(funcion, *args):
+    """(resultado de ``funcion(*args)``, bytes de pico de RSS sobre el de partida o None)."""
+    if not disponible():
+        return funcion(*args), None
+    gc.collect()
+    _CLEAR_REFS.write_text('5')  # VmHWM vuelve al RSS actual
+    base = _kib('VmRSS')
+    resultado = funcion(*args)
+    return resultado, (_kib('VmHWM') - base) * 1024
+
+
+def en_proceso_nuevo(funcion, *args):
+    """``funcion(*args)`` en un proceso recién creado (``spawn``); ``funcion`` debe ser importable."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as proceso:
+        return proceso.submit(funcion, *args).result()
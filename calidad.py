@@ -0,0 +1,170 @@
+"""Control de calidad de las series mensuales, sobre toda la planilla a la vez.
+
+Cada celda mensual recibe una marca de bits (``uint8``, filas x 12) con los
+problemas detectados; todo se calcula con operaciones sobre la matriz completa
+de meses, sin recorrer filas:
+
+- ``FUERA_DE_RANGO``: valor menor que 0% o mayor que 100%.
+- ``ESCALA``: valor que parece haber sido multiplicado por 100 dos veces (la
+  planilla ya lo traía en porcentaje): todo el indicador está sobre 100%, o el
+  mes es varias decenas de veces la mediana de sus otros meses.
+- ``MES_FALTANTE``: falta un mes que la ``Periodicidad`` exige, antes del
+  último mes informado.
+- ``ATIPICO``: puntaje z robusto (mediana y MAD del indicador) mayor que
+  ``UMBRAL_Z_ROBUSTO``.
+
+Las marcas se calculan una vez por carga (``nucleo.construir_datos``) y viajan
+con los datos, también en la caché compartida.
+"""
+import unicodedata
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from limpieza import MESES
+
+FUERA_DE_RANGO = 1
+ESCALA = 2
+MES_FALTANTE = 4
+ATIPICO = 8
+
+PROBLEMAS = {
+    FUERA_DE_RANGO: 'Fuera de rango (menor que 0% o mayor que 100%)',
+    ESCALA: 'Escala inconsistente (porcentaje multiplicado dos veces)',
+    MES_FALTANTE: 'Mes faltante según la periodicidad',
+    ATIPICO: 'Valor atípico (z robusto)',
+}
+
+# Textos breves para la columna "Calidad" del editor
+PROBLEMAS_CORTOS = {
+    FUERA_DE_RANGO: 'fuera de rango',
+    ESCALA: 'escala',
+    MES_FALTANTE: 'falta',
+    ATIPICO: 'atípico',
+}
+
+LIMITE_INFERIOR = 0.0
+LIMITE_SUPERIOR = 100.0
+
+# Un valor ya en porcentaje (p. ej. "87") queda en 8700 tras la conversión: hasta 100 x 100
+LIMITE_DOBLE_ESCALA = LIMITE_SUPERIOR * 100
+# Veces la mediana del indicador desde las que un mes sobre 100% se considera doblemente escalado
+FACTOR_ESCALA = 20
+
+UMBRAL_Z_ROBUSTO = 3.5
+# Meses con dato necesarios para estimar mediana y MAD del indicador
+MIN_MESES_ATIPICO = 4
+
+# Meses (1 a 12) en que se informa cada periodicidad (texto normalizado)
+MESES_POR_PERIODICIDAD = {
+    'mensual': range(1, 13),
+    'bimestral': range(2, 13, 2),
+    'trimestral': range(3, 13, 3),
+    'cuatrimestral': range(4, 13, 4),
+    'semestral': (6, 12),
+    'anual': (12,),
+}
+
+
+def meses_esperados(periodicidad, meses=MESES):
+    """Matriz booleana (filas x meses) de los meses que cada fila debería informar.
+
+    Las periodicidades no reconocidas no esperan ningún mes (no se marcan faltantes).
+    """
+    codigos, unicos = pd.factorize(pd.Series(periodicidad, dtype=object).fillna(''), use_na_sentinel=False)
+    tabla = np.zeros((len(unicos) + 1, len(meses)), dtype=bool)
+    for k, texto in enumerate(unicos):
+        for mes in _meses_de(str(texto)):
+            if mes <= len(meses):
+                tabla[k, mes - 1] = True
+    return tabla[codigos]
+
+
+@lru_cache(maxsize=256)
+def _meses_de(periodicidad):
+    # El texto ya viene sin mojibake desde la limpieza: basta con quitar tildes y mayúsculas
+    texto = unicodedata.normalize('NFKD', periodicidad).encode('ascii', 'ignore').decode('ascii')
+    return tuple(MESES_POR_PERIODICIDAD.get(texto.strip().lower(), ()))
+
+
+def z_robusto(valores, minimo=MIN_MESES_ATIPICO):
+    """Puntaje z robusto de cada celda respecto de su fila: ``0.6745 (x - mediana) / MAD``.
+
+    Es NaN en celdas vacías y en filas con menos de ``minimo`` meses o MAD cero.
+    """
+    with warnings.catch_warnings():
+        # Filas sin datos: mediana NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mediana = np.nanmedian(valores, axis=1, keepdims=True)
+        mad = np.nanmedian(np.abs(valores - mediana), axis=1, keepdims=True)
+    suficientes = np.count_nonzero(~np.isnan(valores), axis=1, keepdims=True) >= minimo
+    mad = np.where(suficientes & (mad > 0), mad, np.nan)
+    return 0.6745 * (valores - mediana) / mad
+
+
+def marcar_celdas(valores, periodicidad, meses=MESES):
+    """Marcas de calidad (``uint8``, filas x meses) de ``valores`` ya en porcentaje."""
+    valores = np.asarray(valores, dtype=float)
+    marcas = np.zeros(valores.shape, dtype=np.uint8)
+    con_dato = ~np.isnan(valores)
+
+    with np.errstate(invalid='ignore'):
+        marcas[(valores < LIMITE_INFERIOR) | (valores > LIMITE_SUPERIOR)] |= FUERA_DE_RANGO
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mediana = np.nanmedian(valores, axis=1, keepdims=True)
+        candidato = (valores > LIMITE_SUPERIOR) & (valores <= LIMITE_DOBLE_ESCALA)
+        marcas[candidato & ((mediana > LIMITE_SUPERIOR) | (valores >= FACTOR_ESCALA * mediana))] |= ESCALA
+
+        marcas[np.abs(z_robusto(valores)) > UMBRAL_Z_ROBUSTO] |= ATIPICO
+
+    # Meses exigidos sin dato, sólo hasta el último mes informado (los siguientes aún no llegan)
+    posicion = np.arange(len(meses))
+    ultimo = np.where(con_dato.any(axis=1), len(meses) - 1 - np.argmax(con_dato[:, ::-1], axis=1), -1)
+    faltante = meses_esperados(periodicidad, meses) & ~con_dato & (posicion < ultimo[:, None])
+    marcas[faltante] |= MES_FALTANTE
+    return marcas
+
+
+def marcar_datos(df, meses=MESES):
+    """Marcas de calidad de todas las filas de ``df`` (alineadas por posición)."""
+    marcas = marcar_celdas(df[meses].to_numpy(dtype=float), df['Periodicidad'].to_numpy(dtype=object), meses)
+    marcas.setflags(write=False)
+    return marcas
+
+
+def resumen_calidad(marcas):
+    """Celdas marcadas por problema."""
+    return pd.Series({texto: int(np.count_nonzero(marcas & bit)) for bit, texto in PROBLEMAS.items()},
+                     name='Celdas')
+
+
+def describir_marcas(marcas, meses=MESES):
+    """Texto breve por fila (``"Marzo: atípico · Junio: falta"``), vacío si la fila no tiene marcas."""
+    textos = []
+    for fila in np.asarray(marcas):
+        partes = [f"{mes}: {', '.join(corto for bit, corto in PROBLEMAS_CORTOS.items() if marca & bit)}"
+                  for mes, marca in zip(meses, fila) if marca]
+        textos.append(' · '.join(partes))
+    return textos
+
+
+def reporte_calidad(df, marcas, meses=MESES):
+    """Una fila por celda y problema detectado, ordenado como la planilla."""
+    columnas = [c for c in ('Establecimiento', 'Unidad_Desempeno', 'Indicador', 'Descripcion', 'Periodicidad')
+                if c in df.columns]
+    valores = df[meses].to_numpy(dtype=float)
+    partes = []
+    for bit, texto in PROBLEMAS.items():
+        filas, posiciones = np.nonzero(marcas & bit)
+        parte = df[columnas].iloc[filas].reset_index(drop=True)
+        parte['Mes'] = np.asarray(meses, dtype=object)[posiciones]
+        parte['Valor'] = valores[filas, posiciones]
+        parte['Problema'] = texto
+        parte['_fila'], parte['_mes'] = filas, posiciones
+        partes.append(parte)
+    reporte = pd.concat(partes, ignore_index=True)
+    return reporte.sort_values(['_fila', '_mes'], kind='stable', ignore_index=True).drop(columns=['_fila', '_mes'])
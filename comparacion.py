@@ -0,0 +1,78 @@
+"""Comparación de indicadores entre unidades, agregada antes de llegar al navegador.
+
+El formato largo (una fila por indicador y mes) se arma con un solo ``melt``
+vectorizado. Para comparar muchas unidades no se envía cada serie a Plotly:
+se calcula el promedio mensual de cada unidad (sobre los indicadores que pasan
+los filtros de Tipo y Periodicidad) y, mes a mes, los percentiles entre
+unidades. El gráfico recibe esas bandas (12 puntos por percentil), las pocas
+unidades destacadas y, de fondo, una muestra acotada de unidades dibujada como
+una sola traza.
+"""
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from limpieza import MESES
+
+# Percentiles entre unidades que forman las bandas (externa, interna y mediana)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Unidades dibujadas de fondo como máximo (las bandas usan todas)
+MAX_SERIES_FONDO = 200
+
+# Resultado de ``comparar_unidades``: percentiles por mes, promedio mensual de
+# cada unidad (unidades x meses) y la muestra de unidades para el fondo
+ComparacionUnidades = namedtuple('ComparacionUnidades', 'bandas unidades fondo')
+
+
+def formato_largo(df, meses=MESES, columnas=('Unidad_Desempeno', 'Indicador', 'Tipo', 'Periodicidad')):
+    """Una fila por indicador y mes con dato (``Mes`` categórico en orden de calendario)."""
+    columnas = [c for c in columnas if c in df.columns]
+    largo = df[columnas + list(meses)].melt(
+        id_vars=columnas, value_vars=list(meses), var_name='Mes', value_name='Cumplimiento'
+    ).dropna(subset=['Cumplimiento'])
+    largo['Mes'] = pd.Categorical(largo['Mes'], categories=list(meses), ordered=True)
+    return largo.reset_index(drop=True)
+
+
+def filtrar_indicadores(df, tipos=None, periodicidades=None):
+    """Filas cuyo Tipo y Periodicidad están entre los elegidos (``None`` o vacío: todos)."""
+    mascara = np.ones(len(df), dtype=bool)
+    if tipos:
+        mascara &= df['Tipo'].isin(tipos).to_numpy(dtype=bool)
+    if periodicidades:
+        mascara &= df['Periodicidad'].isin(periodicidades).to_numpy(dtype=bool)
+    return df[mascara]
+
+
+def bandas_mensuales(matriz, percentiles=PERCENTILES):
+    """Percentiles entre las filas de ``matriz`` (unidades x meses), mes a mes.
+
+    Agrega la columna ``Unidades`` con cuántas unidades tienen dato ese mes.
+    """
+    valores = matriz.to_numpy(dtype=float)
+    with warnings.catch_warnings():
+        # Un mes sin datos en ninguna unidad queda en NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        resultado = np.nanpercentile(valores, percentiles, axis=0) if len(valores) else \
+            np.full((len(percentiles), valores.shape[1]), np.nan)
+    bandas = pd.DataFrame(resultado.T, index=matriz.columns, columns=[f'p{p}' for p in percentiles])
+    bandas['Unidades'] = np.count_nonzero(~np.isnan(valores), axis=0)
+    return bandas
+
+
+def muestra_fondo(matriz, maximo=MAX_SERIES_FONDO):
+    """Hasta ``maximo`` unidades repartidas a lo largo del rango de promedios, para dibujar de fondo."""
+    if len(matriz) <= maximo:
+        return matriz
+    orden = matriz.mean(axis=1).sort_values(kind='stable').index
+    return matriz.loc[orden[np.linspace(0, len(orden) - 1, maximo).round().astype(int)]]
+
+
+def comparar_unidades(df, tipos=None, periodicidades=None, meses=MESES, maximo_fondo=MAX_SERIES_FONDO):
+    """Promedio mensual por unidad y bandas de percentiles entre unidades, en una pasada agrupada."""
+    filtrado = filtrar_indicadores(df, tipos, periodicidades)
+    matriz = filtrado.groupby('Unidad_Desempeno', sort=False)[list(meses)].mean()
+    return ComparacionUnidades(bandas_mensuales(matriz), matriz, muestra_fondo(matriz, maximo_fondo))
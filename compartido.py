@@ -0,0 +1,162 @@
+"""Caché compartida de solo lectura de los datos procesados, en archivos Arrow mapeados en memoria.
+
+Cada contenido procesado (``DatosDashboard``) se escribe una vez en disco en
+formato Arrow IPC sin compresión, con las filas agrupadas por unidad y los
+12 meses como un solo bloque (filas x 12). Al cargarlo, el archivo se mapea
+en memoria: las columnas de texto y el bloque de meses quedan como vistas
+sobre el mapa, sin copias, y el índice por unidad apunta a rangos de ese
+mismo bloque; las marcas de calidad se guardan igual, como bloque ``uint8``. Todos los procesos (workers) que mapean el mismo archivo
+comparten las páginas del sistema operativo, y un reinicio vuelve a servir
+los últimos datos sin descargar ni limpiar la planilla.
+
+Estructura del directorio (una carpeta por clave de fuente)::
+
+    <clave>/actual              nombre de la versión vigente
+    <clave>/<versión>/datos.arrow, ranking.arrow, cuarentena.arrow, meta.json
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from fuentes import DIRECTORIO_SNAPSHOT
+from indice import IndiceUnidades
+from limpieza import MESES
+from nucleo import DatosDashboard
+
+RUTA_COMPARTIDO = Path(os.environ.get('METAS_CACHE_COMPARTIDO', DIRECTORIO_SNAPSHOT / 'compartido'))
+
+# Versiones que se conservan en disco (un proceso puede seguir mapeando la anterior)
+MAX_VERSIONES = 2
+
+# Formato de los archivos; cambia el nombre de la versión para no mapear archivos de un formato anterior
+FORMATO = 2
+
+# Datos cargados de la caché junto con lo necesario para revalidar la fuente
+DatosCompartidos = namedtuple('DatosCompartidos', 'datos huella etag ultima_modificacion instante')
+
+
+class AlmacenCompartido:
+    """Caché de una fuente (``clave``: su nombre o especificación) bajo ``directorio``."""
+
+    def __init__(self, clave, directorio=RUTA_COMPARTIDO):
+        self.directorio = Path(directorio) / hashlib.sha256(clave.encode()).hexdigest()[:16]
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.ultimo_error = None
+
+    def guardar(self, huella, datos, etag=None, ultima_modificacion=None):
+        """Escribe ``datos`` como versión vigente y los retorna ya mapeados desde el archivo.
+
+        Si no se puede escribir (disco lleno, columnas no convertibles a Arrow)
+        retorna ``datos`` tal cual y deja el error en ``ultimo_error``.
+        """
+        try:
+            datos = self._guardar(huella, datos, etag, ultima_modificacion)
+            self.ultimo_error = None
+        except (OSError, pa.ArrowException) as e:
+            self.ultimo_error = e
+        return datos
+
+    def _guardar(self, huella, datos, etag, ultima_modificacion):
+        version = f"{huella[:16]}-{FORMATO}"
+        destino = self.directorio / version
+        if not destino.exists():
+            temporal = self.directorio / f".{version}.{os.getpid()}.tmp"
+            temporal.mkdir(exist_ok=True)
+            # ``datos`` viene de ``nucleo.construir_datos``: filas ya agrupadas por unidad
+            df = datos.df
+            _escribir(_tabla_datos(df, datos.calidad), temporal / 'datos.arrow')
+            _escribir(pa.Table.from_pandas(datos.ranking, preserve_index=False), temporal / 'ranking.arrow')
+            _escribir(pa.Table.from_pandas(datos.cuarentena, preserve_index=False), temporal / 'cuarentena.arrow')
+            (temporal / 'meta.json').write_text(json.dumps({
+                'huella': huella,
+                'etag': etag,
+                'ultima_modificacion': ultima_modificacion,
+                'instante': time.time(),
+                'columnas': df.columns.tolist(),
+                'columnas_faltantes': list(datos.columnas_faltantes),
+            }, ensure_ascii=False))
+            try:
+                temporal.rename(destino)
+            except OSError:
+                # Otro proceso escribió la misma versión primero
+                shutil.rmtree(temporal, ignore_errors=True)
+
+        _reemplazar(self.directorio / 'actual', version)
+        self._limpiar(version)
+        return self._mapear(destino).datos
+
+    def cargar(self):
+        """Última versión guardada (``DatosCompartidos``) o ``None`` si no hay o está dañada."""
+        try:
+            version = (self.directorio / 'actual').read_text().strip()
+            return self._mapear(self.directorio / version)
+        except (OSError, ValueError, KeyError, pa.ArrowException):
+            return None
+
+    def _mapear(self, carpeta):
+        meta = json.loads((carpeta / 'meta.json').read_text())
+        tabla = _leer(carpeta / 'datos.arrow')
+
+        bloque = _bloque(tabla.column('Meses'))
+        calidad = _bloque(tabla.column('Calidad'))
+
+        info = tabla.drop_columns(['Meses', 'Calidad']).to_pandas(split_blocks=True)
+        df = pd.concat([info, pd.DataFrame(bloque, columns=MESES, copy=False)], axis=1)[meta['columnas']]
+
+        datos = DatosDashboard(
+            df,
+            IndiceUnidades(df, bloque=bloque),
+            _leer(carpeta / 'ranking.arrow').to_pandas(),
+            _leer(carpeta / 'cuarentena.arrow').to_pandas(),
+            calidad,
+            meta.get('columnas_faltantes', []),
+        )
+        return DatosCompartidos(datos, meta['huella'], meta['etag'], meta['ultima_modificacion'], meta['instante'])
+
+    def _limpiar(self, vigente):
+        versiones = sorted((p for p in self.directorio.iterdir() if p.is_dir() and not p.name.startswith('.')),
+                           key=lambda p: p.stat().st_mtime, reverse=True)
+        conservar = {vigente} | {p.name for p in versiones[:MAX_VERSIONES]}
+        for carpeta in versiones:
+            if carpeta.name not in conservar:
+                # En Linux los procesos que aún la mapean siguen leyendo sin problema
+                shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def _tabla_datos(df, calidad):
+    """Columnas descriptivas tal cual; los meses y sus marcas de calidad como columnas de listas de 12."""
+    # Un solo lote por columna: al mapear, cada columna es un único arreglo contiguo
+    tabla = pa.Table.from_pandas(df.drop(columns=MESES), preserve_index=False).combine_chunks()
+    bloque = np.ascontiguousarray(df[MESES].to_numpy(dtype=np.float64))
+    tabla = tabla.append_column('Meses', pa.FixedSizeListArray.from_arrays(pa.array(bloque.ravel()), len(MESES)))
+    calidad = np.ascontiguousarray(calidad, dtype=np.uint8)
+    return tabla.append_column('Calidad', pa.FixedSizeListArray.from_arrays(pa.array(calidad.ravel()), len(MESES)))
+
+
+def _bloque(columna):
+    """Vista numpy (filas x 12) sin copia de una columna de listas de tamaño fijo."""
+    columna = columna.chunk(0) if columna.num_chunks == 1 else columna.combine_chunks()
+    return columna.flatten().to_numpy(zero_copy_only=True).reshape(-1, len(MESES))
+
+
+def _escribir(tabla, ruta):
+    with pa.OSFile(str(ruta), 'wb') as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+
+
+def _leer(ruta):
+    return pa.ipc.open_file(pa.memory_map(str(ruta))).read_all()
+
+
+def _reemplazar(ruta, texto):
+    temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    temporal.write_text(texto)
+    os.replace(temporal, ruta)
@@ -0,0 +1,54 @@
+"""Clasificación de cumplimiento (Cumple / No Cumple / No Aplica) y su estilo.
+
+Una sola función vectorizada sobre arreglos numéricos respalda la tabla de
+Meta Proyectada, la simulación incremental y las exportaciones; los colores se
+derivan del Estado, no de volver a leer los porcentajes ya formateados.
+"""
+import numpy as np
+import pandas as pd
+
+CUMPLE = 'Cumple ✅'
+NO_CUMPLE = 'No Cumple ❌'
+NO_APLICA = 'No Aplica 🔄'
+
+ESTILOS_ESTADO = {
+    CUMPLE: 'background-color: #d4edda; color: #155724; font-weight: bold',  # Verde
+    NO_CUMPLE: 'background-color: #f8d7da; color: #721c24; font-weight: bold',  # Rojo
+    NO_APLICA: 'background-color: #f8f9fa; color: #6c757d',  # Gris
+}
+
+
+def clasificar_cumplimiento(proyeccion, meta, comparable):
+    """Estado de cada indicador a partir de arreglos alineados.
+
+    Sólo se compara cuando la meta es comparable y tanto la proyección como la
+    meta son numéricas; en cualquier otro caso (glosas o datos faltantes) el
+    resultado es ``NO_APLICA``.
+    """
+    proyeccion = np.asarray(proyeccion, dtype=float)
+    meta = np.asarray(meta, dtype=float)
+    comparable = np.asarray(comparable, dtype=bool)
+
+    aplica = comparable & ~np.isnan(proyeccion) & ~np.isnan(meta)
+    with np.errstate(invalid='ignore'):
+        cumple = aplica & (proyeccion >= meta)
+    return np.select([cumple, aplica], [CUMPLE, NO_CUMPLE], default=NO_APLICA).astype(object)
+
+
+def formatear_porcentaje(valores):
+    """``xx.x%`` para cada valor, ``N/A`` para NaN."""
+    return [f"{x:.1f}%" if pd.notna(x) else "N/A" for x in valores]
+
+
+def tabla_meta_proyectada(df, proyeccion, estado):
+    """Tabla de Meta Proyectada vs Meta Anual lista para mostrar o exportar."""
+    tabla = df[['Indicador', 'Descripcion', 'Meta_Anual_Display']].reset_index(drop=True)
+    tabla['Meta Proyectada'] = formatear_porcentaje(proyeccion)
+    tabla['Estado'] = np.asarray(estado, dtype=object)
+    return tabla
+
+
+def estilo_meta_proyectada(tabla):
+    """Styler que colorea la columna Meta Proyectada según el Estado de cada fila."""
+    estilos = tabla['Estado'].map(ESTILOS_ESTADO).fillna('').to_numpy()
+    return tabla.style.apply(lambda _: estilos, subset=['Meta Proyectada'], axis=0)
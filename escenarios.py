@@ -0,0 +1,202 @@
+"""Escenarios de simulación persistentes y compartibles.
+
+Cada escenario se guarda como diferencia dispersa contra los datos originales
+de la unidad (sólo las celdas editadas) en un archivo SQLite local, de modo que
+cualquier sesión del servidor puede listarlos, cargarlos, compararlos o
+eliminarlos. Las celdas se identifican por número de indicador para resistir
+reordenamientos de la planilla.
+
+En la sesión, ``LRUSimulaciones`` acota cuántas unidades mantienen su tabla
+completa en memoria; las demás quedan reducidas a sus celdas editadas,
+identificadas igual que en el almacén.
+"""
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from fuentes import DIRECTORIO_SNAPSHOT
+
+RUTA_ESCENARIOS = Path(os.environ.get('METAS_ESCENARIOS_DB', DIRECTORIO_SNAPSHOT / 'escenarios.sqlite'))
+
+# Unidades con tabla completa en memoria por sesión
+MAX_SIMULACIONES_SESION = int(os.environ.get('METAS_MAX_UNIDADES_SESION', 5))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS escenarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    unidad TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    creado REAL NOT NULL,
+    huella_base TEXT,
+    UNIQUE (unidad, nombre)
+);
+CREATE TABLE IF NOT EXISTS celdas (
+    escenario_id INTEGER NOT NULL REFERENCES escenarios(id) ON DELETE CASCADE,
+    fila INTEGER NOT NULL,
+    indicador REAL,
+    mes TEXT NOT NULL,
+    valor REAL,
+    PRIMARY KEY (escenario_id, fila, mes)
+);
+"""
+
+
+class AlmacenEscenarios:
+    def __init__(self, ruta=RUTA_ESCENARIOS):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with self._conectar() as conexion:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.executescript(_ESQUEMA)
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        conexion.execute('PRAGMA foreign_keys=ON')
+        return conexion
+
+    def guardar(self, unidad, nombre, cambios, indicadores, huella_base=None):
+        """Guarda (o reemplaza) ``cambios`` (``{fila: {mes: valor}}``) como escenario ``nombre``.
+
+        ``indicadores`` es la columna Indicador de la unidad, alineada por fila.
+        """
+        filas = celdas_por_indicador(cambios, indicadores)
+        with self._conectar() as conexion:
+            conexion.execute('DELETE FROM escenarios WHERE unidad = ? AND nombre = ?', (unidad, nombre))
+            cursor = conexion.execute(
+                'INSERT INTO escenarios (unidad, nombre, creado, huella_base) VALUES (?, ?, ?, ?)',
+                (unidad, nombre, time.time(), huella_base)
+            )
+            conexion.executemany(
+                'INSERT INTO celdas (escenario_id, fila, indicador, mes, valor) VALUES (?, ?, ?, ?, ?)',
+                [(cursor.lastrowid, *fila) for fila in filas]
+            )
+        return len(filas)
+
+    def listar(self, unidad):
+        with self._conectar() as conexion:
+            df = pd.read_sql_query(
+                """SELECT e.nombre, e.creado, e.huella_base, COUNT(c.mes) AS celdas
+                   FROM escenarios e LEFT JOIN celdas c ON c.escenario_id = e.id
+                   WHERE e.unidad = ? GROUP BY e.id ORDER BY e.creado DESC""",
+                conexion, params=(unidad,)
+            )
+        df['creado'] = pd.to_datetime(df['creado'], unit='s')
+        return df
+
+    def celdas(self, unidad, nombre):
+        """Celdas guardadas del escenario, ``(fila, indicador, mes, valor)`` (ver ``resolver_celdas``)."""
+        with self._conectar() as conexion:
+            return [tuple(celda) for celda in conexion.execute(
+                """SELECT c.fila, c.indicador, c.mes, c.valor FROM celdas c
+                   JOIN escenarios e ON e.id = c.escenario_id
+                   WHERE e.unidad = ? AND e.nombre = ?""",
+                (unidad, nombre)
+            )]
+
+    def cargar(self, unidad, nombre, indicadores):
+        """Diferencias del escenario resueltas contra las filas actuales de la unidad."""
+        return resolver_celdas(self.celdas(unidad, nombre), indicadores)
+
+    def eliminar(self, unidad, nombre):
+        with self._conectar() as conexion:
+            conexion.execute('DELETE FROM escenarios WHERE unidad = ? AND nombre = ?', (unidad, nombre))
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def celdas_por_indicador(cambios, indicadores):
+    """``{fila: {mes: valor}}`` como celdas ``(fila, indicador, mes, valor)``.
+
+    ``indicadores`` es la columna Indicador de la unidad, alineada por fila.
+    """
+    indicadores = list(indicadores)
+    return [
+        (int(fila), _numero(indicadores[int(fila)]), mes, valor)
+        for fila, columnas in cambios.items()
+        for mes, valor in columnas.items()
+    ]
+
+
+def resolver_celdas(celdas, indicadores):
+    """Celdas ``(fila, indicador, mes, valor)`` como ``{fila: {mes: valor}}`` sobre las filas actuales.
+
+    Cada celda se ubica por número de indicador cuando éste es único en la
+    unidad; si no, por su posición original. Celdas que ya no encajan se omiten.
+    """
+    indicadores = [_numero(i) for i in indicadores]
+    posicion = {}
+    for fila, indicador in enumerate(indicadores):
+        posicion[indicador] = None if indicador in posicion else fila
+
+    cambios = {}
+    for fila, indicador, mes, valor in celdas:
+        destino = posicion.get(indicador)
+        if destino is None:
+            destino = fila if fila < len(indicadores) else None
+        if destino is not None:
+            cambios.setdefault(destino, {})[mes] = valor
+    return cambios
+
+
+class LRUSimulaciones:
+    """Acota las simulaciones completas que guarda una sesión.
+
+    ``simulaciones`` contiene las ``SimulacionUnidad`` más recientes (hasta
+    ``maximo``); al desalojar una se conservan sólo sus celdas editadas
+    (``celdas_por_indicador``), con las que ``obtener`` la reconstruye sobre los
+    datos vigentes si se vuelve a esa unidad, aunque la planilla haya cambiado.
+
+    Cada unidad recuerda la ``huella`` de los datos sobre los que se creó; si
+    ``obtener`` recibe otra, la simulación se reconstruye del mismo modo.
+    """
+
+    def __init__(self, maximo=MAX_SIMULACIONES_SESION):
+        self.maximo = maximo
+        self.simulaciones = OrderedDict()
+        self.diferencias = {}
+        self.huellas = {}
+
+    def __contains__(self, unidad):
+        return unidad in self.simulaciones
+
+    def cambiaron_datos(self, unidad, huella):
+        """Si la sesión tiene algo de ``unidad`` construido sobre datos distintos de ``huella``."""
+        return unidad in self.huellas and self.huellas[unidad] != huella
+
+    def obtener(self, unidad, crear, huella=None):
+        """Simulación de ``unidad`` sobre los datos ``huella``; ``crear()`` construye una nueva desde ellos."""
+        if unidad in self.simulaciones:
+            if self.huellas.get(unidad) == huella:
+                self.simulaciones.move_to_end(unidad)
+                return self.simulaciones[unidad]
+            anterior = self.simulaciones.pop(unidad)
+            self.diferencias[unidad] = celdas_por_indicador(anterior.diferencias(), anterior.df['Indicador'])
+
+        simulacion = crear()
+        celdas = self.diferencias.pop(unidad, None)
+        if celdas:
+            simulacion.aplicar_cambios(resolver_celdas(celdas, simulacion.df['Indicador']))
+        self.asignar(unidad, simulacion, huella)
+        return simulacion
+
+    def asignar(self, unidad, simulacion, huella=None):
+        self.simulaciones[unidad] = simulacion
+        self.simulaciones.move_to_end(unidad)
+        self.diferencias.pop(unidad, None)
+        self.huellas[unidad] = huella
+        while len(self.simulaciones) > self.maximo:
+            desalojada, anterior = self.simulaciones.popitem(last=False)
+            celdas = celdas_por_indicador(anterior.diferencias(), anterior.df['Indicador'])
+            if celdas:
+                self.diferencias[desalojada] = celdas
+            else:
+                self.huellas.pop(desalojada, None)
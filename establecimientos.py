@@ -0,0 +1,196 @@
+"""Carga en paralelo de las planillas de varios establecimientos.
+
+Cada establecimiento tiene su propia fuente (otra hoja ``gid`` u otro
+documento) y su propio ``ActualizadorDatos``, con TTL, lectura condicional,
+snapshot de respaldo y limpieza independientes. En cada revalidación todos se
+consultan a la vez en un pool de hilos (descarga y limpieza de cada planilla en
+el mismo hilo), por lo que el tiempo total es el de la fuente más lenta y no la
+suma. Las descargas comparten la sesión HTTP del proceso, con conexiones
+reutilizadas y reintentos (``fuentes.obtener_sesion``).
+
+Un establecimiento que falla no deja en blanco a los demás: se sigue usando
+su última planilla buena (en memoria o en su snapshot) o, si nunca cargó, se
+omite y se informa en ``errores``.
+"""
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from actualizador import TTL_SEGUNDOS, ActualizadorDatos
+from fuentes import DIRECTORIO_SNAPSHOT, crear_fuente
+from ingesta import COLUMNAS_CUARENTENA, leer_planilla
+
+# Máximo de planillas consultadas a la vez
+MAX_HILOS = 16
+
+# Separador entre establecimiento y unidad en ``Unidad_Desempeno`` al combinar
+SEPARADOR_UNIDAD = ' · '
+
+
+def leer_especificacion(especificacion=None):
+    """``{establecimiento: especificación de fuente}`` desde ``METAS_ESTABLECIMIENTOS``.
+
+    Formato: ``Nombre=fuente;Otro nombre=fuente`` (las fuentes como en
+    ``METAS_FUENTE``). Retorna ``{}`` si no hay establecimientos definidos.
+    """
+    especificacion = especificacion if especificacion is not None else os.environ.get('METAS_ESTABLECIMIENTOS', '')
+    fuentes = {}
+    for parte in especificacion.split(';'):
+        if not parte.strip():
+            continue
+        nombre, separador, fuente = parte.partition('=')
+        if not separador or not nombre.strip() or not fuente.strip():
+            raise ValueError(f"Establecimiento mal definido: {parte!r} (se espera 'Nombre=fuente')")
+        fuentes[nombre.strip()] = fuente.strip()
+    return fuentes
+
+
+def crear_fuentes(especificacion=None, directorio=DIRECTORIO_SNAPSHOT):
+    """Fuentes por establecimiento, cada una con su propio directorio de snapshot."""
+    return {
+        nombre: crear_fuente(fuente, directorio=directorio / _carpeta(nombre))
+        for nombre, fuente in leer_especificacion(especificacion).items()
+    }
+
+
+def _carpeta(nombre):
+    return re.sub(r'[^\w.-]+', '_', nombre).strip('_') or 'establecimiento'
+
+
+def combinar_establecimientos(frames):
+    """Une los datos limpios de cada establecimiento en un solo DataFrame.
+
+    Agrega la columna ``Establecimiento`` y antepone su nombre a
+    ``Unidad_Desempeno`` para que unidades homónimas de distintos
+    establecimientos no se mezclen en el selector, el ranking ni el histórico.
+    """
+    partes = []
+    for nombre, df in frames.items():
+        df = df.copy()
+        df.insert(0, 'Establecimiento', nombre)
+        df['Unidad_Desempeno'] = nombre + SEPARADOR_UNIDAD + df['Unidad_Desempeno'].astype(str)
+        partes.append(df)
+    if not partes:
+        raise ValueError("Ningún establecimiento entregó datos")
+    return pd.concat(partes, ignore_index=True)
+
+
+def combinar_cuarentenas(cuarentenas):
+    """Une las filas en cuarentena de cada establecimiento, con la columna ``Establecimiento``."""
+    partes = [c.assign(Establecimiento=nombre)[['Establecimiento', *COLUMNAS_CUARENTENA]]
+              for nombre, c in cuarentenas.items() if len(c)]
+    if not partes:
+        return pd.DataFrame(columns=['Establecimiento', *COLUMNAS_CUARENTENA])
+    return pd.concat(partes, ignore_index=True)
+
+
+def combinar_columnas_faltantes(faltantes):
+    """Columnas que faltaban en la planilla de cada establecimiento, con su nombre antepuesto como en las unidades."""
+    return [f"{nombre}{SEPARADOR_UNIDAD}{columna}" for nombre, columnas in faltantes.items() for columna in columnas]
+
+
+class CargadorEstablecimientos:
+    """Misma interfaz que ``ActualizadorDatos`` para un conjunto de establecimientos.
+
+    ``procesar`` recibe el DataFrame combinado (ver ``combinar_establecimientos``)
+    las filas en cuarentena de todos (``combinar_cuarentenas``) y las columnas
+    que faltaban en cada planilla (``combinar_columnas_faltantes``), y sólo se
+    vuelve a llamar cuando cambió la planilla de algún establecimiento.
+    """
+
+    def __init__(self, fuentes, procesar, ttl=TTL_SEGUNDOS, max_hilos=MAX_HILOS, compartido=None):
+        if not fuentes:
+            raise ValueError("No hay establecimientos definidos")
+        self.procesar = procesar
+        self.ttl = ttl
+        self.actualizadores = {
+            nombre: ActualizadorDatos(fuente, procesar=leer_planilla, ttl=ttl)
+            for nombre, fuente in fuentes.items()
+        }
+        self.nombre = f"{len(fuentes)} establecimientos"
+        self.datos = None
+        self.hash = None
+        self.ultimo_error = None
+        # Establecimiento -> excepción de la última consulta (sin datos o sirviendo datos previos)
+        self.errores = {}
+        # Con caché compartida se parte de los últimos datos combinados guardados: si ninguna
+        # planilla cambió, la primera revalidación no vuelve a combinarlos ni a construir el índice
+        self.compartido = compartido
+        guardado = compartido.cargar() if compartido is not None else None
+        if guardado is not None:
+            self.datos, self.hash = guardado.datos, guardado.huella
+        self._pool = ThreadPoolExecutor(max_workers=min(max_hilos, len(fuentes)),
+                                        thread_name_prefix='establecimiento')
+        self._lock = threading.Lock()
+
+    @property
+    def estadisticas(self):
+        """Estadísticas de ``ActualizadorDatos`` sumadas sobre los establecimientos."""
+        total = {}
+        for actualizador in self.actualizadores.values():
+            for clave, valor in actualizador.estadisticas.items():
+                total[clave] = total.get(clave, 0) + valor
+        return total
+
+    def estado(self):
+        """Una fila por establecimiento: origen de sus datos, filas y último error."""
+        filas = []
+        for nombre, actualizador in self.actualizadores.items():
+            error = self.errores.get(nombre)
+            if actualizador.datos is None:
+                origen = 'sin datos'
+            else:
+                origen = getattr(actualizador.fuente, 'origen', None) or 'fuente'
+            filas.append({
+                'Establecimiento': nombre,
+                'Fuente': actualizador.nombre,
+                'Origen': origen,
+                'Indicadores': 0 if actualizador.datos is None else len(actualizador.datos.df),
+                'En cuarentena': 0 if actualizador.datos is None else len(actualizador.datos.cuarentena),
+                'Columnas faltantes': None if actualizador.datos is None else
+                ', '.join(actualizador.datos.columnas_faltantes) or None,
+                'Error': None if error is None else str(error),
+            })
+        return pd.DataFrame(filas)
+
+    def obtener(self, forzar=False):
+        """Revalida todos los establecimientos a la vez y retorna los datos combinados procesados."""
+        with self._lock:
+            futuros = {nombre: self._pool.submit(actualizador.obtener, forzar)
+                       for nombre, actualizador in self.actualizadores.items()}
+
+            frames, errores = {}, {}  # establecimiento -> LecturaPlanilla
+            for nombre, futuro in futuros.items():
+                actualizador = self.actualizadores[nombre]
+                try:
+                    frames[nombre] = futuro.result()
+                except Exception as e:
+                    # Nunca cargó: se omite este establecimiento
+                    errores[nombre] = e
+                    continue
+                if actualizador.ultimo_error is not None:
+                    errores[nombre] = actualizador.ultimo_error
+
+            self.errores = errores
+            self.ultimo_error = (
+                '; '.join(f"{nombre}: {error}" for nombre, error in errores.items()) if errores else None
+            )
+
+            huella = hashlib.sha256(repr(sorted(
+                (nombre, self.actualizadores[nombre].hash) for nombre in frames
+            )).encode()).hexdigest()
+            if huella != self.hash:
+                self.datos = self.procesar(
+                    combinar_establecimientos({nombre: lectura.df for nombre, lectura in frames.items()}),
+                    combinar_cuarentenas({nombre: lectura.cuarentena for nombre, lectura in frames.items()}),
+                    combinar_columnas_faltantes({nombre: lectura.columnas_faltantes
+                                                 for nombre, lectura in frames.items()}),
+                )
+                if self.compartido is not None:
+                    self.datos = self.compartido.guardar(huella, self.datos)
+                self.hash = huella
+            return self.datos
@@ -0,0 +1,409 @@
+"""Exportación de reportes (Excel, PDF, imagen y Parquet) fuera del rerun.
+
+Un reporte es la tabla de Meta Proyectada de una unidad o de toda la
+institución (con su ranking), sobre los datos originales o con un escenario
+guardado aplicado. Generarlo (sobre todo Excel y PDF) toma de décimas a
+varios segundos, así que el script de Streamlit sólo lo *solicita*:
+``ExportadorReportes`` lo genera en un pool de hilos, informa el avance de
+cada trabajo y deja el archivo en ``RUTA_EXPORTACIONES`` bajo una clave que
+resume todo lo que determina su contenido (huella de los datos, alcance,
+unidad, celdas del escenario, estrategia de proyección y formato). Pedir de
+nuevo el mismo reporte entrega el archivo ya generado sin volver a calcularlo.
+
+Excel usa ``openpyxl``; PDF e imagen, ``matplotlib``; Parquet, ``pyarrow``.
+Sólo se importan al generar ese formato.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cumplimiento import ESTILOS_ESTADO, clasificar_cumplimiento
+from escenarios import resolver_celdas
+from fuentes import DIRECTORIO_SNAPSHOT
+from limpieza import MESES
+from ranking import proyeccion_mensual, ranking_unidades
+from simulacion import SimulacionUnidad
+
+RUTA_EXPORTACIONES = Path(os.environ.get('METAS_EXPORTACIONES_DIR', DIRECTORIO_SNAPSHOT / 'exportaciones'))
+
+# Reportes generados a la vez por proceso
+HILOS_EXPORTACION = int(os.environ.get('METAS_HILOS_EXPORTACION', 2))
+
+# Archivos que se conservan en disco y trabajos terminados que se recuerdan en memoria
+MAX_ARCHIVOS = 200
+MAX_TRABAJOS = 500
+
+# Cambia la clave de todos los reportes cuando cambia su contenido o diseño
+VERSION_REPORTES = 2
+
+FormatoExportacion = namedtuple('FormatoExportacion', 'descripcion mime')
+
+FORMATOS = {
+    'xlsx': FormatoExportacion('Excel con formato condicional',
+                               'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': FormatoExportacion('PDF con gráfico y tabla', 'application/pdf'),
+    'png': FormatoExportacion('Imagen del gráfico', 'image/png'),
+    'parquet': FormatoExportacion('Parquet', 'application/octet-stream'),
+}
+
+UNIDAD = 'unidad'
+INSTITUCION = 'institucion'
+
+EN_COLA = 'En cola'
+GENERANDO = 'Generando'
+LISTO = 'Listo'
+ERROR = 'Error'
+
+# Qué exportar: ``cambios`` son las celdas del escenario, ``(fila, indicador, mes, valor)`` como las
+# guarda ``escenarios`` (vacío = datos originales); se ubican por indicador sobre los datos del reporte
+SolicitudExportacion = namedtuple('SolicitudExportacion', 'alcance unidad escenario cambios estrategia formato')
+
+# Tablas del reporte (nombre de hoja -> DataFrame, la primera es la principal) y su título
+Reporte = namedtuple('Reporte', 'titulo tablas')
+
+# Filas de tabla por página del PDF y barras como máximo en el gráfico institucional
+FILAS_POR_PAGINA = 32
+MAX_BARRAS = 40
+
+
+def clave_exportacion(huella, solicitud, anterior=None):
+    """Huella del contenido del reporte: mismos datos y parámetros, mismo archivo."""
+    # Por indicador; la fila sólo desempata indicadores repetidos o sin número
+    cambios = sorted(((indicador is None, indicador or 0.0, int(fila), mes, valor)
+                      for fila, indicador, mes, valor in solicitud.cambios or ()),
+                     key=lambda celda: celda[:4])
+    partes = [VERSION_REPORTES, huella, solicitud.alcance, solicitud.unidad, solicitud.escenario,
+              cambios, solicitud.estrategia, solicitud.formato,
+              None if anterior is None else hashlib.sha256(np.asarray(anterior, dtype=float).tobytes()).hexdigest()]
+    return hashlib.sha256(json.dumps(partes, ensure_ascii=False, default=str).encode()).hexdigest()[:32]
+
+
+def nombre_archivo(solicitud):
+    """Nombre sugerido para la descarga."""
+    partes = ['metas', solicitud.unidad if solicitud.alcance == UNIDAD else 'institucion']
+    if solicitud.escenario:
+        partes.append(solicitud.escenario)
+    base = re.sub(r'[^\w.-]+', '_', '_'.join(partes)).strip('_')
+    return f"{base}.{solicitud.formato}"
+
+
+# ============== CONTENIDO ==============
+
+def construir_reporte(datos, solicitud, anterior=None):
+    """Tablas del reporte pedido a partir de ``DatosDashboard``.
+
+    ``anterior`` (indicadores x 12 de la unidad) es el año anterior que usa la estrategia ``estacional``.
+    """
+    escenario = f" · escenario «{solicitud.escenario}»" if solicitud.escenario else " · datos originales"
+    simulacion = None
+    if solicitud.unidad is not None:
+        simulacion = SimulacionUnidad(datos.indice.frame(solicitud.unidad))
+        simulacion.proyectar_con(solicitud.estrategia, anterior)
+        simulacion.aplicar_cambios(resolver_celdas(solicitud.cambios or (), simulacion.df['Indicador']))
+
+    if solicitud.alcance == UNIDAD:
+        tabla = simulacion.df[['Indicador', 'Descripcion', 'Meta_Anual_Display'] + MESES].rename(
+            columns={'Descripcion': 'Descripción', 'Meta_Anual_Display': 'Meta Anual'})
+        tabla['Meta Anual (%)'] = simulacion.meta
+        tabla['Meta Proyectada'] = simulacion.proyeccion
+        tabla['Estado'] = simulacion.estado
+        return Reporte(f"{solicitud.unidad}{escenario}", {'Meta Proyectada': tabla})
+
+    df = datos.df
+    proyeccion = proyeccion_mensual(df, estrategia=solicitud.estrategia)
+    if simulacion is not None and simulacion.version:
+        # El escenario de una unidad reemplaza la proyección de sus filas (contiguas y en el mismo orden)
+        filas = np.flatnonzero((df['Unidad_Desempeno'] == solicitud.unidad).to_numpy(dtype=bool))
+        proyeccion[filas] = simulacion.proyeccion
+    tabla = df[['Unidad_Desempeno', 'Indicador', 'Descripcion', 'Meta_Anual_Display', 'Ponderacion_Num']].rename(
+        columns={'Unidad_Desempeno': 'Unidad', 'Descripcion': 'Descripción', 'Meta_Anual_Display': 'Meta Anual',
+                 'Ponderacion_Num': 'Ponderación'}).reset_index(drop=True)
+    tabla['Meta Anual (%)'] = df['Meta_Anual_Valor'].to_numpy(dtype=float)
+    tabla['Meta Proyectada'] = proyeccion
+    tabla['Estado'] = clasificar_cumplimiento(proyeccion, df['Meta_Anual_Valor'], df['Meta_Anual_Comparable'])
+    ranking = ranking_unidades(df, proyeccion=proyeccion).rename(columns={
+        'Unidad_Desempeno': 'Unidad', 'Ponderacion_Evaluable': 'Pond. Evaluable',
+        'Ponderacion_Cumplida': 'Pond. Cumplida', 'Proyeccion_Promedio': 'Proyección Promedio',
+        'Cumplimiento_Ponderado': 'Cumplimiento Ponderado'})
+    titulo = "Institución" + (f" ({solicitud.unidad}{escenario})" if solicitud.escenario else escenario)
+    return Reporte(titulo, {'Ranking': ranking, 'Meta Proyectada': tabla})
+
+
+# ============== FORMATOS ==============
+
+# Columnas en porcentaje (0 a 100) de las tablas del reporte
+_COLUMNAS_PORCENTAJE = set(MESES) | {'Meta Anual (%)', 'Meta Proyectada', 'Proyección Promedio',
+                                     'Cumplimiento Ponderado'}
+
+
+def _css(estilo):
+    """``{'background-color': '#...', 'color': '#...', 'font-weight': 'bold'}`` de un estilo CSS."""
+    return {clave.strip(): valor.strip() for clave, _, valor in
+            (parte.partition(':') for parte in estilo.split(';') if ':' in parte)}
+
+
+def _escribir_xlsx(reporte, ruta, avance):
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    # Mismos colores que la tabla Meta Proyectada del dashboard (``ESTILOS_ESTADO``), según el Estado
+    reglas = []
+    for estado, estilo in ESTILOS_ESTADO.items():
+        css = _css(estilo)
+        color_fondo = css['background-color'].lstrip('#')
+        reglas.append((estado, PatternFill(start_color=color_fondo, end_color=color_fondo, fill_type='solid'),
+                       Font(color=css['color'].lstrip('#'), bold=css.get('font-weight') == 'bold')))
+
+    with pd.ExcelWriter(ruta, engine='openpyxl') as escritor:
+        for k, (hoja, tabla) in enumerate(reporte.tablas.items()):
+            tabla.to_excel(escritor, sheet_name=hoja, index=False)
+            hoja_excel = escritor.sheets[hoja]
+            hoja_excel.freeze_panes = 'A2'
+            ultima = len(tabla) + 1
+            for posicion, columna in enumerate(tabla.columns, start=1):
+                letra = get_column_letter(posicion)
+                hoja_excel.column_dimensions[letra].width = min(60, max(10, len(str(columna)) + 2))
+                if columna in _COLUMNAS_PORCENTAJE:
+                    for (celda,) in hoja_excel.iter_rows(min_row=2, max_row=ultima, min_col=posicion, max_col=posicion):
+                        celda.number_format = '0.0"%"'
+            if 'Estado' in tabla.columns and 'Meta Proyectada' in tabla.columns and len(tabla):
+                estado = get_column_letter(tabla.columns.get_loc('Estado') + 1)
+                objetivo = get_column_letter(tabla.columns.get_loc('Meta Proyectada') + 1)
+                for texto, relleno, fuente in reglas:
+                    hoja_excel.conditional_formatting.add(
+                        f"{objetivo}2:{objetivo}{ultima}",
+                        FormulaRule(formula=[f'${estado}2="{texto}"'], fill=relleno, font=fuente))
+            avance(0.3 + 0.6 * (k + 1) / len(reporte.tablas), f"Hoja {hoja}")
+
+
+def _figura(reporte):
+    from matplotlib.figure import Figure
+
+    colores = {estado: _css(estilo)['background-color'] for estado, estilo in ESTILOS_ESTADO.items()}
+    bordes = {estado: _css(estilo)['color'] for estado, estilo in ESTILOS_ESTADO.items()}
+    figura = Figure(figsize=(11, 7), layout='constrained')
+    eje = figura.add_subplot()
+
+    if 'Ranking' in reporte.tablas:
+        ranking = reporte.tablas['Ranking']
+        nota = ''
+        if len(ranking) > MAX_BARRAS:
+            mitad = MAX_BARRAS // 2
+            ranking = pd.concat([ranking.head(mitad), ranking.tail(mitad)])
+            nota = f" (primeras y últimas {mitad} de {len(reporte.tablas['Ranking'])})"
+        valores = ranking['Cumplimiento Ponderado'].fillna(0).to_numpy()
+        eje.barh(ranking['Unidad'].astype(str), valores, color=[_color_cumplimiento(v) for v in valores])
+        eje.set_xlabel('Cumplimiento Ponderado (%)')
+        eje.set_title(f"Cumplimiento ponderado por unidad{nota}")
+    else:
+        tabla = reporte.tablas['Meta Proyectada']
+        etiquetas = [f"Ind. {int(i)}" if pd.notna(i) else 'Ind.' for i in tabla['Indicador']]
+        estados = tabla['Estado'].tolist()
+        eje.barh(etiquetas, tabla['Meta Proyectada'].fillna(0), color=[colores.get(e, '#dddddd') for e in estados],
+                 edgecolor=[bordes.get(e, '#999999') for e in estados])
+        eje.scatter(tabla['Meta Anual (%)'], etiquetas, marker='|', s=300, color='#333333', label='Meta Anual',
+                    zorder=3)
+        eje.legend(loc='lower right')
+        eje.set_xlabel('Meta Proyectada (%)')
+        eje.set_title('Meta Proyectada vs Meta Anual')
+    eje.invert_yaxis()
+    eje.set_xlim(0, 100)
+    figura.suptitle(reporte.titulo)
+    return figura
+
+
+def _color_cumplimiento(valor):
+    # Misma escala que el gráfico del ranking en el dashboard (rojo -> amarillo -> verde)
+    return '#d73027' if valor < 50 else '#fee08b' if valor < 80 else '#1a9850'
+
+
+def _escribir_png(reporte, ruta, avance):
+    _figura(reporte).savefig(ruta, dpi=150)
+    avance(0.9, "Imagen")
+
+
+def _escribir_pdf(reporte, ruta, avance):
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    # Institución: el ranking (una fila por unidad), no todos los indicadores
+    tabla = reporte.tablas.get('Ranking', reporte.tablas['Meta Proyectada'])
+    columnas = [c for c in tabla.columns if c not in MESES and c != 'Meta Anual (%)']
+    colores = {estado: _css(estilo)['background-color'] for estado, estilo in ESTILOS_ESTADO.items()}
+    paginas = max(1, -(-len(tabla) // FILAS_POR_PAGINA))
+
+    with PdfPages(ruta) as pdf:
+        pdf.savefig(_figura(reporte))
+        for pagina in range(paginas):
+            parte = tabla.iloc[pagina * FILAS_POR_PAGINA:(pagina + 1) * FILAS_POR_PAGINA]
+            figura = Figure(figsize=(11, 8.5))
+            eje = figura.add_subplot()
+            eje.axis('off')
+            texto = [[_texto_celda(columna, valor) for columna, valor in zip(columnas, fila)]
+                     for fila in parte[columnas].itertuples(index=False)]
+            if texto:
+                celdas = eje.table(cellText=texto, colLabels=columnas, loc='upper center', cellLoc='left')
+                celdas.auto_set_font_size(False)
+                celdas.set_fontsize(7)
+                if 'Estado' in columnas and 'Meta Proyectada' in columnas:
+                    j = columnas.index('Meta Proyectada')
+                    for i, estado in enumerate(parte['Estado'], start=1):
+                        celdas[i, j].set_facecolor(colores.get(estado, 'white'))
+            eje.set_title(f"{reporte.titulo} — página {pagina + 1} de {paginas}", fontsize=9)
+            pdf.savefig(figura)
+            avance(0.3 + 0.6 * (pagina + 1) / paginas, f"Página {pagina + 1} de {paginas}")
+
+
+def _texto_celda(columna, valor):
+    if columna == 'Estado':
+        # Sin el emoji final (las fuentes de matplotlib no lo traen); el color ya lo indica
+        return str(valor).rsplit(' ', 1)[0]
+    if isinstance(valor, (float, np.floating)):
+        if np.isnan(valor):
+            return 'N/A'
+        if columna in _COLUMNAS_PORCENTAJE:
+            return f"{valor:.1f}%"
+        return f"{valor:g}"
+    texto = str(valor)
+    return texto if len(texto) <= 60 else texto[:57] + '...'
+
+
+def _escribir_parquet(reporte, ruta, avance):
+    # Tabla principal de indicadores (Parquet guarda una sola tabla por archivo)
+    reporte.tablas['Meta Proyectada'].to_parquet(ruta, index=False)
+    avance(0.9, "Parquet")
+
+
+_ESCRITORES = {
+    'xlsx': _escribir_xlsx,
+    'pdf': _escribir_pdf,
+    'png': _escribir_png,
+    'parquet': _escribir_parquet,
+}
+
+
+def exportar(datos, solicitud, ruta, avance=lambda fraccion, mensaje: None, anterior=None):
+    """Genera el reporte de ``solicitud`` en ``ruta`` (sin caché ni pool)."""
+    if solicitud.formato not in _ESCRITORES:
+        raise ValueError(f"Formato de exportación desconocido: {solicitud.formato!r}")
+    avance(0.05, "Calculando Meta Proyectada")
+    reporte = construir_reporte(datos, solicitud, anterior)
+    avance(0.3, "Escribiendo archivo")
+    ruta = Path(ruta)
+    # Se escribe en un temporal (con la misma extensión, que algunos escritores usan) y se renombra al final
+    temporal = ruta.with_name(f".{ruta.stem}.{os.getpid()}.{threading.get_ident()}.tmp{ruta.suffix}")
+    try:
+        _ESCRITORES[solicitud.formato](reporte, temporal, avance)
+        os.replace(temporal, ruta)
+    finally:
+        temporal.unlink(missing_ok=True)
+    avance(1.0, "Listo")
+    return ruta
+
+
+# ============== TRABAJOS EN SEGUNDO PLANO ==============
+
+class TrabajoExportacion:
+    """Estado de un reporte pedido: ``estado``, ``progreso`` (0 a 1), ``mensaje`` y, al terminar, ``ruta``."""
+
+    def __init__(self, clave, solicitud, ruta):
+        self.clave = clave
+        self.solicitud = solicitud
+        self.ruta = ruta
+        self.nombre = nombre_archivo(solicitud)
+        self.estado = EN_COLA
+        self.progreso = 0.0
+        self.mensaje = EN_COLA
+        self.error = None
+        self.desde_cache = False
+        self.solicitado = time.time()
+        self.segundos = None
+
+    @property
+    def terminado(self):
+        return self.estado in (LISTO, ERROR)
+
+    def avance(self, fraccion, mensaje):
+        self.progreso = max(self.progreso, min(1.0, fraccion))
+        self.mensaje = mensaje
+
+
+class ExportadorReportes:
+    """Pool de hilos que genera reportes y los guarda en disco por su clave de contenido.
+
+    Un mismo reporte pedido por varias sesiones a la vez se genera una sola vez.
+    """
+
+    def __init__(self, directorio=RUTA_EXPORTACIONES, hilos=HILOS_EXPORTACION):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='exportacion')
+        self._trabajos = OrderedDict()
+        self._lock = threading.Lock()
+        self.estadisticas = {'solicitudes': 0, 'desde_cache': 0, 'generados': 0, 'errores': 0}
+
+    def solicitar(self, datos, huella, solicitud, anterior=None):
+        """Trabajo del reporte pedido: ya listo si estaba en disco, si no en cola o generándose."""
+        clave = clave_exportacion(huella, solicitud, anterior)
+        ruta = self.directorio / f"{clave}.{solicitud.formato}"
+        with self._lock:
+            self.estadisticas['solicitudes'] += 1
+            trabajo = self._trabajos.get(clave)
+            if trabajo is not None and trabajo.estado != ERROR and (not trabajo.terminado or ruta.exists()):
+                self._trabajos.move_to_end(clave)
+                return trabajo
+
+            trabajo = TrabajoExportacion(clave, solicitud, ruta)
+            self._trabajos[clave] = trabajo
+            if ruta.exists():
+                os.utime(ruta)
+                trabajo.desde_cache, trabajo.segundos = True, 0.0
+                trabajo.progreso, trabajo.mensaje, trabajo.estado = 1.0, "Desde caché", LISTO
+                self.estadisticas['desde_cache'] += 1
+            else:
+                self._pool.submit(self._generar, trabajo, datos, anterior)
+            self._podar()
+        return trabajo
+
+    def trabajo(self, clave):
+        with self._lock:
+            return self._trabajos.get(clave)
+
+    def _generar(self, trabajo, datos, anterior):
+        inicio = time.perf_counter()
+        trabajo.estado = GENERANDO
+        try:
+            exportar(datos, trabajo.solicitud, trabajo.ruta, trabajo.avance, anterior)
+        except Exception as e:
+            # El estado se publica al final: quien lo lee como terminado ya ve el resto de los campos
+            trabajo.error, trabajo.mensaje = e, str(e)
+            trabajo.segundos = time.perf_counter() - inicio
+            trabajo.estado = ERROR
+            self.estadisticas['errores'] += 1
+        else:
+            trabajo.segundos = time.perf_counter() - inicio
+            trabajo.estado = LISTO
+            self.estadisticas['generados'] += 1
+        self._limpiar()
+
+    def _podar(self):
+        # Sólo se olvidan trabajos terminados (sus archivos siguen en disco)
+        for clave in [c for c, t in self._trabajos.items() if t.terminado][:max(0, len(self._trabajos) - MAX_TRABAJOS)]:
+            del self._trabajos[clave]
+
+    def _limpiar(self):
+        archivos = sorted((p for p in self.directorio.iterdir() if p.is_file() and not p.name.startswith('.')),
+                          key=lambda p: p.stat().st_mtime, reverse=True)
+        for archivo in archivos[MAX_ARCHIVOS:]:
+            archivo.unlink(missing_ok=True)
+
@@ -0,0 +1,313 @@
+"""Fuentes de datos del dashboard de Metas Sanitarias.
+
+Cada fuente entrega el CSV crudo de la planilla (o un DataFrame sin limpiar en
+el caso de Parquet). La limpieza sigue ocurriendo en ``cargar_datos``.
+
+La fuente se elige con la variable de entorno ``METAS_FUENTE``:
+
+- ``sheets`` (por defecto): CSV publicado de Google Sheets.
+- ``csv:<ruta>``: archivo CSV local con la misma estructura.
+- ``parquet:<ruta>``: snapshot Parquet de la planilla cruda.
+- ``http:<url>``: cualquier servidor HTTP que entregue el CSV (p. ej. uno local).
+
+Para varios establecimientos, ``METAS_ESTABLECIMIENTOS`` lista una fuente por
+establecimiento con el mismo formato, separadas por ``;``:
+``Hospital Base=sheets:<url>;CESFAM Norte=csv:datos/norte.csv`` (ver
+``establecimientos.py``).
+
+pandas y requests se importan al leer la primera fuente: las constantes de
+este módulo (p. ej. ``DIRECTORIO_SNAPSHOT``) se usan en el arranque del
+dashboard, antes de cargar las librerías pesadas.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from email.utils import formatdate
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+
+# URL de Google Sheets
+URL_GOOGLE_SHEETS = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ7yKDhmdK-Hz4Qcr_wpQo9u4Vf6arzrcTEhqujrJUD59Lu9haFKyLQQDdUfgBijB7clgYHpp5x28SZ/pub?gid=304183817&single=true&output=csv"
+
+# (conexión, lectura) en segundos; pasado este tiempo se usa el último snapshot
+TIMEOUT_SEGUNDOS = (3.05, 10)
+
+# Directorio del último snapshot bueno y edad máxima para servirlo sin red
+DIRECTORIO_SNAPSHOT = Path(os.environ.get('METAS_SNAPSHOT_DIR', '.metas_cache'))
+MAX_EDAD_SNAPSHOT = float(os.environ.get('METAS_SNAPSHOT_MAX_EDAD', 15 * 60))
+
+# Reintentos de la sesión compartida ante errores transitorios del servidor (argumentos de ``urllib3.Retry``)
+REINTENTOS = dict(total=2, connect=2, read=1, backoff_factor=0.3,
+                  status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+
+# Conexiones simultáneas por host (una por establecimiento al cargar en paralelo)
+CONEXIONES_POR_HOST = 16
+
+_sesion = None
+_lock_sesion = threading.Lock()
+
+# Resultado de una lectura condicional. ``no_modificado=True`` implica ``contenido=None``:
+# el llamador debe conservar lo que ya tenía.
+RespuestaFuente = namedtuple('RespuestaFuente', 'contenido etag ultima_modificacion no_modificado')
+
+
+def obtener_sesion():
+    """Sesión HTTP compartida por el proceso (reutiliza conexiones y reintenta errores transitorios)."""
+    global _sesion
+    with _lock_sesion:
+        if _sesion is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            _sesion = requests.Session()
+            adaptador = HTTPAdapter(max_retries=Retry(**REINTENTOS), pool_connections=CONEXIONES_POR_HOST,
+                                    pool_maxsize=CONEXIONES_POR_HOST)
+            _sesion.mount('http://', adaptador)
+            _sesion.mount('https://', adaptador)
+        return _sesion
+
+
+def decodificar_csv(contenido):
+    """Convierte los bytes del CSV en DataFrame, igual que ``response.text`` en UTF-8."""
+    import pandas as pd
+
+    return pd.read_csv(StringIO(contenido.decode('utf-8', errors='replace')))
+
+
+class FuenteDatos:
+    """Interfaz común: ``leer_condicional`` entrega el CSV crudo sólo si cambió
+    respecto de los validadores recibidos; ``leer_inicial`` es la primera lectura
+    de quien aún no tiene datos; ``leer_bytes`` entrega el CSV siempre y
+    ``leer`` lo devuelve como DataFrame sin limpiar."""
+
+    nombre = 'base'
+
+    def leer_condicional(self, etag=None, ultima_modificacion=None):
+        raise NotImplementedError
+
+    def leer_inicial(self):
+        return self.leer_condicional()
+
+    def leer_bytes(self):
+        return self.leer_inicial().contenido
+
+    def leer(self):
+        return decodificar_csv(self.leer_bytes())
+
+    @property
+    def clave(self):
+        """Identifica la fuente (tipo y ubicación), p. ej. para nombrar su snapshot."""
+        return f"{type(self).__name__}:{self.nombre}"
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.nombre})"
+
+
+class FuenteHTTP(FuenteDatos):
+    """CSV servido por HTTP: la planilla publicada o un servidor local que la imite."""
+
+    def __init__(self, url, timeout=TIMEOUT_SEGUNDOS, sesion=None):
+        self.url = url
+        self.timeout = timeout
+        self.sesion = sesion
+        self.nombre = url
+
+    @property
+    def clave(self):
+        # ``nombre`` puede ser genérico (p. ej. 'Google Sheets'); la URL no
+        return f"{type(self).__name__}:{self.url}"
+
+    def leer_condicional(self, etag=None, ultima_modificacion=None):
+        # GET condicional: si la planilla no cambió el servidor responde 304 sin cuerpo
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if ultima_modificacion:
+            headers['If-Modified-Since'] = ultima_modificacion
+
+        sesion = self.sesion or obtener_sesion()
+        response = sesion.get(self.url, timeout=self.timeout, headers=headers)
+        if response.status_code == 304:
+            return RespuestaFuente(None, etag, ultima_modificacion, True)
+        response.raise_for_status()
+        return RespuestaFuente(response.content, response.headers.get('ETag'),
+                               response.headers.get('Last-Modified'), False)
+
+
+class FuenteGoogleSheets(FuenteHTTP):
+    def __init__(self, url=URL_GOOGLE_SHEETS, **kwargs):
+        super().__init__(url, **kwargs)
+        self.nombre = 'Google Sheets'
+
+
+class FuenteArchivo(FuenteDatos):
+    """Base de las fuentes locales: la fecha de modificación hace de validador."""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.nombre = str(self.ruta)
+
+    def leer_condicional(self, etag=None, ultima_modificacion=None):
+        modificado = formatdate(self.ruta.stat().st_mtime, usegmt=True)
+        if ultima_modificacion == modificado:
+            return RespuestaFuente(None, None, modificado, True)
+        return RespuestaFuente(self._leer_contenido(), None, modificado, False)
+
+    def _leer_contenido(self):
+        return self.ruta.read_bytes()
+
+
+class FuenteCSVLocal(FuenteArchivo):
+    pass
+
+
+class FuenteParquet(FuenteArchivo):
+    """Snapshot Parquet de la planilla cruda (requiere ``pyarrow``)."""
+
+    def _leer_contenido(self):
+        buffer = BytesIO()
+        self.leer().to_csv(buffer, index=False)
+        return buffer.getvalue()
+
+    def leer(self):
+        import pandas as pd
+
+        return pd.read_parquet(self.ruta)
+
+
+class FuenteConRespaldo(FuenteDatos):
+    """Envuelve otra fuente y mantiene en disco el último CSV descargado con éxito.
+
+    El snapshot y sus validadores se nombran con una huella de ``fuente.clave``,
+    de modo que dos fuentes que comparten directorio no se pisan.
+
+    En la primera lectura (``leer_inicial``), si el snapshot es más reciente que
+    ``max_edad`` se sirve sin tocar la red (arranque en frío = una lectura
+    local), y si la fuente falla o excede el timeout se sirve aunque esté
+    vencido. ``leer_condicional`` siempre consulta la fuente: quien ya tiene
+    datos decide cuándo revalidar (``METAS_TTL``) y recibe los errores.
+    """
+
+    def __init__(self, fuente, directorio=DIRECTORIO_SNAPSHOT, max_edad=MAX_EDAD_SNAPSHOT):
+        self.fuente = fuente
+        self.directorio = Path(directorio)
+        self.max_edad = max_edad
+        self.nombre = fuente.nombre
+        self.prefijo = f"ultimo_bueno-{hashlib.sha256(fuente.clave.encode()).hexdigest()[:16]}"
+        # 'fuente', 'snapshot' o 'snapshot (respaldo)' según el origen de la última lectura
+        self.origen = None
+        self.error = None
+
+    @property
+    def clave(self):
+        return self.fuente.clave
+
+    @property
+    def ruta_snapshot(self):
+        return self.directorio / f"{self.prefijo}.csv"
+
+    @property
+    def ruta_validadores(self):
+        return self.directorio / f"{self.prefijo}.json"
+
+    def edad_snapshot(self):
+        try:
+            return time.time() - self.ruta_snapshot.stat().st_mtime
+        except OSError:
+            return None
+
+    def guardar_snapshot(self, respuesta):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        # Primero el CSV: validadores viejos con un CSV nuevo sólo cuestan una descarga de más,
+        # validadores nuevos con el CSV viejo harían que un 304 conserve datos vencidos
+        _escribir_atomico(self.ruta_snapshot, respuesta.contenido)
+        _escribir_atomico(self.ruta_validadores, json.dumps({
+            'etag': respuesta.etag,
+            'ultima_modificacion': respuesta.ultima_modificacion,
+        }).encode())
+
+    def leer_snapshot(self):
+        try:
+            validadores = json.loads(self.ruta_validadores.read_text())
+        except (OSError, ValueError):
+            validadores = {}
+        return RespuestaFuente(self.ruta_snapshot.read_bytes(), validadores.get('etag'),
+                               validadores.get('ultima_modificacion'), False)
+
+    def leer_inicial(self):
+        self.error = None
+        edad = self.edad_snapshot()
+        if edad is not None and edad < self.max_edad:
+            self.origen = 'snapshot'
+            return self.leer_snapshot()
+        try:
+            return self.leer_condicional()
+        except Exception:
+            if edad is None:
+                raise
+            self.origen = 'snapshot (respaldo)'
+            return self.leer_snapshot()
+
+    def leer_condicional(self, etag=None, ultima_modificacion=None):
+        self.error = None
+        try:
+            respuesta = self.fuente.leer_condicional(etag, ultima_modificacion)
+        except Exception as e:
+            self.error = e
+            raise
+
+        self.origen = 'fuente'
+        if respuesta.no_modificado:
+            # Renovar la edad del snapshot: sigue siendo idéntico a la fuente
+            if self.edad_snapshot() is not None:
+                os.utime(self.ruta_snapshot)
+        else:
+            self.guardar_snapshot(respuesta)
+        return respuesta
+
+
+def _escribir_atomico(ruta, contenido):
+    """Escribe en un temporal del mismo directorio y lo reemplaza: nunca queda un archivo a medio escribir."""
+    temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    temporal.write_bytes(contenido)
+    os.replace(temporal, ruta)
+
+
+def crear_fuente(especificacion=None, directorio=DIRECTORIO_SNAPSHOT):
+    """Construye la fuente a partir de ``METAS_FUENTE`` (ver docstring del módulo).
+
+    ``directorio`` es donde las fuentes remotas guardan su último snapshot bueno.
+    """
+    especificacion = especificacion or os.environ.get('METAS_FUENTE', 'sheets')
+    tipo, _, valor = especificacion.partition(':')
+    tipo = tipo.lower()
+
+    if tipo == 'sheets':
+        return FuenteConRespaldo(FuenteGoogleSheets(valor or URL_GOOGLE_SHEETS), directorio=directorio)
+    if tipo == 'http':
+        return FuenteConRespaldo(FuenteHTTP(valor), directorio=directorio)
+    if tipo == 'csv':
+        return FuenteCSVLocal(valor)
+    if tipo == 'parquet':
+        return FuenteParquet(valor)
+    raise ValueError(f"Fuente de datos desconocida: {especificacion!r}")
+
+
+def iniciar_servidor_local(ruta_csv, puerto=0):
+    """Sirve ``ruta_csv`` por HTTP en localhost para probar sin red.
+
+    Retorna ``(servidor, url)``; detener con ``servidor.shutdown()``.
+    """
+    ruta_csv = Path(ruta_csv).resolve()
+    manejador = partial(SimpleHTTPRequestHandler, directory=str(ruta_csv.parent))
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    url = f"http://127.0.0.1:{servidor.server_port}/{ruta_csv.name}"
+    return servidor, url
@@ -0,0 +1,146 @@
+"""Figuras de evolución mensual, construidas a pedido y memorizadas.
+
+Las figuras se memorizan por el contenido de los 12 valores mensuales: si un
+indicador no cambió entre reruns (o entre sesiones) se reutiliza la misma
+figura en vez de volver a construirla.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from limpieza import MESES
+
+COLOR_LINEA = '#2E86AB'
+COLOR_MARCADOR = '#A23B72'
+COLOR_RELLENO = 'rgba(46, 134, 171, 0.2)'
+COLOR_BANDA_EXTERNA = 'rgba(46, 134, 171, 0.12)'
+COLOR_BANDA_INTERNA = 'rgba(46, 134, 171, 0.28)'
+COLOR_FONDO = 'rgba(120, 120, 120, 0.25)'
+
+
+def clave_valores(valores):
+    """Tupla hashable de los valores mensuales (NaN -> None) para memorizar figuras."""
+    return tuple(None if v is None or v != v else float(v) for v in valores)
+
+
+def tiene_datos(clave):
+    return any(v is not None for v in clave)
+
+
+@lru_cache(maxsize=512)
+def figura_evolucion(clave):
+    """Gráfico de evolución mensual de un indicador; ``clave`` viene de ``clave_valores``."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=MESES,
+        y=list(clave),
+        mode='lines+markers',
+        name='Cumplimiento',
+        line=dict(color=COLOR_LINEA, width=3),
+        marker=dict(size=10, color=COLOR_MARCADOR),
+        fill='tozeroy',
+        fillcolor=COLOR_RELLENO
+    ))
+
+    fig.update_layout(
+        title="Evolución Mensual",
+        xaxis_title="Mes",
+        yaxis_title="Cumplimiento (%)",
+        hovermode='x unified',
+        height=350,
+        showlegend=False,
+        yaxis=dict(
+            ticksuffix="%",
+            range=[0, 100]  # Escala de 0% a 100%
+        )
+    )
+    return fig
+
+
+@lru_cache(maxsize=32)
+def figura_multiples(titulos, claves, columnas=3):
+    """Todos los indicadores en una sola figura de subgráficos ("small multiples").
+
+    ``titulos`` y ``claves`` son tuplas paralelas (una entrada por indicador).
+    """
+    filas = max(1, math.ceil(len(claves) / columnas))
+    fig = make_subplots(
+        rows=filas, cols=columnas,
+        subplot_titles=titulos,
+        shared_xaxes=True, shared_yaxes=True,
+        vertical_spacing=min(0.08, 0.9 / filas)
+    )
+    for i, clave in enumerate(claves):
+        fig.add_trace(go.Scatter(
+            x=MESES,
+            y=list(clave),
+            mode='lines+markers',
+            name=titulos[i],
+            line=dict(color=COLOR_LINEA, width=2),
+            marker=dict(size=5, color=COLOR_MARCADOR),
+            fill='tozeroy',
+            fillcolor=COLOR_RELLENO
+        ), row=i // columnas + 1, col=i % columnas + 1)
+
+    fig.update_yaxes(ticksuffix="%", range=[0, 100])
+    fig.update_xaxes(showticklabels=False)
+    fig.update_layout(
+        height=220 * filas,
+        showlegend=False,
+        margin=dict(t=40, b=20)
+    )
+    # Títulos más chicos para que quepan en cada celda
+    fig.update_annotations(font_size=11)
+    return fig
+
+
+def figura_bandas(bandas, fondo=None, destacadas=None, meses=MESES):
+    """Comparación entre unidades: bandas de percentiles, mediana y unidades destacadas.
+
+    ``bandas`` viene de ``comparacion.bandas_mensuales`` (columnas p10..p90),
+    ``fondo`` es una matriz unidades x meses y ``destacadas`` un dict
+    ``{nombre: valores mensuales}`` que se dibujan encima.
+    """
+    meses = list(meses)
+    fig = go.Figure()
+
+    if fondo is not None and len(fondo):
+        # Todas las unidades de fondo en una sola traza, separadas por huecos: una traza en vez de cientos
+        n = len(fondo)
+        y = np.column_stack([fondo[meses].to_numpy(dtype=float), np.full(n, np.nan)]).ravel()
+        fig.add_trace(go.Scatter(
+            x=(meses + [None]) * n,
+            y=y,
+            mode='lines',
+            name=f'Unidades ({n})',
+            line=dict(color=COLOR_FONDO, width=1),
+            hoverinfo='skip',
+        ))
+
+    for inferior, superior, color, nombre in (('p10', 'p90', COLOR_BANDA_EXTERNA, 'P10–P90'),
+                                              ('p25', 'p75', COLOR_BANDA_INTERNA, 'P25–P75')):
+        fig.add_trace(go.Scatter(x=meses, y=bandas[superior].tolist(), mode='lines',
+                                 line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=meses, y=bandas[inferior].tolist(), mode='lines', name=nombre,
+                                 line=dict(width=0), fill='tonexty', fillcolor=color))
+
+    fig.add_trace(go.Scatter(x=meses, y=bandas['p50'].tolist(), mode='lines', name='Mediana',
+                             line=dict(color=COLOR_LINEA, width=3, dash='dash')))
+
+    for nombre, valores in (destacadas or {}).items():
+        fig.add_trace(go.Scatter(x=meses, y=list(valores), mode='lines+markers', name=nombre,
+                                 line=dict(width=3), marker=dict(size=8)))
+
+    fig.update_layout(
+        title="Unidades comparadas: percentiles por mes",
+        xaxis_title="Mes",
+        yaxis_title="Cumplimiento promedio (%)",
+        hovermode='x unified',
+        height=450,
+        yaxis=dict(ticksuffix="%", range=[0, 100]),
+        legend=dict(orientation='h', yanchor='bottom', y=-0.35)
+    )
+    return fig
@@ -0,0 +1,171 @@
+"""Histórico multianual de los indicadores de la planilla.
+
+La planilla publicada sólo tiene el año en curso (Enero..Diciembre sin año).
+Cada ingesta guarda los datos limpios bajo un año en un archivo SQLite local y
+escribe únicamente las filas (indicadores) que cambiaron desde la ingesta
+anterior de ese año:
+
+- ``indicadores``: versión vigente de cada (año, unidad, indicador), con su
+  descripción, meta, ponderación y los 12 meses.
+- ``historial``: registro append-only de cada versión escrita, con su ingesta
+  (``retirado = 1`` cuando el indicador desapareció de la planilla).
+
+Leer un año completo es un recorrido por la clave primaria, sin volver a
+descargar planillas antiguas.
+"""
+import os
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fuentes import DIRECTORIO_SNAPSHOT
+from limpieza import MESES
+
+RUTA_HISTORICO = Path(os.environ.get('METAS_HISTORICO_DB', DIRECTORIO_SNAPSHOT / 'historico.sqlite'))
+
+# Año bajo el que se guarda la planilla publicada
+ANIO_ACTUAL = int(os.environ.get('METAS_ANIO', date.today().year))
+
+# Columnas de los datos limpios que se guardan por indicador, además de la clave y los meses
+COLUMNAS_INDICADOR = ['Descripcion', 'Formula', 'Tipo', 'Periodicidad', 'Meta_Anual_Display',
+                      'Meta_Anual_Valor', 'Meta_Anual_Comparable', 'Ponderacion_Num']
+
+_CLAVE = ['Unidad_Desempeno', 'Indicador']
+_COLUMNAS = _CLAVE + COLUMNAS_INDICADOR + MESES
+
+_DEFINICION = """
+    anio INTEGER NOT NULL,
+    Unidad_Desempeno TEXT NOT NULL,
+    Indicador REAL NOT NULL,
+    Descripcion TEXT,
+    Formula TEXT,
+    Tipo TEXT,
+    Periodicidad TEXT,
+    Meta_Anual_Display TEXT,
+    Meta_Anual_Valor REAL,
+    Meta_Anual_Comparable INTEGER,
+    Ponderacion_Num REAL,
+""" + ''.join(f'    {mes} REAL,\n' for mes in MESES) + """    ingesta INTEGER NOT NULL"""
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS ingestas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    anio INTEGER NOT NULL,
+    instante REAL NOT NULL,
+    filas INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS indicadores (
+{_DEFINICION},
+    PRIMARY KEY (anio, Unidad_Desempeno, Indicador)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS indicadores_unidad ON indicadores (Unidad_Desempeno, anio);
+CREATE TABLE IF NOT EXISTS historial (
+{_DEFINICION},
+    retirado INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS historial_indicador ON historial (anio, Unidad_Desempeno, Indicador);
+"""
+
+
+class AlmacenHistorico:
+    def __init__(self, ruta=RUTA_HISTORICO):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with self._conectar() as conexion:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.executescript(_ESQUEMA)
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=10)
+
+    def ingresar(self, df, anio=ANIO_ACTUAL):
+        """Guarda los datos limpios ``df`` bajo ``anio``, escribiendo sólo las filas que cambiaron.
+
+        Un indicador repetido dentro de una unidad se guarda una sola vez (la
+        primera fila); los que ya no están en ``df`` se quitan de ese año.
+        Retorna la cantidad de filas escritas; 0 si la planilla no cambió, en
+        cuyo caso no se registra ingesta.
+        """
+        nuevas = df.drop_duplicates(subset=_CLAVE)[_COLUMNAS].reset_index(drop=True)
+        nuevas['Indicador'] = nuevas['Indicador'].astype(float)
+        nuevas['Meta_Anual_Comparable'] = nuevas['Meta_Anual_Comparable'].astype(int)
+
+        with self._conectar() as conexion:
+            previas = pd.read_sql_query(
+                f"SELECT {', '.join(_COLUMNAS)} FROM indicadores WHERE anio = ?", conexion, params=(anio,))
+
+            unido = nuevas.merge(previas, on=_CLAVE, how='outer', suffixes=('', '_previo'), indicator=True)
+            retirado = (unido['_merge'] == 'right_only').to_numpy()
+            distinto = retirado.copy()
+            for columna in COLUMNAS_INDICADOR + MESES:
+                actual, anterior = unido[columna], unido[f'{columna}_previo']
+                distinto |= ~((actual == anterior) | (actual.isna() & anterior.isna())).to_numpy(dtype=bool)
+            if not distinto.any():
+                return 0
+
+            ingesta = conexion.execute(
+                'INSERT INTO ingestas (anio, instante, filas) VALUES (?, ?, ?)',
+                (anio, time.time(), int(distinto.sum()))
+            ).lastrowid
+
+            escritas = unido.loc[distinto & ~retirado, _COLUMNAS]
+            retiradas = unido.loc[retirado, [*_CLAVE, *(f'{c}_previo' for c in COLUMNAS_INDICADOR + MESES)]]
+            retiradas.columns = _COLUMNAS
+
+            marcadores = ', '.join('?' * (len(_COLUMNAS) + 2))
+            conexion.executemany(
+                f"INSERT OR REPLACE INTO indicadores (anio, {', '.join(_COLUMNAS)}, ingesta) VALUES ({marcadores})",
+                [(anio, *fila, ingesta) for fila in _registros(escritas)]
+            )
+            conexion.executemany(
+                'DELETE FROM indicadores WHERE anio = ? AND Unidad_Desempeno = ? AND Indicador = ?',
+                [(anio, unidad, indicador) for unidad, indicador in retiradas[_CLAVE].itertuples(index=False)]
+            )
+            conexion.executemany(
+                f"INSERT INTO historial (anio, {', '.join(_COLUMNAS)}, ingesta, retirado) VALUES ({marcadores}, ?)",
+                [(anio, *fila, ingesta, 0) for fila in _registros(escritas)]
+                + [(anio, *fila, ingesta, 1) for fila in _registros(retiradas)]
+            )
+        return int(distinto.sum())
+
+    def anios(self):
+        with self._conectar() as conexion:
+            return [fila[0] for fila in conexion.execute('SELECT DISTINCT anio FROM indicadores ORDER BY anio')]
+
+    def ultima_ingesta(self):
+        """Id de la última ingesta (sirve como clave de caché de las consultas)."""
+        with self._conectar() as conexion:
+            return conexion.execute('SELECT MAX(id) FROM ingestas').fetchone()[0]
+
+    def cargar_anio(self, anio):
+        """Indicadores de ``anio`` en el formato de los datos limpios (columna ``Anio`` incluida)."""
+        return self._consultar('anio = ?', (anio,))
+
+    def cargar_unidad(self, unidad):
+        """Todos los años de ``unidad``, para comparar año contra año."""
+        return self._consultar('Unidad_Desempeno = ?', (unidad,))
+
+    def _consultar(self, filtro, parametros):
+        with self._conectar() as conexion:
+            df = pd.read_sql_query(
+                f"SELECT anio AS Anio, {', '.join(_COLUMNAS)} FROM indicadores WHERE {filtro} "
+                "ORDER BY anio, Unidad_Desempeno, Indicador",
+                conexion, params=parametros)
+        df['Meta_Anual_Comparable'] = df['Meta_Anual_Comparable'].fillna(0).astype(bool)
+        df[MESES] = df[MESES].astype(float)
+        return df
+
+
+def meses_del_anio(df_historico, anio, indicadores, meses=MESES):
+    """Bloque (indicadores x meses) de ``anio`` alineado con ``indicadores``; NaN si el indicador no estaba."""
+    del_anio = df_historico[df_historico['Anio'] == anio].drop_duplicates('Indicador', keep='last')
+    return del_anio.set_index('Indicador')[meses].reindex(indicadores).to_numpy(dtype=float)
+
+
+def _registros(df):
+    """Filas de ``df`` como tuplas con ``None`` en lugar de NaN (para sqlite3)."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
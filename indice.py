@@ -0,0 +1,76 @@
+"""Índice por Unidad de Desempeño construido una vez por cada carga de datos.
+
+Evita recorrer y copiar ``df_original`` completo en cada rerun: seleccionar una
+unidad es una búsqueda en diccionario. Las filas se guardan agrupadas por
+unidad (en el orden de aparición), de modo que cada unidad es un rango
+contiguo: sus columnas descriptivas y su bloque de meses (filas x 12) son
+vistas sobre los datos compartidos, sin una copia por unidad. El bloque es el
+mismo arreglo ``float64`` que respalda los meses de ``df`` (ver
+``nucleo.construir_datos`` y ``compartido.py``), así los meses se guardan una
+sola vez.
+"""
+import numpy as np
+import pandas as pd
+
+from limpieza import MESES
+
+
+def agrupar_por_unidad(df, columna='Unidad_Desempeno'):
+    """``df`` con las filas de cada unidad contiguas, en orden de aparición y sin alterar el orden interno."""
+    codigos, _ = pd.factorize(df[columna], sort=False)
+    if _agrupado(codigos):
+        return df
+    return df.take(np.argsort(codigos, kind='stable')).reset_index(drop=True)
+
+
+def _agrupado(codigos):
+    return not np.any(np.diff(codigos) < 0)
+
+
+class IndiceUnidades:
+    def __init__(self, df, columna='Unidad_Desempeno', meses=MESES, bloque=None):
+        """``bloque`` (filas x meses alineado con ``df``) reutiliza un arreglo existente, por
+        ejemplo el mapeado de ``compartido.py``; en ese caso ``df`` debe venir agrupado por unidad."""
+        self.columna = columna
+        self.meses = list(meses)
+
+        codigos, unidades = pd.factorize(df[columna], sort=False)
+        if not _agrupado(codigos):
+            if bloque is not None:
+                raise ValueError("Con un bloque de meses dado, el DataFrame debe venir agrupado por unidad")
+            orden = np.argsort(codigos, kind='stable')
+            df, codigos = df.take(orden), codigos[orden]
+        # Mismo orden de aparición que ``unique()`` para el selector
+        self.unidades = unidades.tolist()
+        limites = np.searchsorted(codigos, np.arange(len(self.unidades) + 1))
+        self._rangos = {unidad: (limites[i], limites[i + 1]) for i, unidad in enumerate(self.unidades)}
+
+        self._info = df[[c for c in df.columns if c not in self.meses]]
+        if bloque is None:
+            bloque = np.ascontiguousarray(df[self.meses].to_numpy(dtype=np.float64))
+            bloque.setflags(write=False)
+        self._bloque = bloque
+
+    def __len__(self):
+        return len(self.unidades)
+
+    def __contains__(self, unidad):
+        return unidad in self._rangos
+
+    def info(self, unidad):
+        """Columnas descriptivas (todo salvo los meses) de la unidad."""
+        inicio, fin = self._rangos[unidad]
+        return self._info.iloc[inicio:fin].reset_index(drop=True)
+
+    def valores_mensuales(self, unidad):
+        """Bloque de solo lectura (indicadores x 12 meses)."""
+        inicio, fin = self._rangos[unidad]
+        return self._bloque[inicio:fin]
+
+    def frame(self, unidad):
+        """DataFrame de la unidad con índice 0..n-1, equivalente a filtrar ``df_original``.
+
+        Los meses son una copia: el editor los modifica sin tocar el bloque compartido.
+        """
+        meses = pd.DataFrame(self.valores_mensuales(unidad), columns=self.meses, copy=True)
+        return pd.concat([self.info(unidad), meses], axis=1)
@@ -0,0 +1,262 @@
+"""Lectura de la planilla por bloques, con columnas por encabezado y cuarentena.
+
+En lugar de decodificar todo el CSV a texto y armar un DataFrame de cadenas
+con las 20 columnas antes de limpiar, la planilla se lee directamente desde
+los bytes (o un archivo) en bloques de ``FILAS_POR_BLOQUE`` filas, todas las
+columnas como ``str`` explícito. De cada bloque se conservan sólo las columnas
+reconocidas y se limpia apenas se lee (meses a ``float``), así que las cadenas
+crudas de un solo bloque conviven en memoria con el resultado ya tipado.
+
+Las columnas se ubican por su encabezado (tolerando tildes, mojibake y
+variantes como "N°"); si el encabezado no identifica las columnas obligatorias
+o los 12 meses (p. ej. "Ene", "Feb") y hay al menos 20 columnas, se usa la
+posición como antes. Las filas que no se pueden usar no se descartan en
+silencio ni invalidan el archivo: quedan en ``cuarentena`` con su número de
+línea y el motivo.
+"""
+import os
+import re
+import unicodedata
+import warnings
+from collections import namedtuple
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from limpieza import MESES, procesar_meta_anual, reparar_mojibake
+
+# Filas leídas y limpiadas por bloque
+FILAS_POR_BLOQUE = int(os.environ.get('METAS_FILAS_POR_BLOQUE', 50_000))
+
+# Nombres de las 20 columnas de la planilla, en orden (lectura por posición)
+COLUMNAS_PLANILLA = ['Unidad_Desempeno', 'Indicador', 'Descripcion', 'Formula',
+                     'Tipo', 'Periodicidad', 'Meta_Anual', 'Ponderacion'] + MESES
+
+COLUMNAS_TEXTO = ['Unidad_Desempeno', 'Descripcion', 'Formula', 'Tipo', 'Periodicidad', 'Meta_Anual']
+
+# Sin estas columnas la planilla no se puede interpretar
+COLUMNAS_OBLIGATORIAS = ['Unidad_Desempeno', 'Indicador', 'Meta_Anual']
+
+# Encabezados aceptados (normalizados: sin tildes, minúsculas, sólo letras y números)
+ALIAS_COLUMNAS = {
+    'Unidad_Desempeno': ['unidad de desempeno', 'unidad desempeno', 'unidad'],
+    'Indicador': ['n', 'no', 'nro', 'num', 'numero', 'n indicador', 'numero indicador', 'id indicador'],
+    'Descripcion': ['descripcion', 'descripcion indicador', 'nombre indicador'],
+    'Formula': ['formula', 'formula de calculo'],
+    'Tipo': ['tipo', 'tipo indicador'],
+    'Periodicidad': ['periodicidad', 'frecuencia'],
+    'Meta_Anual': ['meta anual', 'meta'],
+    'Ponderacion': ['ponderacion', 'peso'],
+    **{mes: [mes.lower()] for mes in MESES},
+}
+ALIAS_COLUMNAS['Septiembre'].append('setiembre')
+
+COLUMNAS_CUARENTENA = ['Linea', 'Motivo', 'Contenido', 'Conservada']
+
+# Resultado de leer una planilla: datos limpios, filas en cuarentena y columnas que no venían
+LecturaPlanilla = namedtuple('LecturaPlanilla', 'df cuarentena columnas_faltantes')
+
+_PATRON_FILA_MALFORMADA = re.compile(r'line (\d+): expected (\d+) fields, saw (\d+)')
+
+
+def normalizar_encabezado(texto):
+    texto = reparar_mojibake(pd.Series([str(texto)])).iloc[0]
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+    return re.sub(r'[^a-z0-9]+', ' ', texto).strip()
+
+
+def mapear_columnas(encabezados):
+    """``{posición: columna}`` de las columnas reconocidas y lista de columnas faltantes.
+
+    Si el encabezado no identifica las columnas obligatorias o alguno de los
+    meses pero hay al menos 20 columnas, se usan las 20 primeras por posición
+    (formato histórico).
+    """
+    alias = {nombre: columna for columna, nombres in ALIAS_COLUMNAS.items() for nombre in nombres}
+    mapa = {}
+    for posicion, encabezado in enumerate(encabezados):
+        columna = alias.get(normalizar_encabezado(encabezado))
+        if columna is not None and columna not in mapa.values():
+            mapa[posicion] = columna
+
+    reconocidas = set(mapa.values())
+    completas = all(c in reconocidas for c in COLUMNAS_OBLIGATORIAS + MESES)
+    if not completas and len(encabezados) >= len(COLUMNAS_PLANILLA):
+        return dict(enumerate(COLUMNAS_PLANILLA)), []
+    if not all(c in reconocidas for c in COLUMNAS_OBLIGATORIAS):
+        faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in mapa.values()]
+        raise ValueError(f"El archivo CSV no tiene la estructura esperada: faltan las columnas {faltantes}")
+    return mapa, [c for c in COLUMNAS_PLANILLA if c not in mapa.values()]
+
+
+def _abrir(origen):
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return BytesIO(origen)
+    return Path(origen).open('rb')
+
+
+def leer_planilla(origen, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Lee y limpia la planilla desde bytes o una ruta, bloque por bloque.
+
+    Retorna ``LecturaPlanilla``: el DataFrame limpio (mismas columnas que antes),
+    la cuarentena (``Linea``, ``Motivo``, ``Contenido`` y ``Conservada``, esta
+    última verdadera si la fila se usó con la celda problemática vacía) y las
+    columnas que faltaban en el archivo (se completan vacías).
+    """
+    bloques, cuarentenas = [], []
+    mapa = faltantes = None
+    with _abrir(origen) as flujo:
+        for encabezado, lineas, inicios in _bloques(flujo, filas_por_bloque):
+            if mapa is None:
+                mapa, faltantes = mapear_columnas(_leer_csv(encabezado).columns)
+                posiciones = sorted(mapa)
+
+            # El encabezado se repite como primer registro: si el primer registro real trajera
+            # columnas de más, pandas lo tomaría como índice en lugar de avisarlo
+            with warnings.catch_warnings(record=True) as avisos:
+                warnings.simplefilter('always')
+                bloque = _leer_csv(encabezado + encabezado + b''.join(lineas), on_bad_lines='warn').iloc[1:]
+
+            # Registros con columnas de más: pandas los omite y avisa su número (encabezado = 1, repetido = 2)
+            omitidos = {}
+            for aviso in avisos:
+                for registro, esperadas, vistas in _PATRON_FILA_MALFORMADA.findall(str(aviso.message)):
+                    omitidos[int(registro) - 3] = f"{vistas} columnas, se esperaban {esperadas}"
+            if omitidos:
+                cuarentenas.append(_cuarentena_malformados(omitidos, lineas, inicios))
+            inicios = np.delete(np.asarray(inicios), list(omitidos))
+
+            bloque = bloque.iloc[:, posiciones].set_axis([mapa[p] for p in posiciones], axis=1)
+            for columna in faltantes:
+                # Vacías pero de texto, como las leídas: la limpieza usa ``.str`` en todas
+                bloque[columna] = pd.Series(pd.NA, dtype='str', index=bloque.index)
+            limpio, cuarentena = limpiar_bloque(bloque[COLUMNAS_PLANILLA], inicios)
+            bloques.append(limpio)
+            cuarentenas.append(cuarentena)
+
+    df = pd.concat(bloques, ignore_index=True)
+    cuarentena = pd.concat([c for c in cuarentenas if len(c)] or [cuarentenas[0]], ignore_index=True)
+    cuarentena = cuarentena.sort_values('Linea', kind='stable', ignore_index=True)
+    return LecturaPlanilla(df, cuarentena, faltantes)
+
+
+def _leer_csv(contenido, **opciones):
+    return pd.read_csv(BytesIO(contenido), dtype=str, encoding='utf-8', encoding_errors='replace',
+                       skip_blank_lines=False, **opciones)
+
+
+def _bloques(flujo, filas_por_bloque):
+    """Parte el CSV en bloques de ``filas_por_bloque`` registros sin cortar campos entre comillas.
+
+    Entrega ``(encabezado, líneas, inicios)``: los bytes del encabezado, las
+    líneas del bloque y la línea del archivo donde empieza cada registro. El
+    primer bloque se entrega aunque no tenga registros.
+    """
+    encabezado, lineas, inicios = None, [], []
+    en_comillas, entregados = False, 0
+    for numero, linea in enumerate(flujo, start=1):
+        if not en_comillas:
+            inicios.append(numero)
+        lineas.append(linea)
+        if linea.count(b'"') % 2:
+            en_comillas = not en_comillas
+        if en_comillas:
+            continue
+        if encabezado is None:
+            encabezado, lineas, inicios = b''.join(lineas).rstrip(b'\r\n') + b'\n', [], []
+        elif len(inicios) >= filas_por_bloque:
+            yield encabezado, lineas, inicios
+            lineas, inicios = [], []
+            entregados += 1
+    if encabezado is None:
+        raise ValueError("El archivo CSV está vacío")
+    if lineas or not entregados:
+        yield encabezado, lineas, inicios
+
+
+def _cuarentena_malformados(omitidos, lineas, inicios):
+    """Filas de cuarentena de los registros ``{posición en el bloque: detalle}`` que pandas omitió."""
+    limites = list(inicios) + [inicios[0] + len(lineas)]
+    contenido = [
+        b''.join(lineas[limites[k] - inicios[0]:limites[k + 1] - inicios[0]]).decode('utf-8', errors='replace').rstrip('\r\n')
+        for k in omitidos
+    ]
+    return pd.DataFrame({
+        'Linea': [inicios[k] for k in omitidos],
+        'Motivo': [f"Columnas de más ({detalle})" for detalle in omitidos.values()],
+        'Contenido': contenido,
+        'Conservada': False,
+    })
+
+
+def limpiar_bloque(df, lineas):
+    """Limpia un bloque de la planilla (todas las columnas como texto) con sus números de línea.
+
+    Retorna ``(limpio, cuarentena)``. Las filas vacías se descartan; las que
+    tienen datos pero no unidad o no un número de indicador van a la
+    cuarentena; los valores mensuales no numéricos quedan vacíos y se informan.
+    """
+    # Eliminar filas vacías
+    vacia = df.isna().all(axis=1).to_numpy()
+    df = df[~vacia].copy()
+    lineas = np.asarray(lineas)[~vacia]
+    sin_unidad = df['Unidad_Desempeno'].isna().to_numpy()
+    crudo = df[['Unidad_Desempeno', 'Indicador', 'Descripcion', 'Meta_Anual']]
+
+    # Convertir Descripcion a string y corregir encoding
+    df['Descripcion'] = df['Descripcion'].fillna('Sin descripción').astype(str)
+
+    # Corregir problemas de encoding en todas las columnas de texto (una pasada por columna)
+    for col in COLUMNAS_TEXTO:
+        df[col] = reparar_mojibake(df[col])
+
+    # Convertir Indicador a numérico
+    df['Indicador'] = pd.to_numeric(df['Indicador'], errors='coerce').astype(float)
+    sin_indicador = df['Indicador'].isna().to_numpy() & ~sin_unidad
+
+    # Convertir Ponderacion a numérico - manejar diferentes formatos
+    df['Ponderacion'] = df['Ponderacion'].astype(str)
+    df['Ponderacion'] = df['Ponderacion'].str.replace(',', '.')  # Reemplazar comas por puntos
+    df['Ponderacion_Num'] = pd.to_numeric(df['Ponderacion'], errors='coerce')
+
+    # Formatear ponderación como porcentaje
+    df['Ponderacion_Display'] = df['Ponderacion_Num'].apply(
+        lambda x: f"{(x * 100):.1f}%" if pd.notna(x) else "N/A"
+    )
+
+    # Convertir Meta_Anual a string
+    df['Meta_Anual_Original'] = df['Meta_Anual'].astype(str)
+
+    # Procesar metas anuales en una sola pasada vectorizada (≥, decimales con coma, % y glosas)
+    df[['Meta_Anual_Display', 'Meta_Anual_Valor', 'Meta_Anual_Comparable']] = procesar_meta_anual(df['Meta_Anual'])
+
+    # Convertir columnas de meses a numérico (coma decimal) y a porcentaje
+    no_numericos = []
+    for mes in MESES:
+        texto = df[mes].str.strip().str.replace(',', '.', regex=False)
+        valores = pd.to_numeric(texto, errors='coerce')
+        invalido = (texto.notna() & (texto != '') & valores.isna()).to_numpy(dtype=bool)
+        if invalido.any():
+            no_numericos.append((invalido, mes))
+        df[mes] = valores * 100
+
+    descartada = sin_unidad | sin_indicador
+    motivos = [(sin_unidad, 'Sin Unidad de Desempeño', False),
+               (sin_indicador, 'Número de indicador vacío o no numérico', False)]
+    motivos += [(invalido & ~descartada, f'Valor no numérico en {mes} (se deja vacío)', True)
+                for invalido, mes in no_numericos]
+
+    partes = []
+    for mascara, motivo, conservada in motivos:
+        if mascara.any():
+            partes.append(pd.DataFrame({
+                'Linea': lineas[mascara],
+                'Motivo': motivo,
+                'Contenido': crudo[mascara].fillna('').agg(' | '.join, axis=1).to_numpy(),
+                'Conservada': conservada,
+            }))
+    cuarentena = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_CUARENTENA)
+
+    return df[~descartada], cuarentena
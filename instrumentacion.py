@@ -0,0 +1,214 @@
+"""Tramos con nombre para medir cada etapa de una ejecución del dashboard.
+
+Cada rerun de Streamlit es una ``Ejecucion`` con la lista de sus tramos
+(tiempo, filas procesadas y bytes). Al cerrarla se suma a las métricas del
+proceso, que pueden exportarse como texto Prometheus (``METAS_METRICAS_PUERTO``)
+y se escribe como una línea JSON en ``METAS_LOG_TRAMOS`` si está definido
+(``-`` para la salida de errores).
+
+    with tramo('limpieza', bytes=len(contenido)) as medida:
+        df = limpiar_datos(contenido)
+        medida.filas = len(df)
+
+Los tramos abiertos fuera de una ejecución (``lote.py``, hilos de fondo) sólo
+se suman a las métricas del proceso.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Archivo de log estructurado (una línea JSON por ejecución)
+RUTA_LOG_TRAMOS = os.environ.get('METAS_LOG_TRAMOS')
+
+# Puerto del endpoint de métricas en formato Prometheus (desactivado si no se define)
+PUERTO_METRICAS = os.environ.get('METAS_METRICAS_PUERTO')
+
+_log = logging.getLogger('metas.tramos')
+_ejecucion_actual = contextvars.ContextVar('ejecucion_actual', default=None)
+
+
+class Medida:
+    """Datos de un tramo que el código medido puede completar mientras corre."""
+    __slots__ = ('filas', 'bytes')
+
+    def __init__(self, filas=None, bytes=None):
+        self.filas = filas
+        self.bytes = bytes
+
+
+class Ejecucion:
+    """Tramos de un rerun, en el orden en que terminaron."""
+
+    def __init__(self, en_script=True):
+        self.inicio = time.time()
+        self._reloj = time.perf_counter()
+        self.tramos = []
+        self.profundidad = 0
+        self.segundos = None
+        # False mientras sólo han corrido callbacks previos al script
+        self.en_script = en_script
+
+    def registrar(self, nombre, inicio, segundos, medida, nivel):
+        self.tramos.append({'tramo': nombre, 'nivel': nivel, 'inicio': inicio - self._reloj,
+                            'segundos': segundos, 'filas': medida.filas, 'bytes': medida.bytes})
+
+    def desglose(self):
+        """Tramos en orden de inicio (los anidados quedan bajo el tramo que los contiene)."""
+        return sorted(self.tramos, key=lambda t: (t['inicio'], t['nivel']))
+
+    def cerrar(self):
+        self.segundos = time.perf_counter() - self._reloj
+        return self.segundos
+
+    def como_dict(self):
+        return {
+            'inicio': datetime.fromtimestamp(self.inicio, timezone.utc).isoformat(timespec='milliseconds'),
+            'segundos': self.segundos,
+            'tramos': self.tramos,
+        }
+
+
+class MetricasProceso:
+    """Acumulados por tramo de todas las ejecuciones del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tramos = {}
+        self.ejecuciones = 0
+        self.segundos_ejecuciones = 0.0
+
+    def sumar(self, nombre, segundos, medida):
+        with self._lock:
+            acumulado = self.tramos.setdefault(
+                nombre, {'conteo': 0, 'segundos': 0.0, 'maximo': 0.0, 'filas': 0, 'bytes': 0})
+            acumulado['conteo'] += 1
+            acumulado['segundos'] += segundos
+            acumulado['maximo'] = max(acumulado['maximo'], segundos)
+            acumulado['filas'] += medida.filas or 0
+            acumulado['bytes'] += medida.bytes or 0
+
+    def sumar_ejecucion(self, segundos):
+        with self._lock:
+            self.ejecuciones += 1
+            self.segundos_ejecuciones += segundos
+
+    def prometheus(self):
+        """Métricas en el formato de texto de Prometheus."""
+        with self._lock:
+            tramos = {nombre: dict(valores) for nombre, valores in self.tramos.items()}
+            lineas = [
+                '# HELP metas_ejecuciones_total Reruns completos del dashboard.',
+                '# TYPE metas_ejecuciones_total counter',
+                f'metas_ejecuciones_total {self.ejecuciones}',
+                '# HELP metas_ejecuciones_segundos_total Tiempo acumulado de los reruns.',
+                '# TYPE metas_ejecuciones_segundos_total counter',
+                f'metas_ejecuciones_segundos_total {self.segundos_ejecuciones:.6f}',
+            ]
+        series = [
+            ('metas_tramo_total', 'counter', 'Veces que se ejecutó cada tramo.', 'conteo', '{}'),
+            ('metas_tramo_segundos_total', 'counter', 'Tiempo acumulado por tramo.', 'segundos', '{:.6f}'),
+            ('metas_tramo_segundos_max', 'gauge', 'Tiempo máximo de una ejecución del tramo.', 'maximo', '{:.6f}'),
+            ('metas_tramo_filas_total', 'counter', 'Filas procesadas por tramo.', 'filas', '{}'),
+            ('metas_tramo_bytes_total', 'counter', 'Bytes procesados por tramo.', 'bytes', '{}'),
+        ]
+        for metrica, tipo, ayuda, campo, formato in series:
+            lineas.append(f'# HELP {metrica} {ayuda}')
+            lineas.append(f'# TYPE {metrica} {tipo}')
+            for nombre, valores in sorted(tramos.items()):
+                lineas.append(f'{metrica}{{tramo="{nombre}"}} {formato.format(valores[campo])}')
+        return '\n'.join(lineas) + '\n'
+
+
+METRICAS = MetricasProceso()
+
+
+def iniciar_ejecucion(desde_callback=False):
+    """Ejecución del rerun actual.
+
+    Los callbacks (p. ej. el ``on_change`` del editor) corren antes que el
+    script: llaman con ``desde_callback=True`` y el script reutiliza esa misma
+    ejecución, de modo que la edición queda en el desglose del rerun que
+    provocó. Una ejecución anterior que no se cerró (``st.stop``, ``st.rerun``
+    o una excepción) se cierra aquí.
+    """
+    ejecucion = _ejecucion_actual.get()
+    if ejecucion is not None and not ejecucion.en_script:
+        ejecucion.en_script = not desde_callback
+        return ejecucion
+    if ejecucion is not None:
+        finalizar_ejecucion(ejecucion)
+    ejecucion = Ejecucion(en_script=not desde_callback)
+    _ejecucion_actual.set(ejecucion)
+    return ejecucion
+
+
+def finalizar_ejecucion(ejecucion):
+    """Cierra la ejecución, la suma a las métricas del proceso y la escribe en el log."""
+    if _ejecucion_actual.get() is ejecucion:
+        _ejecucion_actual.set(None)
+    if ejecucion.segundos is not None:
+        return
+    METRICAS.sumar_ejecucion(ejecucion.cerrar())
+    if _log.isEnabledFor(logging.INFO):
+        _log.info(json.dumps(ejecucion.como_dict(), ensure_ascii=False))
+
+
+@contextmanager
+def tramo(nombre, filas=None, bytes=None):
+    """Mide el bloque ``with``; la ``Medida`` entregada permite informar filas y bytes."""
+    medida = Medida(filas, bytes)
+    ejecucion = _ejecucion_actual.get()
+    nivel = 0
+    if ejecucion is not None:
+        nivel = ejecucion.profundidad
+        ejecucion.profundidad += 1
+    inicio = time.perf_counter()
+    try:
+        yield medida
+    finally:
+        segundos = time.perf_counter() - inicio
+        METRICAS.sumar(nombre, segundos, medida)
+        if ejecucion is not None:
+            ejecucion.profundidad -= 1
+            ejecucion.registrar(nombre, inicio, segundos, medida, nivel)
+
+
+def configurar_log(ruta=RUTA_LOG_TRAMOS):
+    """Activa el log estructurado de ejecuciones (una línea JSON por rerun)."""
+    if not ruta or _log.handlers:
+        return
+    manejador = logging.StreamHandler(sys.stderr) if ruta == '-' else logging.FileHandler(ruta, encoding='utf-8')
+    manejador.setFormatter(logging.Formatter('%(message)s'))
+    _log.addHandler(manejador)
+    _log.setLevel(logging.INFO)
+    _log.propagate = False
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        cuerpo = METRICAS.prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_servidor_metricas(puerto, host='127.0.0.1'):
+    """Sirve ``/metrics`` en un hilo de fondo; retorna el servidor."""
+    servidor = ThreadingHTTPServer((host, int(puerto)), _ManejadorMetricas)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
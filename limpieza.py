@@ -0,0 +1,114 @@
+"""Funciones de limpieza de la planilla, vectorizadas sobre columnas completas."""
+import re
+
+import numpy as np
+import pandas as pd
+
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+         'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+# Caracteres que aparecen en la planilla y que Google Sheets a veces entrega
+# codificados en UTF-8 y leídos como Latin-1/Windows-1252 ("Ã¡" en vez de "á")
+_CARACTERES_REPARABLES = (
+    ''.join(chr(c) for c in range(0xA0, 0x100))
+    + '≥≤–—‘’“”•…€™'
+)
+
+
+def _construir_tabla_mojibake():
+    tabla = {}
+    for caracter in _CARACTERES_REPARABLES:
+        codificado = caracter.encode('utf-8')
+        for codec in ('latin-1', 'cp1252'):
+            try:
+                tabla[codificado.decode(codec)] = caracter
+            except UnicodeDecodeError:
+                # cp1252 no define 0x81, 0x8D, 0x8F, 0x90 ni 0x9D: basta con la variante Latin-1
+                pass
+    # Secuencias cuyo segundo byte se perdió en el camino: se conserva el
+    # reemplazo histórico del dashboard ("Ã" suelto era casi siempre "í")
+    tabla['Ã'] = 'í'
+    tabla['Â'] = ''
+    return tabla
+
+
+TABLA_MOJIBAKE = _construir_tabla_mojibake()
+
+# Una sola expresión, secuencias más largas primero para que el resultado no dependa del orden
+PATRON_MOJIBAKE = re.compile('|'.join(
+    re.escape(secuencia) for secuencia in sorted(TABLA_MOJIBAKE, key=len, reverse=True)
+))
+
+# Número que ``float()`` acepta tal cual (sin espacios, ya recortados antes)
+_DIGITOS = r'\d(?:_?\d)*'
+PATRON_NUMERO = rf'[+-]?(?:(?:(?:{_DIGITOS})?\.{_DIGITOS}|{_DIGITOS}\.?)(?:e[+-]?{_DIGITOS})?|inf|infinity|nan)'
+
+# Primer número seguido de % (mismo patrón que usaba la versión fila a fila)
+PATRON_PORCENTAJE = r'(\d+\.?\d*)%'
+
+
+def procesar_meta_anual(meta_anual):
+    """Interpreta la columna Meta_Anual completa.
+
+    Retorna un DataFrame con ``Meta_Anual_Display``, ``Meta_Anual_Valor`` y
+    ``Meta_Anual_Comparable`` alineado al índice de ``meta_anual``:
+
+    - ``≥`` se conserva en el display y se descarta para el valor.
+    - Las comas decimales se tratan como puntos.
+    - Los valores con ``%`` ya están en porcentaje; los decimales en (0, 1] se
+      multiplican por 100 y el resto se deja igual.
+    - Todo lo que no sea numérico es una glosa: se muestra tal cual y no es comparable.
+    """
+    # Corregir encoding específico para símbolos
+    meta_str = meta_anual.astype(str).str.strip().str.replace('â‰¥', '≥', regex=False)
+
+    tiene_mayor_igual = meta_str.str.contains('≥', regex=False).to_numpy(dtype=bool)
+    meta_limpia = meta_str.str.replace(',', '.', regex=False).str.replace('≥', '', regex=False).str.strip()
+    es_porcentaje = meta_limpia.str.contains('%', regex=False).to_numpy(dtype=bool)
+
+    # Rama porcentaje: extraer el número antes del %, ya está en porcentaje
+    valor_porcentaje = pd.to_numeric(
+        meta_limpia.str.extract(PATRON_PORCENTAJE, expand=False), errors='coerce'
+    ).to_numpy(dtype=float)
+
+    # Rama decimal: sólo lo que float() aceptaría, el resto es glosa
+    es_numero = meta_limpia.str.fullmatch(PATRON_NUMERO, flags=re.IGNORECASE).to_numpy(dtype=bool)
+    valor_decimal = pd.to_numeric(
+        meta_limpia.where(es_numero).str.replace('_', '', regex=False), errors='coerce'
+    ).to_numpy(dtype=float)
+    es_fraccion = (valor_decimal > 0) & (valor_decimal <= 1)
+    valor_decimal = np.where(es_fraccion, valor_decimal * 100, valor_decimal)
+
+    comparable = np.where(es_porcentaje, ~np.isnan(valor_porcentaje), es_numero)
+    valor = np.where(es_porcentaje, valor_porcentaje, valor_decimal)
+    valor = np.where(comparable, valor, np.nan)
+
+    # Formatear para display
+    prefijo = pd.Series(np.where(tiene_mayor_igual, '≥', ''), index=meta_anual.index)
+    display = prefijo + pd.Series(valor, index=meta_anual.index).map('{:.1f}%'.format).astype(str)
+    display = display.where(comparable, meta_str)
+
+    return pd.DataFrame({
+        'Meta_Anual_Display': display,
+        'Meta_Anual_Valor': valor,
+        'Meta_Anual_Comparable': comparable,
+    }, index=meta_anual.index)
+
+
+def reparar_mojibake(serie):
+    """Corrige el mojibake UTF-8/Latin-1 de una columna de texto en una sola pasada.
+
+    Convierte a ``str`` igual que antes y aplica ``TABLA_MOJIBAKE`` sólo sobre
+    los valores distintos de la columna, que en la planilla son pocos.
+    """
+    texto = serie.astype(str)
+    codigos, unicos = pd.factorize(texto, use_na_sentinel=False)
+    reparados = np.array([
+        PATRON_MOJIBAKE.sub(_reemplazo_mojibake, valor) if isinstance(valor, str) else valor
+        for valor in unicos
+    ], dtype=object)
+    return pd.Series(reparados[codigos], index=serie.index, name=serie.name, dtype=texto.dtype)
+
+
+def _reemplazo_mojibake(match):
+    return TABLA_MOJIBAKE[match.group(0)]
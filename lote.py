@@ -0,0 +1,97 @@
+"""Procesamiento en lote: reportes de todas las unidades sin abrir el dashboard.
+
+    python lote.py --salida reportes --formato csv json
+    METAS_FUENTE=csv:datos/metas.csv python lote.py --formato parquet
+
+Escribe ``proyecciones``, ``estadisticas`` y ``ranking`` en cada formato pedido,
+``cuarentena`` si la planilla tenía filas con problemas (ver ``ingesta.py``) y
+``calidad`` si hay valores mensuales marcados (ver ``calidad.py``).
+Con ``--historico`` agrega además la planilla al histórico multianual
+(``historico.py``) bajo ``--anio``.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from calidad import reporte_calidad
+from establecimientos import CargadorEstablecimientos, crear_fuentes
+from fuentes import crear_fuente
+from historico import ANIO_ACTUAL, AlmacenHistorico
+from nucleo import cargar, construir_datos, reporte_estadisticas, reporte_proyecciones
+from proyeccion import ESTRATEGIA_PREDETERMINADA, ESTRATEGIAS
+from ranking import proyeccion_mensual, ranking_unidades
+
+FORMATOS = ('csv', 'parquet', 'json')
+
+
+def escribir(df, ruta_base, formato):
+    ruta = ruta_base.with_suffix(f'.{formato}')
+    if formato == 'csv':
+        df.to_csv(ruta, index=False, encoding='utf-8')
+    elif formato == 'parquet':
+        df.to_parquet(ruta, index=False)
+    elif formato == 'json':
+        df.to_json(ruta, orient='records', force_ascii=False, indent=2)
+    return ruta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los reportes de Metas Sanitarias de todas las unidades.")
+    parser.add_argument('--fuente', help="Fuente de datos (mismo formato que METAS_FUENTE); si no se indica y "
+                                         "METAS_ESTABLECIMIENTOS está definido, se cargan todos los establecimientos")
+    parser.add_argument('--salida', default='reportes', help="Directorio de salida (por defecto: reportes)")
+    parser.add_argument('--formato', nargs='+', choices=FORMATOS, default=['csv'], help="Formatos a escribir")
+    parser.add_argument('--proyeccion', choices=list(ESTRATEGIAS), default=ESTRATEGIA_PREDETERMINADA,
+                        help=f"Estrategia de la Meta Proyectada (por defecto {ESTRATEGIA_PREDETERMINADA})")
+    parser.add_argument('--historico', action='store_true', help="Agregar la planilla al histórico multianual")
+    parser.add_argument('--anio', type=int, default=ANIO_ACTUAL, help=f"Año de la planilla (por defecto {ANIO_ACTUAL})")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    fuentes = {} if args.fuente else crear_fuentes()
+    if fuentes:
+        cargador = CargadorEstablecimientos(fuentes, procesar=construir_datos)
+        datos = cargador.obtener()
+        for nombre, error in cargador.errores.items():
+            print(f"Aviso: {nombre}: {error}", file=sys.stderr)
+    else:
+        datos = cargar(crear_fuente(args.fuente))
+    # Una sola proyección para los tres reportes
+    proyeccion = proyeccion_mensual(datos.df, estrategia=args.proyeccion)
+    reportes = {
+        'proyecciones': reporte_proyecciones(datos.df, proyeccion=proyeccion),
+        'estadisticas': reporte_estadisticas(datos.df, proyeccion=proyeccion),
+        'ranking': datos.ranking if args.proyeccion == ESTRATEGIA_PREDETERMINADA else
+        ranking_unidades(datos.df, proyeccion=proyeccion),
+    }
+    # Filas de la planilla descartadas o con celdas vaciadas (ver ingesta.py)
+    if len(datos.cuarentena):
+        reportes['cuarentena'] = datos.cuarentena
+        print(f"Aviso: {len(datos.cuarentena)} filas de la planilla en cuarentena", file=sys.stderr)
+    # Columnas que la planilla no traía y se completaron vacías
+    if datos.columnas_faltantes:
+        print(f"Aviso: faltan columnas en la planilla: {', '.join(datos.columnas_faltantes)}", file=sys.stderr)
+    # Valores mensuales fuera de rango, mal escalados, faltantes o atípicos
+    calidad = reporte_calidad(datos.df, datos.calidad)
+    if len(calidad):
+        reportes['calidad'] = calidad
+        print(f"Aviso: {len(calidad)} problemas de calidad en los valores mensuales", file=sys.stderr)
+
+    salida = Path(args.salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    for nombre, df in reportes.items():
+        for formato in args.formato:
+            ruta = escribir(df, salida / nombre, formato)
+            print(f"{ruta} ({len(df)} filas)")
+
+    if args.historico:
+        filas = AlmacenHistorico().ingresar(datos.df, args.anio)
+        print(f"Histórico {args.anio}: {filas} indicadores nuevos o modificados")
+
+    print(f"{len(datos.indice)} unidades, {len(datos.df)} indicadores en {time.perf_counter() - inicio:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Simulación Monte Carlo del cumplimiento a fin de año.
+
+Los meses sin dato de cada indicador se completan muestreando de su propia
+distribución mensual observada (o de una normal ajustada a ella). Todos los
+escenarios se calculan como operaciones sobre arreglos (escenarios x
+indicadores x meses), por bloques para acotar la memoria, sin ciclos de Python
+por escenario.
+"""
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from proyeccion import ESTRATEGIA_PREDETERMINADA, proyectar, subcontexto
+
+MODELOS = {
+    'bootstrap': 'Remuestreo de los meses observados',
+    'normal': 'Normal con la media y desviación observadas (acotada a 0–100%)',
+}
+
+# Elementos (escenarios x indicadores x meses) por bloque
+ELEMENTOS_POR_BLOQUE = 2_000_000
+
+ResultadoMonteCarlo = namedtuple('ResultadoMonteCarlo', 'indicadores unidad puntajes')
+
+
+def _muestrear(rng, modelo, ordenados, observados, media, desviacion, escenarios):
+    n, m = ordenados.shape
+    if modelo == 'bootstrap':
+        # Los valores observados quedan al inicio de cada fila (np.sort deja NaN al final)
+        u = rng.random((escenarios, n, m))
+        posiciones = (u * np.maximum(observados, 1)[None, :, None]).astype(np.intp)
+        return ordenados[np.arange(n)[None, :, None], posiciones]
+    if modelo == 'normal':
+        muestras = rng.normal(media[None, :, None], desviacion[None, :, None], (escenarios, n, m))
+        return np.clip(muestras, 0, 100)
+    raise ValueError(f"Modelo desconocido: {modelo!r}")
+
+
+def simular_cumplimiento(valores, meta, comparable, pesos=None, escenarios=5000,
+                         modelo='bootstrap', semilla=None, umbral=100.0,
+                         estrategia=ESTRATEGIA_PREDETERMINADA, contexto=None):
+    """Probabilidad de cumplir ``meta`` a fin de año para cada indicador y para la unidad.
+
+    ``valores`` es el bloque (indicadores x 12) con NaN en los meses sin dato.
+    La proyección de cada escenario es la Meta Proyectada del año completo
+    (observados más simulados) con ``estrategia`` y ``contexto`` (ver ``proyeccion.py``).
+
+    Retorna ``ResultadoMonteCarlo``:
+
+    - ``indicadores``: DataFrame con meses faltantes, probabilidad de cumplir y
+      percentiles 5/50/95 de la proyección (NaN si el indicador no es evaluable).
+    - ``unidad``: dict con el cumplimiento ponderado esperado, sus percentiles y
+      la probabilidad de alcanzar ``umbral``.
+    - ``puntajes``: cumplimiento ponderado de cada escenario (para graficar).
+    """
+    valores = np.asarray(valores, dtype=float)
+    meta = np.asarray(meta, dtype=float)
+    comparable = np.asarray(comparable, dtype=bool)
+    n, m = valores.shape
+    pesos = np.ones(n) if pesos is None else np.nan_to_num(np.asarray(pesos, dtype=float))
+
+    observado = ~np.isnan(valores)
+    observados = observado.sum(axis=1)
+    faltante = ~observado
+    evaluable = comparable & ~np.isnan(meta) & (observados > 0)
+
+    ordenados = np.sort(valores, axis=1)
+    with warnings.catch_warnings():
+        # Indicadores sin datos (o con un solo mes) dejan media/desviación en NaN -> 0
+        warnings.simplefilter('ignore', RuntimeWarning)
+        media = np.nan_to_num(np.nanmean(valores, axis=1))
+        desviacion = np.nan_to_num(np.nanstd(valores, axis=1, ddof=1))
+
+    rng = np.random.default_rng(semilla)
+    proyecciones = np.empty((escenarios, n))
+    bloque = max(1, ELEMENTOS_POR_BLOQUE // max(1, n * m))
+    for inicio in range(0, escenarios, bloque):
+        cantidad = min(bloque, escenarios - inicio)
+        muestras = _muestrear(rng, modelo, ordenados, observados, media, desviacion, cantidad)
+        completos = np.where(faltante[None], muestras, valores[None]).reshape(cantidad * n, m)
+        # Cada escenario repite las filas del contexto
+        filas = np.tile(np.arange(n), cantidad)
+        proyecciones[inicio:inicio + cantidad] = proyectar(
+            completos, estrategia, subcontexto(contexto, filas) if contexto is not None else None
+        ).reshape(cantidad, n)
+
+    cumple = proyecciones >= meta[None, :]
+    probabilidad = np.where(evaluable, cumple.mean(axis=0), np.nan)
+    if escenarios and n:
+        p05, p50, p95 = np.percentile(proyecciones, [5, 50, 95], axis=0)
+    else:
+        p05 = p50 = p95 = np.full(n, np.nan)
+    sin_datos = observados == 0
+
+    indicadores = pd.DataFrame({
+        'Meses_Faltantes': faltante.sum(axis=1),
+        'Probabilidad_Cumplir': probabilidad * 100,
+        'Proyeccion_P05': np.where(sin_datos, np.nan, p05),
+        'Proyeccion_P50': np.where(sin_datos, np.nan, p50),
+        'Proyeccion_P95': np.where(sin_datos, np.nan, p95),
+    })
+
+    peso_evaluable = np.where(evaluable, pesos, 0.0)
+    total = peso_evaluable.sum()
+    if total > 0:
+        puntajes = (cumple * peso_evaluable[None, :]).sum(axis=1) / total * 100
+        unidad = {
+            'cumplimiento_esperado': float(np.nansum(probabilidad * peso_evaluable) / total * 100),
+            'puntaje_p05': float(np.percentile(puntajes, 5)),
+            'puntaje_p50': float(np.percentile(puntajes, 50)),
+            'puntaje_p95': float(np.percentile(puntajes, 95)),
+            'probabilidad_umbral': float((puntajes >= umbral).mean() * 100),
+        }
+    else:
+        puntajes = np.zeros(0)
+        unidad = dict.fromkeys(['cumplimiento_esperado', 'puntaje_p05', 'puntaje_p50',
+                                'puntaje_p95', 'probabilidad_umbral'], np.nan)
+    unidad['escenarios'] = escenarios
+    unidad['evaluables'] = int(evaluable.sum())
+
+    return ResultadoMonteCarlo(indicadores, unidad, puntajes)
@@ -0,0 +1,122 @@
+"""Núcleo de cálculo del dashboard, sin Streamlit.
+
+Reúne la carga y limpieza de la planilla y los cálculos de cumplimiento como
+funciones puras, de modo que puedan importarse, medirse y ejecutarse en lote
+(ver ``lote.py``) sin abrir una sesión del navegador ni tocar la red al importar.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from calidad import marcar_datos
+from cumplimiento import clasificar_cumplimiento
+from fuentes import crear_fuente
+from indice import IndiceUnidades, agrupar_por_unidad
+from ingesta import COLUMNAS_CUARENTENA, leer_planilla
+from instrumentacion import tramo
+from limpieza import MESES
+from proyeccion import ESTRATEGIA_PREDETERMINADA
+from ranking import proyeccion_mensual, ranking_unidades
+
+# Resultado de procesar un contenido: datos limpios, sus derivados, las filas en cuarentena,
+# las marcas de calidad de cada celda mensual (``calidad.py``, alineadas con ``df``) y las
+# columnas que la planilla no traía y se completaron vacías (``ingesta.py``)
+DatosDashboard = namedtuple('DatosDashboard', 'df indice ranking cuarentena calidad columnas_faltantes')
+
+
+def limpiar_datos(contenido):
+    """Convierte los bytes del CSV de la planilla en el DataFrame limpio del dashboard.
+
+    Las filas malformadas se descartan; ``leer_planilla`` además las informa.
+    """
+    return leer_planilla(contenido).df
+
+
+def procesar_datos(contenido):
+    """Datos limpios, índice por unidad y ranking institucional, construidos juntos."""
+    with tramo('limpieza', bytes=len(contenido)) as medida:
+        df, cuarentena, columnas_faltantes = leer_planilla(contenido)
+        medida.filas = len(df)
+    return construir_datos(df, cuarentena, columnas_faltantes)
+
+
+def construir_datos(df, cuarentena=None, columnas_faltantes=()):
+    """Índice por unidad, ranking y marcas de calidad de datos ya limpios (p. ej. varios establecimientos combinados).
+
+    Las filas quedan agrupadas por unidad (en su orden de aparición) para que
+    el índice y ``compartido.py`` trabajen con rangos contiguos.
+    """
+    with tramo('indice', filas=len(df)):
+        df = agrupar_por_unidad(df)
+        # Un solo bloque de meses para ``df`` y el índice, como al mapear desde ``compartido.py``
+        bloque = np.ascontiguousarray(df[MESES].to_numpy(dtype=np.float64))
+        bloque.setflags(write=False)
+        df = pd.concat([df.drop(columns=MESES), pd.DataFrame(bloque, columns=MESES, index=df.index, copy=False)],
+                       axis=1)[df.columns]
+        indice = IndiceUnidades(df, bloque=bloque)
+    with tramo('ranking', filas=len(df)):
+        ranking = ranking_unidades(df)
+    with tramo('calidad', filas=len(df)):
+        calidad = marcar_datos(df)
+    if cuarentena is None:
+        cuarentena = pd.DataFrame(columns=COLUMNAS_CUARENTENA)
+    return DatosDashboard(df, indice, ranking, cuarentena, calidad, list(columnas_faltantes))
+
+
+def cargar(fuente=None):
+    """Lee y procesa una fuente (por defecto la de ``METAS_FUENTE``) sin pasar por Streamlit."""
+    fuente = fuente or crear_fuente()
+    return procesar_datos(fuente.leer_bytes())
+
+
+def estadisticas_mensuales(df, meses=MESES, proyeccion=None):
+    """Estadísticas de los meses registrados de cada indicador (pestaña Estadísticas).
+
+    ``proyeccion`` es la Meta Proyectada ya calculada (p. ej. la de la
+    simulación); si no se entrega, se calcula con la estrategia predeterminada.
+    """
+    valores = df[meses].apply(pd.to_numeric, errors='coerce')
+    estadisticas = pd.DataFrame(index=df.index)
+    estadisticas['Meta_Proyectada'] = proyeccion_mensual(df, meses) if proyeccion is None else np.asarray(proyeccion)
+    estadisticas['Promedio'] = valores.mean(axis=1, skipna=True).round(1)
+    estadisticas['Mínimo'] = valores.min(axis=1, skipna=True).round(1)
+    estadisticas['Máximo'] = valores.max(axis=1, skipna=True).round(1)
+    estadisticas['Desv. Est.'] = valores.std(axis=1, skipna=True).round(1)
+    estadisticas['Meses Registrados'] = valores.notna().sum(axis=1)
+    return estadisticas
+
+
+def reporte_proyecciones(df, estrategia=ESTRATEGIA_PREDETERMINADA, proyeccion=None):
+    """Meta Proyectada (con ``estrategia``, o la ya calculada) y Estado de todos los indicadores."""
+    if proyeccion is None:
+        proyeccion = proyeccion_mensual(df, estrategia=estrategia)
+    reporte = df[['Unidad_Desempeno', 'Indicador', 'Descripcion', 'Meta_Anual_Display',
+                  'Meta_Anual_Valor', 'Ponderacion_Num']].reset_index(drop=True)
+    reporte['Meta_Proyectada'] = proyeccion
+    reporte['Estado'] = clasificar_cumplimiento(proyeccion, df['Meta_Anual_Valor'], df['Meta_Anual_Comparable'])
+    return reporte
+
+
+def reporte_estadisticas(df, estrategia=ESTRATEGIA_PREDETERMINADA, proyeccion=None):
+    """Estadísticas mensuales de todos los indicadores de todas las unidades."""
+    base = df[['Unidad_Desempeno', 'Indicador', 'Descripcion']].reset_index(drop=True)
+    if proyeccion is None:
+        proyeccion = proyeccion_mensual(df, estrategia=estrategia)
+    estadisticas = estadisticas_mensuales(df, proyeccion=proyeccion)
+    return pd.concat([base, estadisticas.reset_index(drop=True)], axis=1)
+
+
+def resumen_unidades(df, meses=MESES):
+    """Métricas del encabezado de cada unidad, en el orden de aparición (el del selector).
+
+    ``Cumplimiento_Promedio`` es el promedio de los promedios mensuales de la
+    unidad, igual que la métrica "Cumplimiento Promedio" del detalle.
+    """
+    grupos = df.groupby('Unidad_Desempeno', sort=False)
+    valores = df[meses].astype(float)
+    return pd.DataFrame({
+        'Indicadores': grupos.size(),
+        'Registros': valores.notna().groupby(df['Unidad_Desempeno'], sort=False).sum().sum(axis=1),
+        'Cumplimiento_Promedio': valores.groupby(df['Unidad_Desempeno'], sort=False).mean().mean(axis=1),
+    }).rename_axis('Unidad_Desempeno').reset_index()
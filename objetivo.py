@@ -0,0 +1,118 @@
+"""Búsqueda de objetivo: cuánto deben valer los meses restantes para alcanzar la Meta Anual.
+
+Invierte la Meta Proyectada de ``proyeccion.proyectar`` con la misma estrategia
+que el resto del dashboard, sobre todos los indicadores de la unidad a la vez:
+con los meses restantes completados, la proyección crece con el valor que se les
+asigna, de modo que el mínimo que alcanza la meta se encuentra por bisección
+vectorizada (``ITERACIONES`` llamadas a ``proyectar``).
+
+Los "meses restantes" son todos los meses sin dato, incluidas las lagunas.
+"""
+import numpy as np
+import pandas as pd
+
+from proyeccion import ESTRATEGIA_PREDETERMINADA, proyectar
+
+FACTIBLE = 'Factible'
+ASEGURADO = 'Asegurado'
+INALCANZABLE = 'Inalcanzable'
+CERRADO = 'Sin meses restantes'
+NO_APLICA = 'No Aplica'
+
+# Pasos de la bisección: el intervalo inicial (unos ±12 x 100 puntos) queda bajo 1e-9
+ITERACIONES = 42
+
+
+def _minimo_que_cumple(proyeccion, meta, bajo, alto):
+    """Menor ``x`` de cada fila en [bajo, alto] con ``proyeccion(x) >= meta``; NaN si ni ``alto`` alcanza."""
+    alcanza = proyeccion(alto) >= meta
+    for _ in range(ITERACIONES):
+        medio = (bajo + alto) / 2
+        cumple = proyeccion(medio) >= meta
+        alto = np.where(cumple, medio, alto)
+        bajo = np.where(cumple, bajo, medio)
+    return np.where(alcanza, alto, np.nan)
+
+
+def valores_requeridos(valores, meta, comparable, es_razon=None, denominador=None, maximo=100.0,
+                       estrategia=ESTRATEGIA_PREDETERMINADA, contexto=None):
+    """Valor mínimo que necesitan los meses restantes de cada indicador.
+
+    La Meta Proyectada se calcula con ``estrategia`` y ``contexto`` (ver
+    ``proyeccion.py``), igual que en la simulación de la unidad.
+
+    - ``Valor_Requerido``: valor uniforme para todos los meses restantes.
+    - ``Valor_Requerido_Tendencia``: valor del próximo mes restante si los meses
+      restantes siguen la tendencia lineal de los observados, desplazada lo
+      justo para llegar a la meta (con menos de dos meses observados la
+      tendencia es plana y coincide con el uniforme).
+    - ``Numerador_Minimo``: para indicadores de razón (``es_razon``, por defecto
+      los del contexto), numerador mínimo por mes dado un ``denominador`` esperado.
+    - ``Factibilidad``: ``Asegurado`` si la meta se cumple aunque los meses
+      restantes valgan 0, ``Inalcanzable`` si exige más de ``maximo``.
+
+    Si ningún valor alcanza la meta (p. ej. con ``periodicidad``, cuando los
+    meses que faltan no son de los que exige la periodicidad) el valor queda en NaN.
+    """
+    valores = np.asarray(valores, dtype=float)
+    meta = np.asarray(meta, dtype=float)
+    comparable = np.asarray(comparable, dtype=bool)
+    n, m = valores.shape
+    if es_razon is None and contexto is not None:
+        es_razon = contexto.es_razon
+
+    observado = ~np.isnan(valores)
+    restantes = m - observado.sum(axis=1)
+    suma = np.nansum(valores, axis=1)
+    aplica = comparable & ~np.isnan(meta)
+
+    def completar(relleno):
+        return proyectar(np.where(observado, valores, relleno), estrategia, contexto)
+
+    # Ningún mes pedido supera ``limite`` en las estrategias que promedian meses
+    limite = np.full(n, m * max(maximo, np.nanmax(meta, initial=0.0)))
+    asegurado = completar(0.0) >= meta
+    uniforme = _minimo_que_cumple(lambda x: completar(x[:, None]), meta, -limite, limite)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Recta por mínimos cuadrados sobre los meses observados de cada fila
+        t = np.arange(m, dtype=float)[None, :]
+        conteo = observado.sum(axis=1)
+        t_medio = np.where(observado, t, 0).sum(axis=1) / conteo
+        y_medio = suma / conteo
+        dt = np.where(observado, t - t_medio[:, None], 0.0)
+        dy = np.where(observado, valores - y_medio[:, None], 0.0)
+        sxx = (dt * dt).sum(axis=1)
+        pendiente = np.where(sxx > 0, (dt * dy).sum(axis=1) / sxx, 0.0)
+        intercepto = np.nan_to_num(y_medio - pendiente * t_medio)
+    tendencia = intercepto[:, None] + pendiente[:, None] * t
+
+    amplitud = limite + np.abs(tendencia).max(axis=1)
+    desplazamiento = _minimo_que_cumple(lambda d: completar(tendencia + d[:, None]), meta, -amplitud, amplitud)
+    proximo = np.argmax(~observado, axis=1)
+    en_tendencia = np.where(restantes > 0, tendencia[np.arange(n), proximo] + desplazamiento, np.nan)
+    uniforme = np.where(restantes > 0, uniforme, np.nan)
+
+    uniforme = np.where(aplica, uniforme, np.nan)
+    en_tendencia = np.where(aplica, en_tendencia, np.nan)
+
+    factibilidad = np.select(
+        [~aplica, restantes == 0, asegurado, ~(uniforme <= maximo)],
+        [NO_APLICA, CERRADO, ASEGURADO, INALCANZABLE],
+        default=FACTIBLE
+    ).astype(object)
+
+    resultado = pd.DataFrame({
+        'Meses_Restantes': restantes,
+        'Valor_Requerido': np.clip(uniforme, 0, None),
+        'Valor_Requerido_Tendencia': np.clip(en_tendencia, 0, None),
+        'Factibilidad': factibilidad,
+    })
+
+    if denominador:
+        es_razon = np.ones(n, dtype=bool) if es_razon is None else np.asarray(es_razon, dtype=bool)
+        numerador = np.ceil(np.clip(uniforme, 0, None) / 100 * denominador - 1e-9)
+        resultado['Numerador_Minimo'] = np.where(es_razon & (factibilidad == FACTIBLE), numerador, np.nan)
+
+    return resultado
+
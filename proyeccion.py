@@ -0,0 +1,153 @@
+"""Motor de proyección de la Meta Proyectada, con estrategias intercambiables.
+
+Todas las estrategias reciben el bloque (indicadores x 12 meses, NaN en los
+meses sin dato) y un ``ContextoProyeccion`` alineado por fila, y calculan la
+proyección anual de todas las filas a la vez. La simulación de cada unidad,
+la pestaña Estadísticas, el ranking y los reportes en lote usan este mismo
+cálculo (``proyectar``), redondeado a un decimal.
+
+Estrategias disponibles (``ESTRATEGIAS``):
+
+- ``promedio``: promedio de los meses registrados (el cálculo histórico).
+- ``periodicidad``: promedio de los meses que exige la ``Periodicidad``
+  (p. ej. marzo, junio, septiembre y diciembre en los trimestrales); si
+  ninguno tiene dato, el de todos los registrados.
+- ``tendencia``: los meses sin dato siguen la recta de los registrados
+  (acotada a 0–100%) y se promedian los 12 meses.
+- ``estacional``: los meses sin dato toman el valor del mismo mes del año
+  anterior (``anterior``) o, si no lo hay, el último valor registrado.
+
+Se agregan estrategias con el decorador ``registrar``. ``_razon_acumulada``
+(suma de numeradores sobre suma de denominadores en los indicadores de razón)
+queda sin registrar mientras la planilla no traiga los denominadores mensuales.
+"""
+import os
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+from calidad import meses_esperados
+from limpieza import MESES
+
+ESTRATEGIAS = {}
+_FUNCIONES = {}
+
+# Datos por fila que algunas estrategias necesitan (``None`` si no se conocen):
+# meses exigidos por la periodicidad (filas x meses), indicadores de razón,
+# denominadores mensuales y valores del año anterior (filas x meses)
+ContextoProyeccion = namedtuple('ContextoProyeccion', 'esperados es_razon denominadores anterior',
+                                defaults=(None, None, None, None))
+
+
+def registrar(nombre, descripcion):
+    """Decorador que agrega ``funcion(valores, contexto) -> proyección sin redondear`` a ``ESTRATEGIAS``."""
+    def decorador(funcion):
+        ESTRATEGIAS[nombre] = descripcion
+        _FUNCIONES[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def es_indicador_razon(formula):
+    """Indicadores cuya fórmula es un cociente (numerador / denominador)."""
+    return formula.astype(str).str.contains('/', regex=False).to_numpy(dtype=bool)
+
+
+def contexto_proyeccion(df, meses=MESES, denominadores=None, anterior=None):
+    """Contexto de las filas de ``df`` a partir de sus columnas ``Periodicidad`` y ``Formula``."""
+    return ContextoProyeccion(
+        esperados=meses_esperados(df['Periodicidad'].to_numpy(dtype=object), meses)
+        if 'Periodicidad' in df.columns else None,
+        es_razon=es_indicador_razon(df['Formula']) if 'Formula' in df.columns else None,
+        denominadores=None if denominadores is None else np.asarray(denominadores, dtype=float),
+        anterior=None if anterior is None else np.asarray(anterior, dtype=float),
+    )
+
+
+def subcontexto(contexto, filas):
+    """Contexto de sólo ``filas`` (índices o máscara)."""
+    return ContextoProyeccion._make(None if parte is None else parte[filas] for parte in contexto)
+
+
+def proyectar(valores, estrategia, contexto=None):
+    """Meta Proyectada de cada fila de ``valores`` con ``estrategia``, redondeada a un decimal."""
+    if estrategia not in _FUNCIONES:
+        raise ValueError(f"Estrategia de proyección desconocida: {estrategia!r}")
+    valores = np.asarray(valores, dtype=float)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # Filas sin datos: NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        proyeccion = _FUNCIONES[estrategia](valores, contexto or ContextoProyeccion())
+    return np.round(proyeccion, 1)
+
+
+def proyectar_datos(df, estrategia, meses=MESES, **contexto):
+    """``proyectar`` sobre los meses de ``df`` con el contexto de sus columnas."""
+    return proyectar(df[meses].to_numpy(dtype=float), estrategia, contexto_proyeccion(df, meses, **contexto))
+
+
+def _promedio_donde(valores, mascara):
+    return np.nansum(np.where(mascara, valores, np.nan), axis=1) / mascara.sum(axis=1)
+
+
+@registrar('promedio', 'Promedio de los meses registrados')
+def _promedio(valores, contexto):
+    return np.nanmean(valores, axis=1)
+
+
+@registrar('periodicidad', 'Promedio de los meses que exige la periodicidad')
+def _periodicidad(valores, contexto):
+    if contexto.esperados is None:
+        return _promedio(valores, contexto)
+    exigidos = contexto.esperados & ~np.isnan(valores)
+    return np.where(exigidos.any(axis=1), _promedio_donde(valores, exigidos), _promedio(valores, contexto))
+
+
+# Sin registrar hasta que alguna fuente entregue ``contexto.denominadores``: sin ellos
+# da lo mismo que ``periodicidad`` y sólo duplicaría esa opción en el selector
+def _razon_acumulada(valores, contexto):
+    base = _periodicidad(valores, contexto)
+    if contexto.denominadores is None:
+        return base
+    denominadores = np.where(np.isnan(valores), 0.0, np.nan_to_num(contexto.denominadores))
+    total = denominadores.sum(axis=1)
+    # valor = numerador / denominador x 100, de modo que la suma de numeradores es sum(valor x denominador) / 100
+    razon = np.nansum(valores * denominadores, axis=1) / total
+    es_razon = np.ones(len(valores), dtype=bool) if contexto.es_razon is None else contexto.es_razon
+    return np.where(es_razon & (total > 0), razon, base)
+
+
+@registrar('tendencia', 'Tendencia lineal de los meses registrados hasta fin de año')
+def _tendencia(valores, contexto):
+    observado = ~np.isnan(valores)
+    conteo = observado.sum(axis=1)
+    t = np.arange(valores.shape[1], dtype=float)[None, :]
+    t_medio = np.where(observado, t, 0).sum(axis=1) / conteo
+    y_medio = np.nansum(valores, axis=1) / conteo
+    dt = np.where(observado, t - t_medio[:, None], 0.0)
+    dy = np.where(observado, valores - y_medio[:, None], 0.0)
+    sxx = (dt * dt).sum(axis=1)
+    # Con un solo mes la recta es plana
+    pendiente = np.where(sxx > 0, (dt * dy).sum(axis=1) / sxx, 0.0)
+    recta = np.clip(y_medio[:, None] + pendiente[:, None] * (t - t_medio[:, None]), 0, 100)
+    return np.where(conteo > 0, np.where(observado, valores, recta).mean(axis=1), np.nan)
+
+
+@registrar('estacional', 'Estacional ingenuo: mismo mes del año anterior o último valor registrado')
+def _estacional(valores, contexto):
+    completos = valores if contexto.anterior is None else np.where(np.isnan(valores), contexto.anterior, valores)
+    observado = ~np.isnan(completos)
+    posiciones = np.arange(valores.shape[1])[None, :]
+    # Último valor registrado hasta cada mes; antes del primero, el primero
+    ultimo = np.maximum.accumulate(np.where(observado, posiciones, -1), axis=1)
+    primero = np.argmax(observado, axis=1)[:, None]
+    ultimo = np.where(ultimo >= 0, ultimo, primero)
+    relleno = np.take_along_axis(completos, ultimo, axis=1)
+    return np.where(observado.any(axis=1), relleno.mean(axis=1), np.nan)
+
+
+# Estrategia de la Meta Proyectada cuando no se elige otra
+ESTRATEGIA_PREDETERMINADA = os.environ.get('METAS_PROYECCION', 'periodicidad')
+if ESTRATEGIA_PREDETERMINADA not in ESTRATEGIAS:
+    raise ValueError(f"METAS_PROYECCION debe ser una de {list(ESTRATEGIAS)}, no {ESTRATEGIA_PREDETERMINADA!r}")
@@ -0,0 +1,63 @@
+"""Puntaje de cumplimiento ponderado de todas las Unidades de Desempeño a la vez.
+
+Se calcula en una sola pasada agrupada sobre los datos limpios, sin repetir la
+lógica de la página de cada unidad.
+"""
+import numpy as np
+import pandas as pd
+
+from cumplimiento import CUMPLE, NO_APLICA, clasificar_cumplimiento
+from limpieza import MESES
+from proyeccion import ESTRATEGIA_PREDETERMINADA, proyectar_datos
+
+
+def proyeccion_mensual(df, meses=MESES, estrategia=ESTRATEGIA_PREDETERMINADA):
+    """Meta Proyectada de cada fila con ``estrategia`` (ver ``proyeccion.py``), redondeada a un decimal."""
+    return proyectar_datos(df, estrategia, meses)
+
+
+def ranking_unidades(df, proyeccion=None, meses=MESES, estrategia=ESTRATEGIA_PREDETERMINADA):
+    """Tabla con el cumplimiento ponderado de cada unidad, ordenada de mayor a menor.
+
+    Un indicador es evaluable si su meta es comparable y tiene proyección. El
+    cumplimiento ponderado es la suma de ``Ponderacion_Num`` de los indicadores
+    que cumplen dividida por la de los evaluables (ponderación faltante cuenta
+    como 0). ``proyeccion`` permite pasar una proyección ya calculada; si no,
+    se calcula con ``estrategia``.
+    """
+    if proyeccion is None:
+        proyeccion = proyeccion_mensual(df, meses, estrategia)
+    estado = clasificar_cumplimiento(proyeccion, df['Meta_Anual_Valor'], df['Meta_Anual_Comparable'])
+
+    evaluable = estado != NO_APLICA
+    cumple = estado == CUMPLE
+    peso = np.nan_to_num(df['Ponderacion_Num'].to_numpy(dtype=float))
+
+    partes = pd.DataFrame({
+        'Unidad_Desempeno': df['Unidad_Desempeno'].to_numpy(),
+        'Indicadores': 1,
+        'Evaluables': evaluable.astype(int),
+        'Cumplen': cumple.astype(int),
+        'Ponderacion_Evaluable': np.where(evaluable, peso, 0.0),
+        'Ponderacion_Cumplida': np.where(cumple, peso, 0.0),
+        'Proyeccion_Promedio': proyeccion,
+    })
+    agregado = partes.groupby('Unidad_Desempeno', sort=False).agg(
+        Indicadores=('Indicadores', 'sum'),
+        Evaluables=('Evaluables', 'sum'),
+        Cumplen=('Cumplen', 'sum'),
+        Ponderacion_Evaluable=('Ponderacion_Evaluable', 'sum'),
+        Ponderacion_Cumplida=('Ponderacion_Cumplida', 'sum'),
+        Proyeccion_Promedio=('Proyeccion_Promedio', 'mean'),
+    )
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        agregado['Cumplimiento_Ponderado'] = np.where(
+            agregado['Ponderacion_Evaluable'] > 0,
+            agregado['Ponderacion_Cumplida'] / agregado['Ponderacion_Evaluable'] * 100,
+            np.nan
+        )
+
+    agregado = agregado.sort_values('Cumplimiento_Ponderado', ascending=False, na_position='last', kind='stable')
+    agregado.insert(0, 'Ranking', np.arange(1, len(agregado) + 1))
+    return agregado.reset_index()
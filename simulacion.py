@@ -0,0 +1,111 @@
+"""Motor incremental de la simulación de escenarios de una unidad.
+
+Guarda los valores mensuales editables de la unidad junto con sumas y conteos
+por indicador. Cada edición del ``st.data_editor`` llega como delta
+(``edited_rows``) y sólo se recalculan la Meta Proyectada y el Estado de las
+filas tocadas, sin comparar ni recalcular la tabla completa. La Meta
+Proyectada sale del motor de ``proyeccion.py`` con la estrategia elegida.
+"""
+import numpy as np
+
+from cumplimiento import clasificar_cumplimiento
+from limpieza import MESES
+from proyeccion import ESTRATEGIA_PREDETERMINADA, contexto_proyeccion, proyectar, subcontexto
+
+# Columnas que se llevan a la tabla editable, más el detalle por indicador que se muestra junto a ella
+COLUMNAS_SIMULACION = ['Indicador', 'Descripcion', 'Meta_Anual_Display',
+                       'Meta_Anual_Valor', 'Meta_Anual_Comparable', 'Ponderacion_Display'] + MESES + [
+                       'Tipo', 'Periodicidad', 'Formula', 'Ponderacion_Num']
+
+
+class SimulacionUnidad:
+    """Estado editable de una unidad: ``df`` es la tabla que ve el editor.
+
+    ``proyeccion`` (Meta Proyectada redondeada a un decimal, según
+    ``estrategia``) y ``estado`` son arreglos alineados con las filas de
+    ``df``; ``version`` aumenta con cada cambio efectivo.
+    """
+
+    def __init__(self, df, meses=MESES, estrategia=ESTRATEGIA_PREDETERMINADA):
+        self.meses = list(meses)
+        self.estrategia = estrategia
+        # Periodicidad y fórmula de cada indicador (no se editan)
+        self.contexto = contexto_proyeccion(df, self.meses)
+        self.df = df[COLUMNAS_SIMULACION].reset_index(drop=True).copy()
+        self._columnas = {mes: (j, self.df.columns.get_loc(mes)) for j, mes in enumerate(self.meses)}
+
+        self.valores = self.df[self.meses].to_numpy(dtype=float, copy=True)
+        self.base = self.valores.copy()
+        self.meta = self.df['Meta_Anual_Valor'].to_numpy(dtype=float)
+        self.comparable = self.df['Meta_Anual_Comparable'].to_numpy(dtype=bool)
+
+        n = len(self.df)
+        self.proyeccion = np.full(n, np.nan)
+        self.estado = np.empty(n, dtype=object)
+        self.version = 0
+        self._recalcular(np.arange(n))
+
+    def __len__(self):
+        return len(self.df)
+
+    def _recalcular(self, filas):
+        # Proyección exacta de las filas tocadas (12 valores cada una): sin deriva por restas sucesivas
+        self.proyeccion[filas] = proyectar(self.valores[filas], self.estrategia, subcontexto(self.contexto, filas))
+        self.estado[filas] = clasificar_cumplimiento(self.proyeccion[filas], self.meta[filas], self.comparable[filas])
+
+    def proyectar_con(self, estrategia, anterior=None):
+        """Cambia la estrategia (y los valores del año anterior) y recalcula todas las filas si difieren.
+
+        ``anterior`` (indicadores x 12) lo usa la estrategia ``estacional``.
+        """
+        if anterior is not None:
+            anterior = np.asarray(anterior, dtype=float)
+        mismo_anterior = (anterior is None and self.contexto.anterior is None) or (
+            anterior is not None and self.contexto.anterior is not None
+            and np.array_equal(anterior, self.contexto.anterior, equal_nan=True))
+        if estrategia == self.estrategia and mismo_anterior:
+            return False
+        self.estrategia = estrategia
+        self.contexto = self.contexto._replace(anterior=anterior)
+        self._recalcular(np.arange(len(self.df)))
+        return True
+
+    def aplicar_cambios(self, cambios):
+        """Aplica ``{fila: {columna: valor}}`` (formato ``edited_rows`` del editor).
+
+        Ignora columnas que no son meses y celdas que no cambiaron, por lo que
+        aplicar dos veces el mismo delta acumulado no tiene efecto. Retorna las
+        filas recalculadas.
+        """
+        afectadas = set()
+        for fila, columnas in cambios.items():
+            fila = int(fila)
+            for columna, valor in columnas.items():
+                if columna not in self._columnas:
+                    continue
+                j, posicion = self._columnas[columna]
+                nuevo = np.nan if valor is None else float(valor)
+                anterior = self.valores[fila, j]
+                if nuevo == anterior or (np.isnan(nuevo) and np.isnan(anterior)):
+                    continue
+                self.valores[fila, j] = nuevo
+                self.df.iat[fila, posicion] = nuevo
+                afectadas.add(fila)
+
+        if afectadas:
+            self._recalcular(np.array(sorted(afectadas)))
+            self.version += 1
+        return afectadas
+
+    def diferencias(self):
+        """Celdas que difieren de los datos originales, en formato ``{fila: {mes: valor}}``.
+
+        Es la representación dispersa de un escenario: sólo las celdas editadas
+        (``None`` para una celda vaciada).
+        """
+        distinto = ~((self.valores == self.base) | (np.isnan(self.valores) & np.isnan(self.base)))
+        cambios = {}
+        for fila, j in zip(*np.nonzero(distinto)):
+            valor = self.valores[fila, j]
+            cambios.setdefault(int(fila), {})[self.meses[j]] = None if np.isnan(valor) else float(valor)
+        return cambios
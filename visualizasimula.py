@@ -1,10 +1,9 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import re
-import requests
-from io import StringIO
+
+# Sólo biblioteca estándar antes del primer pintado; pandas, plotly y el resto se importan después
+from arranque import cargar_arranque, guardar_arranque, resumir_arranque
+from instrumentacion import (PUERTO_METRICAS, configurar_log, finalizar_ejecucion, iniciar_ejecucion,
+                             iniciar_servidor_metricas, tramo)
 
 # Configuración de la página
 st.set_page_config(
@@ -13,271 +12,526 @@ st.set_page_config(
     layout="wide"
 )
 
+# Indicadores por página en el detalle de la unidad
+INDICADORES_POR_PAGINA = 10
+
+# Tramos medidos de este rerun (fuente, limpieza, gráficos, editor, tablas...), ver instrumentacion.py
+ejecucion = iniciar_ejecucion()
+
+# Log estructurado (METAS_LOG_TRAMOS) y endpoint Prometheus (METAS_METRICAS_PUERTO), una vez por proceso
+@st.cache_resource
+def iniciar_exportacion_metricas():
+    configurar_log()
+    return iniciar_servidor_metricas(PUERTO_METRICAS) if PUERTO_METRICAS else None
+
+iniciar_exportacion_metricas()
+
+# Panel de tiempos de la barra lateral; se completa al cerrar la ejecución
+panel_tiempos = None
+
+def cerrar_ejecucion():
+    finalizar_ejecucion(ejecucion)
+    if panel_tiempos is None:
+        return
+    desglose = pd.DataFrame(ejecucion.desglose(), columns=['tramo', 'nivel', 'segundos', 'filas', 'bytes'])
+    desglose['Tramo'] = ['\u2003' * nivel + nombre for nivel, nombre in zip(desglose['nivel'], desglose['tramo'])]
+    desglose['ms'] = desglose['segundos'] * 1000
+    with panel_tiempos.container():
+        st.caption(f"Total del rerun: {ejecucion.segundos * 1000:.0f} ms")
+        st.dataframe(
+            desglose[['Tramo', 'ms', 'filas', 'bytes']].rename(columns={'filas': 'Filas', 'bytes': 'Bytes'}),
+            hide_index=True,
+            use_container_width=True,
+            column_config={'ms': st.column_config.NumberColumn("ms", format="%.1f")}
+        )
+
 # Título principal
 st.title("📊 Monitoreo Metas Sanitarias Ley 20.707")
 st.markdown("---")
 
-# Función para cargar y limpiar datos desde Google Sheets
-@st.cache_data
+DETALLE = "🎯 Detalle por unidad"
+INSTITUCIONAL = "🏛️ Resumen institucional"
+vista = st.sidebar.radio("Vista", [DETALLE, INSTITUCIONAL], key="vista")
+
+# Selector de unidad y métricas del encabezado, desde el resumen de arranque (ver arranque.py)
+def encabezado_unidad(resumen):
+    st.header("🎯 Selección de Unidad de Desempeño")
+    unidad = st.selectbox(
+        "Selecciona una Unidad de Desempeño para ver su detalle:",
+        options=resumen.unidades,
+        index=0,
+        key="unidad_seleccionada"
+    )
+    st.markdown("---")
+
+    st.header(f"📋 Detalle: {unidad}")
+    metricas = resumen.metricas[unidad]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Indicadores", metricas.indicadores)
+    with col2:
+        st.metric("Registros Mensuales", metricas.registros)
+    with col3:
+        promedio = metricas.cumplimiento_promedio
+        st.metric("Cumplimiento Promedio", f"{promedio:.1f}%" if promedio is not None else "N/A")
+    st.markdown("---")
+    return unidad
+
+# Primer pintado: con un resumen guardado, el selector aparece antes de importar las librerías
+# pesadas y de cargar la planilla; si el contenido cargado resulta ser otro, se vuelve a pintar.
+# La sesión conserva el último resumen que calculó, aunque no se haya podido guardar en disco
+resumen_arranque = st.session_state.get('resumen_arranque') or cargar_arranque()
+unidad_seleccionada = None
+if vista == DETALLE and resumen_arranque is not None:
+    with tramo('primer_pintado', filas=len(resumen_arranque.unidades)):
+        unidad_seleccionada = encabezado_unidad(resumen_arranque)
+
+with tramo('importaciones'):
+    import pandas as pd
+    import plotly.express as px
+
+    from actualizador import ActualizadorDatos
+    from calidad import describir_marcas, marcar_celdas, reporte_calidad, resumen_calidad
+    from comparacion import comparar_unidades, formato_largo
+    from compartido import AlmacenCompartido
+    from cumplimiento import estilo_meta_proyectada, formatear_porcentaje, tabla_meta_proyectada
+    from establecimientos import CargadorEstablecimientos, crear_fuentes
+    from escenarios import AlmacenEscenarios, LRUSimulaciones, celdas_por_indicador
+    from exportacion import (ERROR, FORMATOS, INSTITUCION, LISTO, UNIDAD, ExportadorReportes,
+                             SolicitudExportacion)
+    from fuentes import crear_fuente
+    from graficos import clave_valores, figura_bandas, figura_evolucion, figura_multiples, tiene_datos
+    from historico import ANIO_ACTUAL, AlmacenHistorico, meses_del_anio
+    from montecarlo import MODELOS, simular_cumplimiento
+    from nucleo import construir_datos, estadisticas_mensuales, procesar_datos, resumen_unidades
+    from objetivo import valores_requeridos
+    from proyeccion import ESTRATEGIA_PREDETERMINADA, ESTRATEGIAS
+    from ranking import proyeccion_mensual, ranking_unidades
+    from simulacion import SimulacionUnidad
+
+# Histórico multianual compartido por todas las sesiones del proceso (ver historico.py)
+@st.cache_resource
+def obtener_historico():
+    return AlmacenHistorico()
+
+# Cada contenido nuevo de la planilla se agrega al histórico (sólo las filas que cambiaron)
+def historizar(datos):
+    try:
+        with tramo('historico', filas=len(datos.df)) as medida:
+            medida.filas = obtener_historico().ingresar(datos.df)
+    except Exception as e:
+        st.warning(f"No se pudo actualizar el histórico: {e}")
+    return datos
+
+# Un actualizador por proceso: guarda los datos limpios y revalida la fuente cada METAS_TTL segundos.
+# Con METAS_ESTABLECIMIENTOS se cargan en paralelo las planillas de todos los establecimientos.
+# Los datos procesados se sirven mapeados desde la caché compartida entre procesos (ver compartido.py).
+@st.cache_resource
+def obtener_actualizador():
+    fuentes = crear_fuentes()
+    if fuentes:
+        clave = ';'.join(f"{nombre}={fuente.nombre}" for nombre, fuente in fuentes.items())
+        return CargadorEstablecimientos(fuentes, procesar=lambda df, cuarentena, faltantes: historizar(
+                                            construir_datos(df, cuarentena, faltantes)),
+                                        compartido=AlmacenCompartido(clave))
+    fuente = crear_fuente()
+    return ActualizadorDatos(fuente, procesar=lambda contenido: historizar(procesar_datos(contenido)),
+                             compartido=AlmacenCompartido(fuente.nombre))
+
+# Función para cargar datos (Google Sheets por defecto, ver fuentes.py)
 def cargar_datos():
     try:
-        # URL de Google Sheets
-        url = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ7yKDhmdK-Hz4Qcr_wpQo9u4Vf6arzrcTEhqujrJUD59Lu9haFKyLQQDdUfgBijB7clgYHpp5x28SZ/pub?gid=304183817&single=true&output=csv"
-        
-        # Descargar datos
-        response = requests.get(url)
-        response.encoding = 'utf-8'
-        
-        # Leer CSV
-        df = pd.read_csv(StringIO(response.text))
-        
-        # Renombrar columnas (basado en la estructura esperada)
-        if len(df.columns) >= 20:
-            df.columns = ['Unidad_Desempeno', 'Indicador', 'Descripcion', 'Formula', 
-                          'Tipo', 'Periodicidad', 'Meta_Anual', 'Ponderacion',
-                          'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                          'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-        else:
-            st.error("El archivo CSV no tiene la estructura esperada")
-            return pd.DataFrame()
-
-        # Eliminar filas vacías
-        df = df.dropna(subset=['Unidad_Desempeno'])
-
-        # Convertir Descripcion a string y corregir encoding
-        df['Descripcion'] = df['Descripcion'].fillna('Sin descripción').astype(str)
-        
-        # Corregir problemas de encoding en todas las columnas de texto
-        text_columns = ['Unidad_Desempeno', 'Descripcion', 'Formula', 'Tipo', 'Periodicidad', 'Meta_Anual']
-        for col in text_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str)
-                # Corregir encoding común
-                df[col] = df[col].str.replace('Ã¡', 'á').str.replace('Ã©', 'é').str.replace('Ã­', 'í')\
-                                .str.replace('Ã³', 'ó').str.replace('Ãº', 'ú').str.replace('Ã±', 'ñ')\
-                                .str.replace('Ã', 'Í').str.replace('Ã“', 'Ó')\
-                                .str.replace('â‰¥', '≥').str.replace('â‰¤', '≤')\
-                                .str.replace('Ã', 'í').str.replace('Â', '')
-
-        # Convertir Indicador a numérico
-        df['Indicador'] = pd.to_numeric(df['Indicador'], errors='coerce')
-
-        # Eliminar filas donde Indicador sea NaN
-        df = df.dropna(subset=['Indicador'])
-
-        # Convertir Ponderacion a numérico - manejar diferentes formatos
-        df['Ponderacion'] = df['Ponderacion'].astype(str)
-        df['Ponderacion'] = df['Ponderacion'].str.replace(',', '.')  # Reemplazar comas por puntos
-        df['Ponderacion_Num'] = pd.to_numeric(df['Ponderacion'], errors='coerce')
-        
-        # Formatear ponderación como porcentaje
-        df['Ponderacion_Display'] = df['Ponderacion_Num'].apply(
-            lambda x: f"{(x * 100):.1f}%" if pd.notna(x) else "N/A"
-        )
+        actualizador = obtener_actualizador()
+        df, indice, ranking, cuarentena, calidad, faltantes = actualizador.obtener()
 
-        # Convertir Meta_Anual a string
-        df['Meta_Anual_Original'] = df['Meta_Anual'].astype(str)
-
-        # Función mejorada para procesar metas anuales - maneja decimales con coma
-        def procesar_meta_anual(meta_str):
-            meta_str = str(meta_str).strip()
-            
-            # Corregir encoding específico para símbolos
-            meta_str = meta_str.replace('â‰¥', '≥')
-            
-            # Reemplazar comas por puntos para conversión numérica
-            meta_str_para_conversion = meta_str.replace(',', '.')
-            
-            # Determinar si tiene símbolo ≥
-            tiene_mayor_igual = '≥' in meta_str
-            meta_limpia = meta_str_para_conversion.replace('≥', '').strip()
-            
-            # Verificar si ya es un porcentaje (contiene %)
-            if '%' in meta_limpia:
-                # Ya es porcentaje, extraer el número
-                patron_porcentaje = r'(\d+\.?\d*)%'
-                match = re.search(patron_porcentaje, meta_limpia)
-                if match:
-                    valor_numerico = float(match.group(1))
-                    # Ya está en porcentaje, no multiplicar
-                    valor_porcentaje = valor_numerico
-                else:
-                    # No se pudo extraer, mantener como texto
-                    return pd.Series([meta_str, None, False])
-            else:
-                # Es un decimal, convertir a porcentaje
-                try:
-                    # Intentar convertir directamente a número
-                    valor_numerico = float(meta_limpia)
-                    # Si es decimal (menor que 1 y mayor que 0), convertir a porcentaje
-                    if 0 < valor_numerico <= 1:
-                        valor_porcentaje = valor_numerico * 100
-                    else:
-                        # Ya está en porcentaje o es un número entero
-                        valor_porcentaje = valor_numerico
-                except:
-                    # No es numérico, es una glosa
-                    return pd.Series([meta_str, None, False])
-            
-            # Formatear para display
-            if tiene_mayor_igual:
-                display = f"≥{valor_porcentaje:.1f}%"
-            else:
-                display = f"{valor_porcentaje:.1f}%"
-                
-            return pd.Series([display, valor_porcentaje, True])  # True = es comparable
-
-        # Aplicar la función a la columna Meta_Anual
-        df[['Meta_Anual_Display', 'Meta_Anual_Valor', 'Meta_Anual_Comparable']] = df['Meta_Anual'].apply(procesar_meta_anual)
-
-        # Convertir columnas de meses a numérico y manejar formato decimal
-        meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                 'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-        
-        for mes in meses:
-            if mes in df.columns:
-                # Convertir a string primero para manejar formatos
-                df[mes] = df[mes].astype(str)
-                
-                # Reemplazar comas por puntos para conversión numérica
-                df[mes] = df[mes].str.replace(',', '.')
-                
-                # Convertir a numérico y multiplicar por 100 para convertir a porcentaje
-                df[mes] = pd.to_numeric(df[mes], errors='coerce') * 100
-
-        return df
+        if actualizador.ultimo_error is not None:
+            st.warning(f"No se pudo actualizar desde {actualizador.nombre} ({actualizador.ultimo_error}). "
+                       "Se muestran los últimos datos guardados.")
+
+        return df, indice, ranking, cuarentena, calidad, faltantes
 
     except Exception as e:
         st.error(f"Error al cargar datos: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None, None, None, None, []
 
 # El resto del código permanece igual...
 # Cargar datos
-df_original = cargar_datos()
+with tramo('carga'):
+    (df_original, indice_unidades, ranking_institucional, filas_cuarentena, marcas_calidad,
+     columnas_faltantes) = cargar_datos()
 
 # Verificar si se cargaron datos correctamente
 if df_original.empty:
     st.error("No se pudieron cargar los datos. Verifique la conexión o la estructura del archivo.")
     st.stop()
 
+# El resumen de arranque sigue al último contenido cargado
+if resumen_arranque is None or resumen_arranque.huella != obtener_actualizador().hash:
+    with tramo('resumen_arranque', filas=len(df_original)):
+        nuevo_resumen = resumir_arranque(obtener_actualizador().hash, resumen_unidades(df_original))
+        # Si no se puede escribir, el próximo worker cargará los datos antes de pintar
+        guardar_arranque(nuevo_resumen)
+    # Con el resumen en la sesión, el rerun ya no lo vuelve a calcular aunque el archivo siga viejo
+    st.session_state.resumen_arranque = nuevo_resumen
+    if unidad_seleccionada is not None and nuevo_resumen.metricas != resumen_arranque.metricas:
+        # Lo pintado venía de otro contenido (p. ej. la planilla cambió desde el último arranque)
+        st.rerun()
+    resumen_arranque = nuevo_resumen
+
+# Reporte de calidad de todas las celdas marcadas; ``huella`` identifica el contenido de la planilla
+@st.cache_data(max_entries=4)
+def reporte_calidad_datos(huella):
+    return reporte_calidad(df_original, marcas_calidad)
+
+# Ranking con una estrategia de proyección distinta de la predeterminada (la de la carga)
+@st.cache_data(max_entries=8)
+def ranking_con_estrategia(huella, estrategia):
+    return ranking_unidades(df_original, estrategia=estrategia)
+
+# Estilo de las columnas de la tabla editable con problemas de calidad
+ESTILO_CALIDAD = 'background-color: #fff3cd; color: #856404'
+
+# Reportes generados en segundo plano y guardados por contenido, compartidos por las sesiones (ver exportacion.py)
+@st.cache_resource
+def obtener_exportador():
+    return ExportadorReportes()
+
+# Exportaciones que la sesión sigue mostrando
+MAX_EXPORTACIONES_SESION = 12
+
+def solicitar_exportaciones(alcance, unidad, escenario, cambios, formatos, anterior=None):
+    if alcance == INSTITUCION and not cambios:
+        # Sin escenario el reporte institucional es el mismo desde cualquier unidad
+        unidad, escenario, anterior = None, None, None
+    actualizador = obtener_actualizador()
+    claves = [
+        obtener_exportador().solicitar(
+            actualizador.datos, actualizador.hash,
+            SolicitudExportacion(alcance, unidad, escenario, cambios, estrategia_proyeccion, formato),
+            anterior
+        ).clave
+        for formato in formatos
+    ]
+    anteriores = [c for c in st.session_state.get('exportaciones', []) if c not in claves]
+    st.session_state.exportaciones = (claves + anteriores)[:MAX_EXPORTACIONES_SESION]
+
+def lista_exportaciones():
+    """Avance y descarga de las exportaciones de la sesión; se refresca sola mientras haya pendientes."""
+    exportador = obtener_exportador()
+    trabajos = [t for t in map(exportador.trabajo, st.session_state.get('exportaciones', [])) if t is not None]
+    pendientes = any(not t.terminado for t in trabajos)
+
+    @st.fragment(run_every=1 if pendientes else None)
+    def mostrar():
+        actuales = [exportador.trabajo(t.clave) or t for t in trabajos]
+        for trabajo in actuales:
+            col_nombre, col_estado = st.columns([2, 1])
+            with col_nombre:
+                st.markdown(f"**{trabajo.nombre}** · {FORMATOS[trabajo.solicitud.formato].descripcion}")
+            with col_estado:
+                if trabajo.estado == LISTO and trabajo.ruta.exists():
+                    origen = "desde caché" if trabajo.desde_cache else f"{trabajo.segundos:.1f} s"
+                    st.download_button(f"⬇️ Descargar ({origen})", trabajo.ruta.read_bytes(),
+                                       file_name=trabajo.nombre, mime=FORMATOS[trabajo.solicitud.formato].mime,
+                                       key=f"descargar_{trabajo.clave}", on_click="ignore",
+                                       use_container_width=True)
+                elif trabajo.estado == ERROR:
+                    st.error(f"Error: {trabajo.mensaje}")
+                else:
+                    st.progress(trabajo.progreso, text=trabajo.mensaje)
+        # Al terminar todas, un rerun completo deja de refrescar el fragmento
+        if pendientes and all(t.terminado for t in actuales):
+            st.rerun()
+
+    if trabajos:
+        mostrar()
+
+# ============== BARRA LATERAL ==============
+# Cálculo de la Meta Proyectada para la simulación, las estadísticas y el ranking (ver proyeccion.py)
+estrategia_proyeccion = st.sidebar.selectbox(
+    "📐 Meta Proyectada", list(ESTRATEGIAS), index=list(ESTRATEGIAS).index(ESTRATEGIA_PREDETERMINADA),
+    format_func=ESTRATEGIAS.get, key="estrategia_proyeccion"
+)
+if estrategia_proyeccion != ESTRATEGIA_PREDETERMINADA:
+    ranking_institucional = ranking_con_estrategia(obtener_actualizador().hash, estrategia_proyeccion)
+
+# Sidebar con información
+st.sidebar.markdown("### ℹ️ Acerca de")
+st.sidebar.info(
+    """
+    **Dashboard Metas Sanitarias**
+
+    Funcionalidades:
+    - Selección de unidades
+    - Visualización de indicadores
+    - Simulación editable con persistencia
+    - Calculadora de porcentaje referencial
+    - Botón de reset
+    - Comparación gráfica entre unidades
+    - Meta proyectada con indicador visual
+    - Ranking institucional ponderado
+    - Simulación Monte Carlo
+    - Valor mensual requerido para la meta
+    - Escenarios guardados y comparables
+    - Histórico año contra año
+    - Meta proyectada según periodicidad, tendencia o estacionalidad
+    - Control de calidad de los valores mensuales
+    - Exportación a Excel, PDF, imagen y Parquet
+    """
+)
+
+# Tráfico hacia la fuente de datos en este proceso
+with st.sidebar.expander("📡 Actualización de datos"):
+    actualizador = obtener_actualizador()
+    st.caption(f"Fuente: {actualizador.nombre} · TTL: {actualizador.ttl:.0f} s")
+    if isinstance(actualizador, CargadorEstablecimientos):
+        st.dataframe(actualizador.estado(), hide_index=True, use_container_width=True)
+    st.json(actualizador.estadisticas)
+    # Filas de la planilla que no se pudieron usar tal cual (ver ingesta.py)
+    if len(filas_cuarentena):
+        st.caption(f"⚠️ {len(filas_cuarentena)} filas con problemas en la planilla")
+        st.dataframe(filas_cuarentena, hide_index=True, use_container_width=True)
+    # Columnas que la planilla no traía: se completaron vacías
+    if columnas_faltantes:
+        st.caption(f"⚠️ Columnas que faltan en la planilla: {', '.join(columnas_faltantes)}")
+    if st.button("🔄 Revalidar ahora", key="revalidar_datos"):
+        actualizador.obtener(forzar=True)
+        st.rerun()
+
+# Desglose de tiempos del rerun actual
+if st.sidebar.toggle("⏱️ Tiempos de esta ejecución", key="mostrar_tiempos"):
+    panel_tiempos = st.sidebar.empty()
+
+st.sidebar.markdown("---")
+st.sidebar.caption("v4.1 - Dashboard Interactivo")
+# ============== RESUMEN INSTITUCIONAL ==============
+if vista == INSTITUCIONAL:
+    with tramo('resumen_institucional', filas=len(df_original)):
+        st.header("🏛️ Cumplimiento Ponderado por Unidad")
+        st.markdown("Cumplimiento de cada Unidad de Desempeño según la ponderación de sus indicadores "
+                    "(Meta Proyectada ≥ Meta Anual), calculado para todas las unidades a la vez.")
+
+        col_inst1, col_inst2, col_inst3 = st.columns(3)
+        with col_inst1:
+            st.metric("Unidades", len(ranking_institucional))
+        with col_inst2:
+            promedio_institucional = ranking_institucional['Cumplimiento_Ponderado'].mean()
+            st.metric("Cumplimiento Promedio", f"{promedio_institucional:.1f}%" if pd.notna(promedio_institucional) else "N/A")
+        with col_inst3:
+            st.metric("Indicadores que Cumplen",
+                      f"{int(ranking_institucional['Cumplen'].sum())} / {int(ranking_institucional['Evaluables'].sum())}")
+
+        fig_ranking = px.bar(
+            ranking_institucional,
+            x='Cumplimiento_Ponderado',
+            y='Unidad_Desempeno',
+            orientation='h',
+            title='Cumplimiento Ponderado por Unidad',
+            labels={'Cumplimiento_Ponderado': 'Cumplimiento Ponderado (%)', 'Unidad_Desempeno': 'Unidad'},
+            color='Cumplimiento_Ponderado',
+            color_continuous_scale='RdYlGn',
+            range_color=[0, 100],
+            height=max(350, 40 * len(ranking_institucional))
+        )
+        fig_ranking.update_layout(yaxis=dict(autorange='reversed'), xaxis=dict(ticksuffix="%", range=[0, 100]))
+        st.plotly_chart(fig_ranking, use_container_width=True)
+
+        tabla_ranking = ranking_institucional.rename(columns={
+            'Unidad_Desempeno': 'Unidad',
+            'Ponderacion_Evaluable': 'Pond. Evaluable',
+            'Ponderacion_Cumplida': 'Pond. Cumplida',
+            'Proyeccion_Promedio': 'Proyección Promedio',
+            'Cumplimiento_Ponderado': 'Cumplimiento Ponderado',
+        })
+        st.dataframe(
+            tabla_ranking,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Pond. Evaluable': st.column_config.NumberColumn(format="%.3f"),
+                'Pond. Cumplida': st.column_config.NumberColumn(format="%.3f"),
+                'Proyección Promedio': st.column_config.NumberColumn(format="%.1f%%"),
+                'Cumplimiento Ponderado': st.column_config.NumberColumn(format="%.1f%%"),
+            }
+        )
+
+        # Reporte institucional con los datos originales (los escenarios se exportan desde cada unidad)
+        with st.expander("📤 Exportar reporte institucional"):
+            formatos_institucion = st.multiselect("Formatos", list(FORMATOS), default=['xlsx'],
+                                                  format_func=lambda f: f"{f} · {FORMATOS[f].descripcion}",
+                                                  key="formatos_exportacion_institucion")
+            if st.button("📤 Exportar", disabled=not formatos_institucion, key="exportar_institucion"):
+                solicitar_exportaciones(INSTITUCION, None, None, {}, formatos_institucion)
+            lista_exportaciones()
+
+    # Valores mensuales marcados al cargar la planilla (ver calidad.py)
+    with tramo('calidad_institucional', filas=len(df_original)):
+        st.subheader("🩺 Calidad de los Datos Mensuales")
+        resumen = resumen_calidad(marcas_calidad)
+        for columna, (problema, celdas) in zip(st.columns(len(resumen)), resumen.items()):
+            with columna:
+                st.metric(problema, int(celdas))
+        reporte = reporte_calidad_datos(obtener_actualizador().hash)
+        if reporte.empty:
+            st.success("✅ No se detectaron problemas en los valores mensuales.")
+        else:
+            st.dataframe(reporte, use_container_width=True, hide_index=True,
+                         column_config={'Valor': st.column_config.NumberColumn(format="%.1f%%")})
+            st.download_button("⬇️ Descargar reporte de calidad", reporte.to_csv(index=False).encode('utf-8'),
+                               file_name="calidad_metas.csv", mime="text/csv")
+    cerrar_ejecucion()
+    st.stop()
+
 # Inicializar session state
 if 'unidad_anterior' not in st.session_state:
     st.session_state.unidad_anterior = None
 
 # ============== SELECTOR DE UNIDAD DE DESEMPEÑO ==============
-st.header("🎯 Selección de Unidad de Desempeño")
-
-unidades = df_original['Unidad_Desempeno'].unique().tolist()
-unidad_seleccionada = st.selectbox(
-    "Selecciona una Unidad de Desempeño para ver su detalle:",
-    options=unidades,
-    index=0
-)
-
-st.markdown("---")
+# Sin resumen guardado al iniciar, el selector se pinta recién ahora, con el resumen recién escrito
+if unidad_seleccionada is None:
+    with tramo('primer_pintado', filas=len(resumen_arranque.unidades)):
+        unidad_seleccionada = encabezado_unidad(resumen_arranque)
 
-# Filtrar datos por la unidad seleccionada
-df_filtrado = df_original[df_original['Unidad_Desempeno'] == unidad_seleccionada].copy()
-df_filtrado = df_filtrado.reset_index(drop=True)
+# Datos de la unidad seleccionada desde el índice precalculado (sin recorrer df_original)
+df_filtrado = indice_unidades.frame(unidad_seleccionada)
+huella_datos = obtener_actualizador().hash
 
-# Crear clave única para session_state basada en unidad
-session_key = f'df_editado_{unidad_seleccionada}'
+# Crear clave única para el editor basada en unidad
+editor_key = f"editor_{unidad_seleccionada}"
 
 # Si cambió la unidad, limpiar session state de la unidad anterior
 if st.session_state.unidad_anterior != unidad_seleccionada:
     st.session_state.unidad_anterior = unidad_seleccionada
 
-# Inicializar datos originales para la unidad si no existen
-if session_key not in st.session_state:
-    st.session_state[session_key] = df_filtrado[['Indicador', 'Descripcion', 'Meta_Anual_Display', 
-                                                   'Meta_Anual_Valor', 'Meta_Anual_Comparable', 'Ponderacion_Display'] + 
-                                                  ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                                                   'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']].copy()
+# Simulaciones de la sesión: sólo las unidades más recientes conservan su tabla completa,
+# las demás se reducen a sus celdas editadas
+if 'simulaciones' not in st.session_state:
+    st.session_state.simulaciones = LRUSimulaciones()
+# Con datos nuevos la simulación se reconstruye (ver LRUSimulaciones) y las filas del editor ya no son las mismas
+if st.session_state.simulaciones.cambiaron_datos(unidad_seleccionada, huella_datos):
+    st.session_state.pop(editor_key, None)
+simulacion = st.session_state.simulaciones.obtener(unidad_seleccionada, lambda: SimulacionUnidad(df_filtrado),
+                                                   huella_datos)
+# En adelante todo dato por fila sale de ``simulacion.df``, alineado con la simulación
+
+# Almacén de escenarios compartido por todas las sesiones del proceso
+@st.cache_resource
+def obtener_almacen():
+    return AlmacenEscenarios()
+
+# Simulación Monte Carlo memorizada por contenido (valores editados, estrategia de proyección y parámetros)
+@st.cache_data(max_entries=64)
+def simular_unidad(valores, meta, comparable, pesos, escenarios, modelo, semilla, umbral, estrategia, contexto):
+    return simular_cumplimiento(valores, meta, comparable, pesos=pesos, escenarios=escenarios,
+                                modelo=modelo, semilla=semilla, umbral=umbral,
+                                estrategia=estrategia, contexto=contexto)
+
+# Años guardados de una unidad; la última ingesta invalida la caché cuando llegan datos nuevos
+@st.cache_data(max_entries=32)
+def historico_unidad(unidad, ingesta):
+    return obtener_historico().cargar_unidad(unidad)
+
+# Meta Proyectada con la estrategia elegida; la estacional completa los meses con el año anterior guardado
+anterior_unidad = None
+if estrategia_proyeccion == 'estacional':
+    anterior_unidad = meses_del_anio(historico_unidad(unidad_seleccionada, obtener_historico().ultima_ingesta()),
+                                     ANIO_ACTUAL - 1, simulacion.df['Indicador'])
+simulacion.proyectar_con(estrategia_proyeccion, anterior_unidad)
+
+# Simulación nueva desde los datos originales, con la misma estrategia de proyección
+def crear_simulacion():
+    nueva = SimulacionUnidad(df_filtrado)
+    nueva.proyectar_con(estrategia_proyeccion, anterior_unidad)
+    return nueva
+
+# Agregado entre unidades de los datos cargados; ``huella`` identifica el contenido de la planilla
+@st.cache_data(max_entries=32)
+def comparacion_unidades(huella, tipos, periodicidades):
+    return comparar_unidades(df_original, tipos, periodicidades)
+
+# Unidades que se pueden destacar a la vez en la comparación entre unidades
+MAX_DESTACADAS = 8
+
+# Callback del editor: aplica sólo las celdas editadas antes de que corra el script
+def aplicar_edicion(unidad, editor_key, huella):
+    iniciar_ejecucion(desde_callback=True)
+    with tramo('edicion') as medida:
+        cambios = st.session_state[editor_key].get("edited_rows", {})
+        medida.filas = len(st.session_state.simulaciones.obtener(
+            unidad, lambda: SimulacionUnidad(indice_unidades.frame(unidad)), huella).aplicar_cambios(cambios))
 
 # ============== DETALLE DE LA UNIDAD SELECCIONADA ==============
-st.header(f"📋 Detalle: {unidad_seleccionada}")
-
-# Métricas generales
-col1, col2, col3 = st.columns(3)
+# Encabezado y métricas generales: ver encabezado_unidad
 
 meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
          'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
 
-with col1:
-    st.metric("Total Indicadores", len(df_filtrado))
-
-with col2:
-    registros_totales = df_filtrado[meses].notna().sum().sum()
-    st.metric("Registros Mensuales", int(registros_totales))
-
-with col3:
-    promedio_general = df_filtrado[meses].mean().mean()
-    st.metric("Cumplimiento Promedio", f"{promedio_general:.1f}%" if pd.notna(promedio_general) else "N/A")
-
-st.markdown("---")
-
 # Mostrar información de cada indicador
 st.subheader("📊 Indicadores de la Unidad")
 
-for idx in range(len(df_filtrado)):
-    fila = df_filtrado.iloc[idx]
+# Modo de visualización: los gráficos se construyen sólo para lo que se ve
+col_modo, col_pagina = st.columns([3, 1])
+with col_modo:
+    modo_graficos = st.radio(
+        "Vista de gráficos",
+        ["Detalle por indicador", "Múltiplos pequeños"],
+        horizontal=True,
+        key="modo_graficos"
+    )
+
+# Valores mensuales actuales (editados) de cada indicador como claves hashables
+claves_mensuales = [clave_valores(v) for v in simulacion.valores]
 
+def titulo_de(fila, corto=False):
     # Manejar el número de indicador de forma segura
     try:
         num_indicador = int(fila['Indicador'])
-        titulo_indicador = f"Indicador {num_indicador} - {fila['Descripcion']}"
+        return f"Ind. {num_indicador}" if corto else f"Indicador {num_indicador} - {fila['Descripcion']}"
     except:
-        titulo_indicador = f"Indicador - {fila['Descripcion']}"
-
-    with st.expander(titulo_indicador, expanded=(idx==0)):
-
-        # Información del indicador
-        col_info1, col_info2, col_info3, col_info4 = st.columns(4)
-
-        with col_info1:
-            st.markdown(f"**Tipo:** {fila['Tipo']}")
-        with col_info2:
-            st.markdown(f"**Periodicidad:** {fila['Periodicidad']}")
-        with col_info3:
-            st.markdown(f"**Meta Anual:** {fila['Meta_Anual_Display']}")
-        with col_info4:
-            st.markdown(f"**Ponderación:** {fila['Ponderacion_Display']}")
-
-        st.markdown(f"**Fórmula:** {fila['Formula']}")
-
-        # Gráfico de evolución mensual usando datos editados actuales
-        datos_grafico = st.session_state[session_key].iloc[idx]
-        valores_mensuales = [datos_grafico[mes] if pd.notna(datos_grafico[mes]) else None for mes in meses]
-
-        if any(v is not None for v in valores_mensuales):
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=meses,
-                y=valores_mensuales,
-                mode='lines+markers',
-                name='Cumplimiento',
-                line=dict(color='#2E86AB', width=3),
-                marker=dict(size=10, color='#A23B72'),
-                fill='tozeroy',
-                fillcolor='rgba(46, 134, 171, 0.2)'
-            ))
-
-            fig.update_layout(
-                title=f"Evolución Mensual",
-                xaxis_title="Mes",
-                yaxis_title="Cumplimiento (%)",
-                hovermode='x unified',
-                height=350,
-                showlegend=False,
-                yaxis=dict(
-                    ticksuffix="%",
-                    range=[0, 100]  # Escala de 0% a 100%
-                )
-            )
+        return "Ind." if corto else f"Indicador - {fila['Descripcion']}"
 
-            st.plotly_chart(fig, use_container_width=True)
+with tramo('graficos_indicadores', filas=len(simulacion)):
+    if modo_graficos == "Múltiplos pequeños":
+        titulos = tuple(titulo_de(simulacion.df.iloc[idx], corto=True) for idx in range(len(simulacion)))
+        if any(tiene_datos(clave) for clave in claves_mensuales):
+            st.plotly_chart(figura_multiples(titulos, tuple(claves_mensuales)), use_container_width=True)
         else:
-            st.info("No hay datos disponibles para este indicador.")
+            st.info("No hay datos disponibles para esta unidad.")
+    else:
+        # Paginación: sólo se recorren los indicadores de la página actual
+        total_paginas = max(1, -(-len(simulacion) // INDICADORES_POR_PAGINA))
+        with col_pagina:
+            pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=1,
+                                     key=f"pagina_{unidad_seleccionada}") if total_paginas > 1 else 1
+        inicio = (pagina - 1) * INDICADORES_POR_PAGINA
+
+        for idx in range(inicio, min(inicio + INDICADORES_POR_PAGINA, len(simulacion))):
+            fila = simulacion.df.iloc[idx]
+            titulo_indicador = titulo_de(fila)
+
+            with st.expander(titulo_indicador, expanded=(idx == inicio)):
+
+                # Información del indicador
+                col_info1, col_info2, col_info3, col_info4 = st.columns(4)
+
+                with col_info1:
+                    st.markdown(f"**Tipo:** {fila['Tipo']}")
+                with col_info2:
+                    st.markdown(f"**Periodicidad:** {fila['Periodicidad']}")
+                with col_info3:
+                    st.markdown(f"**Meta Anual:** {fila['Meta_Anual_Display']}")
+                with col_info4:
+                    st.markdown(f"**Ponderación:** {fila['Ponderacion_Display']}")
+
+                st.markdown(f"**Fórmula:** {fila['Formula']}")
+
+                # Gráfico de evolución mensual usando datos editados actuales, sólo si se pide
+                clave = claves_mensuales[idx]
+                if not tiene_datos(clave):
+                    st.info("No hay datos disponibles para este indicador.")
+                elif st.toggle("Mostrar evolución mensual", value=(idx == inicio),
+                               key=f"grafico_{unidad_seleccionada}_{idx}"):
+                    st.plotly_chart(figura_evolucion(clave), use_container_width=True)
 
 st.markdown("---")
 
@@ -290,7 +544,8 @@ En esta sección puedes modificar los valores mensuales para simular diferentes
 """)
 
 # Crear pestañas
-tab1, tab2, tab3 = st.tabs(["📝 Editar Valores", "📈 Comparación Visual", "📊 Estadísticas"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Editar Valores", "📈 Comparación Visual", "📊 Estadísticas",
+                                        "🎲 Monte Carlo", "📅 Histórico"])
 
 with tab1:
     # Botón de reset
@@ -299,47 +554,123 @@ with tab1:
         st.subheader("Tabla Editable de Cumplimiento Mensual")
     with col_reset:
         if st.button("🔄 Resetear Valores", type="secondary", use_container_width=True, key=f"reset_{unidad_seleccionada}"):
-            st.session_state[session_key] = df_filtrado[['Indicador', 'Descripcion', 'Meta_Anual_Display', 
-                                                           'Meta_Anual_Valor', 'Meta_Anual_Comparable', 'Ponderacion_Display'] + meses].copy()
+            st.session_state.simulaciones.asignar(unidad_seleccionada, crear_simulacion(), huella_datos)
+            # Descartar también las ediciones pendientes del widget
+            st.session_state.pop(editor_key, None)
             st.success("✅ Valores reseteados a originales")
             st.rerun()
 
+    # Marcas de calidad de los valores actuales (editados) de la unidad, con las mismas reglas de la carga
+    marcas_unidad = marcar_celdas(simulacion.valores, simulacion.df['Periodicidad'].to_numpy(dtype=object))
+    tabla_editor = simulacion.df.assign(Calidad=describir_marcas(marcas_unidad))
+    con_problemas = (tabla_editor['Calidad'] != '').to_numpy()
+    # Sólo las columnas no editables admiten estilo: se destacan el indicador y su detalle de calidad
+    estilo_editor = tabla_editor.style.apply(
+        lambda columna: [ESTILO_CALIDAD if marcado else '' for marcado in con_problemas],
+        subset=['Indicador', 'Calidad']
+    )
+
     # SOLUCIÓN 2: Enfoque robusto con manejo de errores
-    # Crear una copia para editar
-    df_para_editar = st.session_state[session_key].copy()
-    
-    # Editor de datos con key más estable
-    editor_key = f"editor_{unidad_seleccionada}"
-    
+    # El editor recibe la tabla de la simulación; sus ediciones se aplican en el callback
     try:
-        df_editado = st.data_editor(
-            df_para_editar,
-            use_container_width=True,
-            num_rows="fixed",
-            column_config={
-                "Indicador": st.column_config.NumberColumn("Ind.", width="small", disabled=True),
-                "Descripcion": st.column_config.TextColumn("Descripción", width="large", disabled=True),
-                "Meta_Anual_Display": st.column_config.TextColumn("Meta Anual", width="small", disabled=True),
-                "Meta_Anual_Valor": None,
-                "Meta_Anual_Comparable": None,
-                "Ponderacion_Display": st.column_config.TextColumn("Pond.", width="small", disabled=True),
-                **{mes: st.column_config.NumberColumn(mes, width="small", format="%.1f%%") for mes in meses}
-            },
-            hide_index=True,
-            key=editor_key
-        )
-        
-        # Verificar si hubo cambios y actualizar session_state
-        if not df_para_editar.equals(df_editado):
-            st.session_state[session_key] = df_editado.copy()
-            st.success("✅ Cambios guardados automáticamente")
-            # Pequeña pausa para mostrar el mensaje
-            st.rerun()
-            
+        with tramo('editor', filas=len(simulacion)):
+            st.data_editor(
+                estilo_editor,
+                use_container_width=True,
+                num_rows="fixed",
+                column_config={
+                    "Indicador": st.column_config.NumberColumn("Ind.", width="small", format="%d", disabled=True),
+                    "Descripcion": st.column_config.TextColumn("Descripción", width="large", disabled=True),
+                    "Meta_Anual_Display": st.column_config.TextColumn("Meta Anual", width="small", disabled=True),
+                    "Meta_Anual_Valor": None,
+                    "Meta_Anual_Comparable": None,
+                    "Ponderacion_Display": st.column_config.TextColumn("Pond.", width="small", disabled=True),
+                    **{mes: st.column_config.NumberColumn(mes, width="small", format="%.1f%%") for mes in meses},
+                    "Tipo": None,
+                    "Periodicidad": None,
+                    "Formula": None,
+                    "Ponderacion_Num": None,
+                    "Calidad": st.column_config.TextColumn("⚠️ Calidad", width="medium", disabled=True),
+                },
+                hide_index=True,
+                key=editor_key,
+                on_change=aplicar_edicion,
+                args=(unidad_seleccionada, editor_key, huella_datos)
+            )
+
+        if simulacion.version > 0:
+            st.caption("✅ Cambios guardados automáticamente")
+        if con_problemas.any():
+            st.caption(f"⚠️ {int(con_problemas.sum())} indicadores con valores fuera de rango, mal escalados, "
+                       "faltantes según su periodicidad o atípicos (columna Calidad).")
+            with st.expander("🩺 Detalle de calidad de la unidad"):
+                st.dataframe(reporte_calidad(simulacion.df, marcas_unidad), use_container_width=True, hide_index=True,
+                             column_config={'Valor': st.column_config.NumberColumn(format="%.1f%%")})
+
     except Exception as e:
         st.error(f"Error al editar la tabla: {e}")
-        # En caso de error, usar los datos del session_state
-        df_editado = st.session_state[session_key].copy()
+
+    df_editado = simulacion.df
+
+    # ============== ESCENARIOS GUARDADOS ==============
+    with st.expander("💾 Escenarios guardados"):
+        almacen = obtener_almacen()
+        indicadores_unidad = simulacion.df['Indicador'].tolist()
+
+        col_esc1, col_esc2 = st.columns([3, 1])
+        with col_esc1:
+            nombre_escenario = st.text_input("Nombre del escenario", key=f"nombre_escenario_{unidad_seleccionada}")
+        with col_esc2:
+            st.write("")
+            if st.button("Guardar", use_container_width=True, key=f"guardar_escenario_{unidad_seleccionada}",
+                         disabled=not nombre_escenario.strip()):
+                celdas = almacen.guardar(unidad_seleccionada, nombre_escenario.strip(), simulacion.diferencias(),
+                                         indicadores_unidad, huella_base=obtener_actualizador().hash)
+                st.success(f"✅ Escenario '{nombre_escenario.strip()}' guardado ({celdas} celdas editadas)")
+
+        df_escenarios = almacen.listar(unidad_seleccionada)
+        if df_escenarios.empty:
+            st.info("No hay escenarios guardados para esta unidad.")
+        else:
+            st.dataframe(
+                df_escenarios.drop(columns='huella_base').rename(columns={
+                    'nombre': 'Escenario', 'creado': 'Guardado', 'celdas': 'Celdas Editadas'}),
+                use_container_width=True,
+                hide_index=True
+            )
+            if (df_escenarios['huella_base'] != obtener_actualizador().hash).any():
+                st.caption("ℹ️ Algunos escenarios se guardaron sobre una versión anterior de los datos; "
+                           "se aplican por número de indicador.")
+
+            nombres = df_escenarios['nombre'].tolist()
+            col_esc3, col_esc4, col_esc5 = st.columns([2, 1, 1])
+            with col_esc3:
+                escenario_elegido = st.selectbox("Escenario", nombres, key=f"escenario_elegido_{unidad_seleccionada}")
+            with col_esc4:
+                st.write("")
+                if st.button("Cargar", use_container_width=True, key=f"cargar_escenario_{unidad_seleccionada}"):
+                    nueva = crear_simulacion()
+                    nueva.aplicar_cambios(almacen.cargar(unidad_seleccionada, escenario_elegido, indicadores_unidad))
+                    st.session_state.simulaciones.asignar(unidad_seleccionada, nueva, huella_datos)
+                    st.session_state.pop(editor_key, None)
+                    st.rerun()
+            with col_esc5:
+                st.write("")
+                if st.button("Eliminar", use_container_width=True, key=f"eliminar_escenario_{unidad_seleccionada}"):
+                    almacen.eliminar(unidad_seleccionada, escenario_elegido)
+                    st.rerun()
+
+            # Comparación: Meta Proyectada y Estado de cada escenario frente a la sesión actual
+            comparar = st.multiselect("Comparar escenarios", nombres, key=f"comparar_escenarios_{unidad_seleccionada}")
+            if comparar:
+                df_comparar = simulacion.df[['Indicador', 'Descripcion', 'Meta_Anual_Display']].copy()
+                df_comparar['Actual'] = formatear_porcentaje(simulacion.proyeccion)
+                for nombre in comparar:
+                    otra = crear_simulacion()
+                    otra.aplicar_cambios(almacen.cargar(unidad_seleccionada, nombre, indicadores_unidad))
+                    df_comparar[nombre] = [f"{p} {e.split()[-1]}" for p, e in
+                                           zip(formatear_porcentaje(otra.proyeccion), otra.estado)]
+                st.dataframe(df_comparar, use_container_width=True, hide_index=True)
 
     # ============== NUEVA SECCIÓN: SIMULACIÓN POR PORCENTAJE ==============
     st.markdown("---")
@@ -382,67 +713,72 @@ with tab1:
         else:
             st.metric("Porcentaje Simulado", "0.0%")
 
-    # ============== META PROYECTADA VS META ANUAL ==============
-    st.markdown("---")
-    st.subheader("📊 Meta Proyectada vs Meta Anual")
-
-    # Calcular Meta Proyectada (ya está en porcentaje)
-    df_temp = df_editado[meses].copy()
-    for mes in meses:
-        df_temp[mes] = pd.to_numeric(df_temp[mes], errors='coerce')
-
-    df_editado['Promedio_Mensual'] = df_temp.mean(axis=1, skipna=True).round(1)
+    # Búsqueda de objetivo: valor mínimo de los meses restantes para alcanzar la Meta Anual
+    st.markdown("**Valor mensual requerido para alcanzar la Meta Anual** (según los valores editados):")
+
+    col_obj1, col_obj2 = st.columns([2, 1])
+    with col_obj1:
+        modo_objetivo = st.radio(
+            "Meses restantes",
+            ["Valor uniforme", "Según tendencia"],
+            horizontal=True,
+            key="modo_objetivo",
+            help="Uniforme: el mismo valor en todos los meses sin dato. "
+                 "Según tendencia: los meses sin dato siguen la tendencia de los registrados; se muestra el próximo mes."
+        )
+    with col_obj2:
+        denominador_esperado = st.number_input(
+            "Denominador esperado por mes",
+            min_value=0,
+            value=0,
+            step=1,
+            format="%d",
+            key="denominador_objetivo",
+            help="Para indicadores de razón (fórmula con '/'): calcula el numerador mínimo por mes."
+        )
 
-    # Crear DataFrame para mostrar con promedio y colores
-    df_display = df_editado[['Indicador', 'Descripcion', 'Meta_Anual_Display', 'Promedio_Mensual']].copy()
-    df_display.rename(columns={'Promedio_Mensual': 'Meta Proyectada'}, inplace=True)
-    
-    # Convertir Meta Proyectada a formato porcentual para mostrar
-    df_display['Meta Proyectada'] = df_display['Meta Proyectada'].apply(
-        lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A"
-    )
-    
-    # Determinar estado solo para metas comparables
-    df_display['Estado'] = df_display.apply(
-        lambda row: 'Cumple ✅' if (df_editado.loc[row.name, 'Meta_Anual_Comparable'] and 
-                                   pd.notna(df_editado.loc[row.name, 'Promedio_Mensual']) and 
-                                   pd.notna(df_editado.loc[row.name, 'Meta_Anual_Valor']) and
-                                   df_editado.loc[row.name, 'Promedio_Mensual'] >= df_editado.loc[row.name, 'Meta_Anual_Valor'])
-                    else ('No Cumple ❌' if (df_editado.loc[row.name, 'Meta_Anual_Comparable'] and 
-                                           pd.notna(df_editado.loc[row.name, 'Promedio_Mensual']) and 
-                                           pd.notna(df_editado.loc[row.name, 'Meta_Anual_Valor']))
-                    else 'No Aplica 🔄'),  # Para glosas o datos faltantes
-        axis=1
+    with tramo('objetivo', filas=len(simulacion)):
+        requeridos = valores_requeridos(
+            simulacion.valores, simulacion.meta, simulacion.comparable,
+            denominador=denominador_esperado,
+            estrategia=simulacion.estrategia, contexto=simulacion.contexto
+        )
+    st.caption(f"Meta Proyectada: {ESTRATEGIAS[estrategia_proyeccion].lower()}.")
+    columna_requerida = 'Valor_Requerido' if modo_objetivo == "Valor uniforme" else 'Valor_Requerido_Tendencia'
+    df_objetivo = simulacion.df[['Indicador', 'Descripcion', 'Meta_Anual_Display']].copy()
+    df_objetivo['Meses Restantes'] = requeridos['Meses_Restantes']
+    df_objetivo['Valor Requerido'] = requeridos[columna_requerida]
+    if 'Numerador_Minimo' in requeridos:
+        df_objetivo['Numerador Mínimo'] = requeridos['Numerador_Minimo']
+    df_objetivo['Factibilidad'] = requeridos['Factibilidad']
+
+    st.dataframe(
+        df_objetivo,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Indicador": st.column_config.NumberColumn("Ind.", width="small"),
+            "Descripcion": st.column_config.TextColumn("Descripción", width="large"),
+            "Meta_Anual_Display": st.column_config.TextColumn("Meta Anual", width="small"),
+            "Valor Requerido": st.column_config.NumberColumn(format="%.1f%%"),
+            "Numerador Mínimo": st.column_config.NumberColumn(format="%d"),
+        }
     )
 
-    # Función para aplicar estilos
-    def highlight_proyeccion(row):
-        try:
-            meta_proyectada_val = float(row['Meta Proyectada'].replace('%', '')) if row['Meta Proyectada'] != 'N/A' else None
-        except:
-            meta_proyectada_val = None
-            
-        meta_anual = df_editado.loc[row.name, 'Meta_Anual_Valor']
-        es_comparable = df_editado.loc[row.name, 'Meta_Anual_Comparable']
-
-        styles = [''] * len(row)
-
-        # Encontrar índice de la columna Meta Proyectada
-        meta_idx = row.index.get_loc('Meta Proyectada')
-
-        if es_comparable and pd.notna(meta_proyectada_val) and pd.notna(meta_anual):
-            if meta_proyectada_val >= meta_anual:
-                styles[meta_idx] = 'background-color: #d4edda; color: #155724; font-weight: bold'  # Verde
-            else:
-                styles[meta_idx] = 'background-color: #f8d7da; color: #721c24; font-weight: bold'  # Rojo
-        else:
-            styles[meta_idx] = 'background-color: #f8f9fa; color: #6c757d'  # Gris
+    # ============== META PROYECTADA VS META ANUAL ==============
+    st.markdown("---")
+    st.subheader("📊 Meta Proyectada vs Meta Anual")
 
-        return styles
+    # Meta Proyectada y Estado vienen de la simulación, que sólo recalcula las filas editadas;
+    # el color de cada fila se deriva del Estado ya clasificado
+    with tramo('tabla_estilo', filas=len(simulacion)):
+        df_display = tabla_meta_proyectada(df_editado, simulacion.proyeccion, simulacion.estado)
+        df_display['Requerido por Mes'] = formatear_porcentaje(requeridos['Valor_Requerido'])
 
-    # Mostrar tabla con estilos
-    styled_df = df_display.style.apply(highlight_proyeccion, axis=1)
-    st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        # Mostrar tabla con estilos (el Styler se evalúa al serializar la tabla)
+        styled_df = estilo_meta_proyectada(df_display)
+        st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        st.caption(f"Meta Proyectada: {ESTRATEGIAS[estrategia_proyeccion].lower()} (se elige en la barra lateral).")
 
     # Leyenda
     col_leyenda1, col_leyenda2, col_leyenda3 = st.columns(3)
@@ -453,11 +789,47 @@ with tab1:
     with col_leyenda3:
         st.caption("🔄 **Gris:** No aplica comparación")
 
-with tab2:
+    # ============== EXPORTAR REPORTE ==============
+    with st.expander("📤 Exportar reporte"):
+        st.caption("Los reportes se generan en segundo plano; pedir de nuevo el mismo reporte "
+                   "(mismos datos, escenario, estrategia y formato) lo entrega al instante.")
+        col_exp1, col_exp2, col_exp3 = st.columns(3)
+        with col_exp1:
+            alcance_exportacion = st.radio(
+                "Alcance", [UNIDAD, INSTITUCION], horizontal=True, key="alcance_exportacion",
+                format_func={UNIDAD: "Esta unidad", INSTITUCION: "Toda la institución"}.get,
+                help="Institución: todas las unidades y su ranking, con la base elegida aplicada a esta unidad."
+            )
+        with col_exp2:
+            bases_exportacion = ["Datos originales"]
+            if simulacion.version > 0:
+                bases_exportacion.append("Edición actual")
+            bases_exportacion += obtener_almacen().listar(unidad_seleccionada)['nombre'].tolist()
+            base_exportacion = st.selectbox("Base", bases_exportacion, key=f"base_exportacion_{unidad_seleccionada}")
+        with col_exp3:
+            formatos_exportacion = st.multiselect("Formatos", list(FORMATOS), default=['xlsx'],
+                                                  format_func=lambda f: f"{f} · {FORMATOS[f].descripcion}",
+                                                  key="formatos_exportacion")
+
+        if st.button("📤 Exportar", disabled=not formatos_exportacion, key=f"exportar_{unidad_seleccionada}"):
+            if base_exportacion == "Datos originales":
+                escenario_exportacion, cambios_exportacion = None, []
+            elif base_exportacion == "Edición actual":
+                escenario_exportacion = "edicion"
+                cambios_exportacion = celdas_por_indicador(simulacion.diferencias(), simulacion.df['Indicador'])
+            else:
+                escenario_exportacion = base_exportacion
+                cambios_exportacion = obtener_almacen().celdas(unidad_seleccionada, base_exportacion)
+            solicitar_exportaciones(alcance_exportacion, unidad_seleccionada, escenario_exportacion,
+                                    cambios_exportacion, formatos_exportacion, anterior_unidad)
+
+        lista_exportaciones()
+
+with tab2, tramo('comparacion', filas=len(simulacion)):
     st.subheader("Comparación de Indicadores")
 
     # Usar datos actuales del session_state
-    df_comparacion = st.session_state[session_key].copy()
+    df_comparacion = simulacion.df.copy()
 
     # Convertir a numérico
     for mes in meses:
@@ -489,28 +861,11 @@ with tab2:
     # Gráfico de líneas múltiples
     st.markdown("### Evolución Comparativa")
 
-    # Crear DataFrame para gráfico múltiple
-    datos_grafico = []
-    for idx in range(len(df_comparacion)):
-        ind_valor = df_comparacion.iloc[idx]['Indicador']
-        try:
-            ind_num = int(ind_valor)
-            ind_label = f"Ind. {ind_num}"
-        except:
-            ind_label = f"Ind. {idx+1}"
-
-        for mes in meses:
-            valor = df_comparacion.iloc[idx][mes]
-            if pd.notna(valor):
-                datos_grafico.append({
-                    'Mes': mes,
-                    'Cumplimiento': valor,
-                    'Indicador': ind_label
-                })
-
-    if datos_grafico:
-        df_grafico = pd.DataFrame(datos_grafico)
+    # Formato largo (una fila por indicador y mes con dato) en un solo melt
+    df_grafico = formato_largo(df_comparacion, meses, columnas=['Indicador'])
+    df_grafico['Indicador'] = 'Ind. ' + df_grafico['Indicador'].astype(int).astype(str)
 
+    if not df_grafico.empty:
         fig_lineas = px.line(
             df_grafico,
             x='Mes',
@@ -518,6 +873,7 @@ with tab2:
             color='Indicador',
             title='Evolución Mensual de Todos los Indicadores',
             markers=True,
+            category_orders={'Mes': meses},
             height=450
         )
 
@@ -530,24 +886,44 @@ with tab2:
 
         st.plotly_chart(fig_lineas, use_container_width=True)
 
-with tab3:
+    # Comparación entre unidades: bandas de percentiles calculadas en el servidor (ver comparacion.py)
+    st.markdown("### Comparación entre Unidades")
+    col_tipo, col_periodicidad = st.columns(2)
+    with col_tipo:
+        tipos_elegidos = st.multiselect("Tipo", sorted(df_original['Tipo'].dropna().unique()),
+                                        key="comparacion_tipos", placeholder="Todos")
+    with col_periodicidad:
+        periodicidades_elegidas = st.multiselect("Periodicidad", sorted(df_original['Periodicidad'].dropna().unique()),
+                                                 key="comparacion_periodicidades", placeholder="Todas")
+
+    comparacion = comparacion_unidades(obtener_actualizador().hash, tuple(tipos_elegidos),
+                                       tuple(periodicidades_elegidas))
+    if comparacion.unidades.empty:
+        st.info("Ninguna unidad tiene indicadores con ese Tipo y Periodicidad.")
+    else:
+        destacadas = st.multiselect(
+            "Unidades destacadas", comparacion.unidades.index.tolist(),
+            default=[unidad_seleccionada] if unidad_seleccionada in comparacion.unidades.index else [],
+            max_selections=MAX_DESTACADAS, key="comparacion_destacadas"
+        )
+        fig_bandas = figura_bandas(
+            comparacion.bandas, fondo=comparacion.fondo,
+            destacadas={unidad: comparacion.unidades.loc[unidad, meses] for unidad in destacadas}
+        )
+        st.plotly_chart(fig_bandas, use_container_width=True)
+        st.caption(f"Promedio mensual de los indicadores de {len(comparacion.unidades)} unidades "
+                   f"(de fondo, {len(comparacion.fondo)} de ellas). Datos originales, sin las ediciones.")
+
+with tab3, tramo('estadisticas', filas=len(simulacion)):
     st.subheader("Estadísticas Detalladas")
 
-    # Usar datos actuales del session_state
-    df_stats_base = st.session_state[session_key].copy()
+    # Usar datos actuales de la simulación; la Meta Proyectada es la misma de la tabla editable
+    df_stats_base = simulacion.df
     df_stats = df_stats_base[['Indicador', 'Descripcion', 'Meta_Anual_Display', 'Ponderacion_Display']].copy()
+    df_stats = pd.concat([df_stats, estadisticas_mensuales(df_stats_base, proyeccion=simulacion.proyeccion)], axis=1)
 
-    # Convertir meses a numérico para estadísticas
-    df_temp = df_stats_base[meses].copy()
-    for mes in meses:
-        df_temp[mes] = pd.to_numeric(df_temp[mes], errors='coerce')
-
-    df_stats['Meta_Proyectada'] = df_temp.mean(axis=1, skipna=True).round(1)
-    df_stats['Promedio'] = df_stats['Meta_Proyectada']
-    df_stats['Mínimo'] = df_temp.min(axis=1, skipna=True).round(1)
-    df_stats['Máximo'] = df_temp.max(axis=1, skipna=True).round(1)
-    df_stats['Desv. Est.'] = df_temp.std(axis=1, skipna=True).round(1)
-    df_stats['Meses Registrados'] = df_temp.notna().sum(axis=1)
+    # Meta Proyectada numérica para el resumen (ya calculada por la simulación)
+    proyecciones = pd.Series(simulacion.proyeccion, index=df_stats.index)
 
     # Formatear columnas numéricas como porcentajes
     df_stats['Meta_Proyectada'] = df_stats['Meta_Proyectada'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A")
@@ -565,16 +941,14 @@ with tab3:
     col_stat1, col_stat2, col_stat3 = st.columns(3)
 
     with col_stat1:
-        # Calcular promedio global de los valores numéricos
-        promedios_numericos = df_temp.mean(axis=1, skipna=True)
-        promedio_todos = promedios_numericos.mean()
+        promedio_todos = proyecciones.mean()
         st.metric("Promedio Global", f"{promedio_todos:.1f}%" if pd.notna(promedio_todos) else "N/A")
 
     with col_stat2:
-        if len(promedios_numericos) > 0 and not promedios_numericos.isna().all():
-            mejor_idx = promedios_numericos.idxmax()
+        if len(proyecciones) > 0 and not proyecciones.isna().all():
+            mejor_idx = proyecciones.idxmax()
             mejor_indicador = df_stats.loc[mejor_idx, 'Indicador']
-            mejor_valor = promedios_numericos.loc[mejor_idx]
+            mejor_valor = proyecciones.loc[mejor_idx]
             try:
                 st.metric("Mejor Indicador", f"Ind. {int(mejor_indicador)}: {mejor_valor:.1f}%")
             except:
@@ -583,10 +957,10 @@ with tab3:
             st.metric("Mejor Indicador", "N/A")
 
     with col_stat3:
-        if len(promedios_numericos) > 0 and not promedios_numericos.isna().all():
-            menor_idx = promedios_numericos.idxmin()
+        if len(proyecciones) > 0 and not proyecciones.isna().all():
+            menor_idx = proyecciones.idxmin()
             menor_indicador = df_stats.loc[menor_idx, 'Indicador']
-            menor_valor = promedios_numericos.loc[menor_idx]
+            menor_valor = proyecciones.loc[menor_idx]
             try:
                 st.metric("Menor Indicador", f"Ind. {int(menor_indicador)}: {menor_valor:.1f}%")
             except:
@@ -594,22 +968,130 @@ with tab3:
         else:
             st.metric("Menor Indicador", "N/A")
 
-# Sidebar con información
-st.sidebar.markdown("### ℹ️ Acerca de")
-st.sidebar.info(
-    """
-    **Dashboard Metas Sanitarias**
+with tab4, tramo('montecarlo', filas=len(simulacion)):
+    st.subheader("Probabilidad de Cumplimiento a Fin de Año")
+    st.markdown("Los meses sin dato se completan con escenarios simulados a partir de los meses ya registrados "
+                "(incluidas tus ediciones) y se calcula la probabilidad de que la Meta Proyectada alcance la Meta Anual.")
+    st.caption(f"Meta Proyectada: {ESTRATEGIAS[estrategia_proyeccion].lower()} (se elige en la barra lateral).")
+
+    col_mc1, col_mc2, col_mc3, col_mc4 = st.columns(4)
+    with col_mc1:
+        modelo_mc = st.selectbox("Modelo", list(MODELOS), format_func=MODELOS.get, key="modelo_mc")
+    with col_mc2:
+        escenarios_mc = st.select_slider("Escenarios", options=[1000, 2000, 5000, 10000, 20000], value=5000,
+                                         key="escenarios_mc")
+    with col_mc3:
+        umbral_mc = st.slider("Umbral ponderado (%)", min_value=0, max_value=100, value=100, step=5, key="umbral_mc")
+    with col_mc4:
+        semilla_mc = st.number_input("Semilla", min_value=0, value=42, step=1, key="semilla_mc")
+
+    resultado_mc = simular_unidad(
+        simulacion.valores, simulacion.meta, simulacion.comparable,
+        simulacion.df['Ponderacion_Num'].to_numpy(dtype=float),
+        escenarios_mc, modelo_mc, int(semilla_mc), float(umbral_mc),
+        simulacion.estrategia, simulacion.contexto
+    )
+    resumen_mc = resultado_mc.unidad
+
+    col_res1, col_res2, col_res3 = st.columns(3)
+    with col_res1:
+        esperado = resumen_mc['cumplimiento_esperado']
+        st.metric("Cumplimiento Ponderado Esperado", f"{esperado:.1f}%" if pd.notna(esperado) else "N/A")
+    with col_res2:
+        if pd.notna(resumen_mc['puntaje_p05']):
+            st.metric("Rango P5 – P95", f"{resumen_mc['puntaje_p05']:.1f}% – {resumen_mc['puntaje_p95']:.1f}%")
+        else:
+            st.metric("Rango P5 – P95", "N/A")
+    with col_res3:
+        prob_umbral = resumen_mc['probabilidad_umbral']
+        st.metric(f"Prob. de alcanzar {umbral_mc}%", f"{prob_umbral:.1f}%" if pd.notna(prob_umbral) else "N/A")
+
+    df_mc = simulacion.df[['Indicador', 'Descripcion', 'Meta_Anual_Display']].copy()
+    df_mc['Meta Proyectada'] = simulacion.proyeccion
+    df_mc = pd.concat([df_mc, resultado_mc.indicadores], axis=1)
+    st.dataframe(
+        df_mc,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Indicador": st.column_config.NumberColumn("Ind.", width="small"),
+            "Descripcion": st.column_config.TextColumn("Descripción", width="large"),
+            "Meta_Anual_Display": st.column_config.TextColumn("Meta Anual", width="small"),
+            "Meta Proyectada": st.column_config.NumberColumn(format="%.1f%%"),
+            "Meses_Faltantes": st.column_config.NumberColumn("Meses Faltantes"),
+            "Probabilidad_Cumplir": st.column_config.ProgressColumn(
+                "Prob. Cumplir", format="%.1f%%", min_value=0, max_value=100),
+            "Proyeccion_P05": st.column_config.NumberColumn("P5", format="%.1f%%"),
+            "Proyeccion_P50": st.column_config.NumberColumn("P50", format="%.1f%%"),
+            "Proyeccion_P95": st.column_config.NumberColumn("P95", format="%.1f%%"),
+        }
+    )
 
-    Funcionalidades:
-    - Selección de unidades
-    - Visualización de indicadores
-    - Simulación editable con persistencia
-    - Calculadora de porcentaje referencial
-    - Botón de reset
-    - Comparación gráfica
-    - Meta proyectada con indicador visual
-    """
-)
+    if len(resultado_mc.puntajes) > 0:
+        fig_mc = px.histogram(
+            x=resultado_mc.puntajes,
+            nbins=40,
+            title='Distribución del Cumplimiento Ponderado de la Unidad',
+            labels={'x': 'Cumplimiento Ponderado (%)'},
+            height=350
+        )
+        fig_mc.update_layout(showlegend=False, yaxis_title="Escenarios", xaxis=dict(ticksuffix="%"))
+        st.plotly_chart(fig_mc, use_container_width=True)
+
+with tab5, tramo('historico_unidad'):
+    st.subheader("Comparación Año contra Año")
+    df_historico = historico_unidad(unidad_seleccionada, obtener_historico().ultima_ingesta())
+
+    if df_historico.empty:
+        st.info("Aún no hay años guardados para esta unidad.")
+    else:
+        anios_guardados = sorted(df_historico['Anio'].unique())
+        st.caption(f"Años guardados: {', '.join(str(a) for a in anios_guardados)}. "
+                   "Cada año conserva la última versión publicada de la planilla.")
+
+        # Meta Proyectada de cada indicador en cada año guardado
+        df_historico['Meta_Proyectada'] = proyeccion_mensual(df_historico, estrategia=estrategia_proyeccion)
+        df_anual = df_historico.pivot_table(index='Indicador', columns='Anio', values='Meta_Proyectada',
+                                            aggfunc='first')
+        df_anual.columns = [str(a) for a in df_anual.columns]
+        descripciones = df_historico.drop_duplicates('Indicador', keep='last').set_index('Indicador')['Descripcion']
+        df_anual.insert(0, 'Descripcion', descripciones.reindex(df_anual.index))
+        if len(anios_guardados) > 1:
+            ultimo, penultimo = str(anios_guardados[-1]), str(anios_guardados[-2])
+            df_anual['Variación'] = df_anual[ultimo] - df_anual[penultimo]
+
+        st.dataframe(
+            df_anual.reset_index(),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Indicador": st.column_config.NumberColumn("Ind.", width="small"),
+                "Descripcion": st.column_config.TextColumn("Descripción", width="large"),
+                **{str(a): st.column_config.NumberColumn(str(a), format="%.1f%%") for a in anios_guardados},
+                "Variación": st.column_config.NumberColumn("Variación", format="%+.1f pp"),
+            }
+        )
 
-st.sidebar.markdown("---")
-st.sidebar.caption("v4.1 - Dashboard Interactivo")
\ No newline at end of file
+        indicador_historico = st.selectbox(
+            "Indicador", df_anual.index.tolist(),
+            format_func=lambda i: titulo_de({'Indicador': i, 'Descripcion': df_anual.loc[i, 'Descripcion']}),
+            key=f"indicador_historico_{unidad_seleccionada}"
+        )
+        df_lineas = df_historico.loc[df_historico['Indicador'] == indicador_historico, ['Anio'] + meses].melt(
+            id_vars='Anio', var_name='Mes', value_name='Cumplimiento').dropna(subset=['Cumplimiento'])
+        df_lineas['Anio'] = df_lineas['Anio'].astype(str)
+
+        fig_historico = px.line(
+            df_lineas,
+            x='Mes',
+            y='Cumplimiento',
+            color='Anio',
+            category_orders={'Mes': meses},
+            title='Evolución Mensual por Año',
+            markers=True,
+            height=400
+        )
+        fig_historico.update_layout(yaxis=dict(ticksuffix="%", range=[0, 100]), legend_title_text='Año')
+        st.plotly_chart(fig_historico, use_container_width=True)
+
+cerrar_ejecucion()